@@ -1,2 +1,19 @@
-from dptb_pilot.main import react_launch
-from dptb_pilot.core.legacy_main import launch
\ No newline at end of file
+"""
+DeePTB Pilot.
+
+The launchers are imported on first access only: worker processes of the
+tools import modules of this package and must not load the web server and
+LLM stack along with it.
+"""
+
+
+def __getattr__(name):
+    if name == "react_launch":
+        from dptb_pilot.main import react_launch
+
+        return react_launch
+    if name == "launch":
+        from dptb_pilot.core.legacy_main import launch
+
+        return launch
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -25,13 +25,16 @@ from google.genai import types
 from dptb_pilot.core.logger import get_logger
 from dptb_pilot.core.photon_service import get_photon_service, PhotonChargeResult
 from dptb_pilot.core.photon_config import CHARGING_ENABLED
+from dptb_pilot.server.session_manager import BoundedHistoryPool, manager_from_env
+from dptb_pilot.server.session_store import get_session_store, turns_to_messages
 
 logger = get_logger(__name__)
 
 
 # 全局状态管理 (保持与原main.py兼容)
-active_agents: Dict[str, LlmAgent] = {}
-history_pool: Dict[str, List[List[str]]] = {}
+# 聊天历史缓存，只保留最近使用的会话，其余按需从会话存储重新加载
+history_pool: Dict[str, List[List[str]]] = BoundedHistoryPool(
+    int(os.getenv("DPTB_MAX_CACHED_CHATS", 256)))
 session_service = InMemorySessionService()
 
 # MCP工具拦截相关状态
@@ -44,6 +47,12 @@ modified_args_store: Dict[str, Dict] = {}
 cancel_execution_events: Dict[str, asyncio.Event] = {}
 termination_requested: Dict[str, bool] = {}
 
+# 活跃Agent管理：LRU上限 + 空闲超时，淘汰时关闭MCP连接并清理上述按会话保存的状态
+session_manager = manager_from_env(session_service, [
+    pending_events, unmodified_schema_store, modified_schema_store, modified_args_store,
+    cancel_execution_events, termination_requested,
+])
+
 # 配置信息
 target_tools: List[str] = []
 tools_info: List[Dict[str, Any]] = {}
@@ -346,17 +355,11 @@ async def login(request: LoginRequest):
         raise HTTPException(status_code=400, detail="会话ID需要为长度为32的任意字符")
 
     # 创建或获取agent
-    if session_id not in active_agents:
-        try:
-            agent = create_llm_agent(
-                session_id=session_id,
-                mcp_tools_url=mcp_server_url,
-                agent_info=agent_info,
-                model_config=model_config
-            )
-            active_agents[session_id] = agent
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"创建Agent失败: {str(e)}")
+    try:
+        async with session_manager.session(session_id):
+            pass
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"创建Agent失败: {str(e)}")
 
     logger.info(f"登录成功，会话ID: {session_id}")
     return {"message": "登录成功", "session_id": session_id}
@@ -368,25 +371,22 @@ async def chat_with_agent(message: ChatMessage):
     session_id = message.session_id
     user_message = message.message
 
-    if session_id not in active_agents:
+    if len(session_id) != 32:
         raise HTTPException(status_code=404, detail="Agent未找到，请重新登录")
 
-    agent = active_agents[session_id]
-    session = await session_service.create_session(
-        app_name=agent_info["name"],
-        user_id=session_id[:4],
-        session_id=session_id
-    )
+    # 被淘汰的会话在这里按需重建，ADK会话从持久化历史恢复
+    async with session_manager.session(session_id) as agent:
+        await session_manager.ensure_adk_session(session_id, session_id[:4], message.chat_id)
 
-    runner = Runner(
-        agent=agent,
-        app_name=agent_info["name"],
-        session_service=session_service
-    )
+        runner = Runner(
+            agent=agent,
+            app_name=agent_info["name"],
+            session_service=session_service
+        )
 
-    full_response = ""
-    async for response in call_agent_async(user_message, runner, session_id[:4], session_id):
-        full_response += response.get("content", "")
+        full_response = ""
+        async for response in call_agent_async(user_message, runner, session_id[:4], session_id):
+            full_response += response.get("content", "")
 
     chat_id = message.chat_id
     
@@ -404,8 +404,8 @@ async def chat_with_agent(message: ChatMessage):
     history = history_pool[chat_id]
     history.append([user_message, full_response])
     
-    # 同步更新 sessions.json
-    update_session_history(session_id, chat_id, history, work_path)
+    # 追加本轮对话到会话存储
+    append_session_turn(session_id, chat_id, user_message, full_response, work_path)
 
     return {"response": full_response, "is_final": True}
 
@@ -425,25 +425,18 @@ async def websocket_chat(websocket: WebSocket, session_id: str):
         logger.warning(f"Failed to get WebSocket cookies: {e}")
         cookies = {}
 
+    acquired = False
     try:
-        if session_id not in active_agents:
+        if len(session_id) != 32:
             await websocket.send_text(json.dumps({
                 "type": "error",
                 "message": "Agent未找到，请重新登录"
             }))
             return
 
-        agent = active_agents[session_id]
-        
-        try:
-            session = await session_service.create_session(
-                app_name=agent_info["name"],
-                user_id=session_id[:4],
-                session_id=session_id
-            )
-        except Exception as e:
-            logger.error(f"Failed to create session: {e}")
-            raise
+        # 连接期间固定该会话的Agent，避免被淘汰
+        agent = await session_manager.acquire(session_id)
+        acquired = True
 
         runner = Runner(
             agent=agent,
@@ -464,6 +457,8 @@ async def websocket_chat(websocket: WebSocket, session_id: str):
                 }))
                 continue
 
+            await session_manager.ensure_adk_session(session_id, session_id[:4], chat_id)
+
             response_text = ""
             usage_metadata = None
             try:
@@ -552,7 +547,7 @@ async def websocket_chat(websocket: WebSocket, session_id: str):
                 chat_id = session_id
                 logger.warning(f"No chat_id provided, falling back to user_id: {chat_id}")
 
-            # 懒加载聊天历史 (从 sessions.json)
+            # 懒加载聊天历史 (从会话存储)
             if chat_id not in history_pool:
                 history_pool[chat_id] = load_session_history(session_id, chat_id, work_path)
 
@@ -560,8 +555,8 @@ async def websocket_chat(websocket: WebSocket, session_id: str):
             history = history_pool[chat_id]
             history.append([user_message, response_text])
             
-            # 同步更新 sessions.json (这是唯一的持久化存储)
-            update_session_history(session_id, chat_id, history, work_path)
+            # 追加本轮对话到会话存储 (这是唯一的持久化存储)
+            append_session_turn(session_id, chat_id, user_message, response_text, work_path)
 
     except WebSocketDisconnect:
         manager.disconnect(session_id)
@@ -574,6 +569,9 @@ async def websocket_chat(websocket: WebSocket, session_id: str):
         except:
             pass
         manager.disconnect(session_id)
+    finally:
+        if acquired:
+            session_manager.release(session_id)
 
 
 @app.post("/api/modify-params")
@@ -796,106 +794,52 @@ class SaveSessionsRequest(BaseModel):
 
 
 @app.get("/api/user/{user_id}/sessions")
-async def get_user_sessions(user_id: str):
-    """获取用户的所有聊天会话"""
-    user_dir = os.path.join(work_path, user_id)
-    sessions_file = os.path.join(user_dir, "sessions.json")
-    logger.info(f"Loading sessions for {user_id} from {sessions_file}")
-    
-    if os.path.exists(sessions_file):
-        try:
-            with open(sessions_file, 'r', encoding='utf-8') as f:
-                sessions = json.load(f)
-            
-            # 转换历史记录格式以适配前端: [[q, a], ...] -> [{role: user, content: q}, {role: assistant, content: a}, ...]
-            for session in sessions:
-                raw_history = session.get("history", [])
-                formatted_history = []
-                for item in raw_history:
-                    if isinstance(item, list) and len(item) >= 2:
-                        formatted_history.append({"role": "user", "content": item[0]})
-                        formatted_history.append({"role": "assistant", "content": item[1]})
-                session["history"] = formatted_history
-                # Update message count to reflect total messages (user + assistant)
-                session["message_count"] = len(formatted_history)
-            
-            logger.info(f"Loaded {len(sessions)} sessions")
-            return {"sessions": sessions}
-        except Exception as e:
-            logger.error(f"Error loading sessions: {e}")
-            return {"sessions": []}
-    logger.warning("Sessions file not found")
-    return {"sessions": []}
+async def get_user_sessions(user_id: str, offset: int = 0, limit: Optional[int] = None,
+                            include_history: bool = False):
+    """获取用户的聊天会话，支持分页；默认只返回元数据，include_history=true 时一并返回消息内容"""
+    logger.info(f"Loading sessions for {user_id} (offset={offset}, limit={limit}, history={include_history})")
+    try:
+        store = get_session_store(work_path)
+        sessions = store.list_sessions(user_id, offset=offset, limit=limit, include_history=include_history)
+        logger.info(f"Loaded {len(sessions)} sessions")
+        return {"sessions": sessions, "total": store.count_sessions(user_id), "offset": offset}
+    except Exception as e:
+        logger.error(f"Error loading sessions: {e}")
+        return {"sessions": [], "total": 0, "offset": offset}
 
 
-def load_session_history(user_id: str, chat_id: str, work_path: str) -> List[List[str]]:
-    """从 sessions.json 加载特定会话的历史记录"""
-    user_dir = os.path.join(work_path, user_id)
-    sessions_file = os.path.join(user_dir, "sessions.json")
-    
-    if not os.path.exists(sessions_file):
-        return []
+@app.get("/api/user/{user_id}/sessions/{chat_id}/history")
+async def get_user_session_history(user_id: str, chat_id: str, offset: int = 0, limit: Optional[int] = None):
+    """分页获取单个聊天会话的历史消息"""
+    turns = get_session_store(work_path).load_history(user_id, chat_id, offset=offset, limit=limit)
+    return {"history": turns_to_messages(turns), "offset": offset}
+
 
+def load_session_history(user_id: str, chat_id: str, work_path: str) -> List[List[str]]:
+    """从会话存储加载特定会话的历史记录"""
     try:
-        with open(sessions_file, 'r', encoding='utf-8') as f:
-            sessions = json.load(f)
-        
-        for session in sessions:
-            if session.get("chat_id") == chat_id:
-                return session.get("history", [])
+        return get_session_store(work_path).load_history(user_id, chat_id)
     except Exception as e:
         logger.error(f"Error loading session history: {e}")
-    
     return []
 
 
-def update_session_history(user_id: str, session_id: str, history: List[List[str]], work_path: str):
-    """更新用户会话列表中的历史记录"""
-    logger.debug(f"Updating session history for User: {user_id}, Chat: {session_id}, History Len: {len(history)}")
-    user_dir = os.path.join(work_path, user_id)
-    sessions_file = os.path.join(user_dir, "sessions.json")
-    
-    if not os.path.exists(sessions_file):
-        logger.warning(f"Sessions file not found: {sessions_file}")
-        return
-
+def append_session_turn(user_id: str, chat_id: str, question: str, answer: str, work_path: str):
+    """向会话存储追加一轮对话"""
     try:
-        with open(sessions_file, 'r', encoding='utf-8') as f:
-            sessions = json.load(f)
-        
-        updated = False
-        for session in sessions:
-            # logger.debug(f"Checking session {session.get('chat_id')} against {session_id}")
-            if session.get("chat_id") == session_id:
-                session["history"] = history
-                session["last_active"] = datetime.now().isoformat()
-                session["message_count"] = len(history)
-                updated = True
-                logger.debug(f"Found and updated session {session_id}")
-                break
-        
-        if updated:
-            with open(sessions_file, 'w', encoding='utf-8') as f:
-                json.dump(sessions, f, ensure_ascii=False, indent=2)
-            logger.debug("Successfully saved sessions.json")
-        else:
-            logger.warning(f"Chat ID {session_id} not found in sessions.json")
-            
+        turn_count = get_session_store(work_path).append_turn(user_id, chat_id, question, answer)
+        logger.debug(f"Appended turn {turn_count} to User: {user_id}, Chat: {chat_id}")
     except Exception as e:
-        logger.error(f"Failed to update session history in sessions.json: {e}")
+        logger.error(f"Failed to append session turn: {e}")
 
 
 @app.post("/api/user/{user_id}/sessions")
 async def save_user_sessions(user_id: str, request: SaveSessionsRequest):
-    """保存用户的所有聊天会话"""
-    user_dir = os.path.join(work_path, user_id)
-    os.makedirs(user_dir, exist_ok=True)
-    sessions_file = os.path.join(user_dir, "sessions.json")
-    logger.info(f"Saving {len(request.sessions)} sessions for {user_id} to {sessions_file}")
+    """保存用户的聊天会话列表 (标题、顺序、删除)；已有会话的消息以服务器记录为准"""
+    logger.info(f"Saving {len(request.sessions)} sessions for {user_id}")
     
     try:
-        with open(sessions_file, 'w', encoding='utf-8') as f:
-            json.dump(request.sessions, f, ensure_ascii=False, indent=2)
+        get_session_store(work_path).replace_sessions(user_id, request.sessions)
         return {"message": "Sessions saved successfully"}
     except Exception as e:
         logger.error(f"Failed to save sessions: {e}")
@@ -914,6 +858,26 @@ async def health_check():
     """健康检查端点"""
     return {"status": "ok", "message": "Backend is running"}
 
+
+@app.get("/api/stats")
+async def get_stats():
+    """服务器内存中活跃对象的数量"""
+    stats = session_manager.stats()
+    stats.update({
+        "cached_chats": len(history_pool),
+        "websocket_connections": len(manager.active_connections),
+        "pending_events": len(pending_events),
+        "schema_store": len(unmodified_schema_store),
+        "modified_args_store": len(modified_args_store),
+    })
+    return stats
+
+
+@app.on_event("startup")
+async def start_session_sweeper():
+    """定期淘汰空闲会话，即使没有新请求也能释放内存"""
+    asyncio.create_task(session_manager.run_sweeper())
+
 @app.get("/api/config")
 async def get_config():
     """获取应用配置信息"""
@@ -943,6 +907,16 @@ def initialize_server(
     mcp_server_url = mcp_url
     work_path = work_dir
     target_tools = tools_modify or []
+    session_manager.configure(
+        app_name=agent_info["name"],
+        agent_factory=lambda session_id: create_llm_agent(
+            session_id=session_id,
+            mcp_tools_url=mcp_server_url,
+            agent_info=agent_info,
+            model_config=model_config
+        ),
+        history_loader=lambda user_id, chat_id: load_session_history(user_id, chat_id, work_path)
+    )
 
     # 加载MCP工具信息
     try:
@@ -0,0 +1,245 @@
+"""
+Bounded registry of live agents and per-session server state.
+
+Every logged-in user used to keep an ``LlmAgent`` (with its MCP toolset
+connection and full instruction string), an ADK in-memory session and entries
+in the tool-interception dicts for the lifetime of the process. The
+``SessionManager`` keeps at most ``max_agents`` agents, evicts the least
+recently used idle ones and any idle for longer than ``idle_ttl`` seconds,
+closes their MCP connections, drops their ADK session and interception state,
+and recreates them on the next request. A recreated ADK session is seeded
+with the last persisted turns of the chat being resumed, so the agent keeps
+its context across evictions and restarts.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from dptb_pilot.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MAX_AGENTS = 64
+DEFAULT_IDLE_TTL = 3600
+DEFAULT_MAX_CACHED_CHATS = 256
+DEFAULT_REHYDRATE_TURNS = 20
+DEFAULT_SWEEP_INTERVAL = 60
+
+
+class BoundedHistoryPool(OrderedDict):
+    """
+    ``chat_id -> [[question, answer], ...]`` cache keeping the ``max_chats`` most
+    recently used chats; evicted chats are reloaded from the session store.
+    """
+
+    def __init__(self, max_chats: int = DEFAULT_MAX_CACHED_CHATS):
+        super().__init__()
+        self.max_chats = max_chats
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.max_chats:
+            self.popitem(last=False)
+
+
+class _Entry:
+    __slots__ = ("agent", "last_used", "in_use")
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.last_used = time.monotonic()
+        self.in_use = 0
+
+
+class SessionManager:
+    """
+    Live agents keyed by session id, with an LRU cap and an idle TTL.
+
+    Parameters
+    ----------
+    session_service : InMemorySessionService
+        ADK session service whose sessions are dropped on eviction.
+    per_session_stores : List[Dict[str, Any]]
+        Dicts keyed by session id (tool interception state) purged on eviction.
+    max_agents : int
+        Maximum number of live agents; sessions in use are never evicted.
+    idle_ttl : float
+        Seconds after which an unused session is evicted.
+    rehydrate_turns : int
+        Persisted turns replayed into a recreated ADK session.
+    """
+
+    def __init__(self, session_service, per_session_stores: List[Dict[str, Any]],
+                 max_agents: int = DEFAULT_MAX_AGENTS, idle_ttl: float = DEFAULT_IDLE_TTL,
+                 rehydrate_turns: int = DEFAULT_REHYDRATE_TURNS):
+        self.session_service = session_service
+        self.per_session_stores = per_session_stores
+        self.max_agents = max_agents
+        self.idle_ttl = idle_ttl
+        self.rehydrate_turns = rehydrate_turns
+        self.app_name = None
+        self._agent_factory: Optional[Callable[[str], Any]] = None
+        self._history_loader: Optional[Callable[[str, str], List[List[str]]]] = None
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # session id -> user id the ADK session was created under
+        self._adk_sessions: Dict[str, str] = {}
+        self._evictions = 0
+
+    def configure(self, app_name: str, agent_factory: Callable[[str], Any],
+                  history_loader: Callable[[str, str], List[List[str]]]):
+        """Set how agents are created and where persisted history is read from."""
+        self.app_name = app_name
+        self._agent_factory = agent_factory
+        self._history_loader = history_loader
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._entries
+
+    # ---- agents ----
+
+    async def acquire(self, session_id: str):
+        """
+        Agent of ``session_id``, created if missing or evicted; pinned until ``release``.
+        """
+        await self.sweep()
+        entry = self._entries.get(session_id)
+        if entry is None:
+            entry = _Entry(self._agent_factory(session_id))
+            self._entries[session_id] = entry
+            logger.info(f"Created agent for session {session_id} ({len(self._entries)} live)")
+        entry.in_use += 1
+        entry.last_used = time.monotonic()
+        self._entries.move_to_end(session_id)
+        await self._enforce_cap()
+        return entry.agent
+
+    def release(self, session_id: str):
+        entry = self._entries.get(session_id)
+        if entry is not None:
+            entry.in_use = max(entry.in_use - 1, 0)
+            entry.last_used = time.monotonic()
+
+    @asynccontextmanager
+    async def session(self, session_id: str):
+        """``async with manager.session(sid) as agent``: pin the agent for the block."""
+        agent = await self.acquire(session_id)
+        try:
+            yield agent
+        finally:
+            self.release(session_id)
+
+    # ---- ADK sessions ----
+
+    async def ensure_adk_session(self, session_id: str, user_id: str, chat_id: Optional[str] = None):
+        """
+        Make sure the ADK session exists; a new one is seeded with the last
+        persisted turns of ``chat_id``.
+        """
+        if session_id in self._adk_sessions:
+            return
+        session = await self.session_service.get_session(app_name=self.app_name, user_id=user_id,
+                                                         session_id=session_id)
+        if session is None:
+            session = await self.session_service.create_session(app_name=self.app_name, user_id=user_id,
+                                                                session_id=session_id)
+            if chat_id and self._history_loader is not None and self.rehydrate_turns > 0:
+                turns = self._history_loader(session_id, chat_id)[-self.rehydrate_turns:]
+                await self._seed(session, session_id, turns)
+        self._adk_sessions[session_id] = user_id
+
+    async def _seed(self, session, session_id: str, turns: List[List[str]]):
+        from google.adk.events import Event
+        from google.genai import types
+
+        entry = self._entries.get(session_id)
+        author = entry.agent.name if entry is not None else "model"
+        for question, answer in turns:
+            await self.session_service.append_event(session, Event(
+                author="user", content=types.Content(role="user", parts=[types.Part(text=question)])))
+            await self.session_service.append_event(session, Event(
+                author=author, content=types.Content(role="model", parts=[types.Part(text=answer)])))
+        if turns:
+            logger.info(f"Rehydrated session {session_id} with {len(turns)} persisted turns")
+
+    # ---- eviction ----
+
+    def _idle(self, entry: _Entry, now: float) -> bool:
+        return entry.in_use == 0 and now - entry.last_used > self.idle_ttl
+
+    async def sweep(self):
+        """Evict every unused session idle for longer than ``idle_ttl``."""
+        now = time.monotonic()
+        expired = [session_id for session_id, entry in self._entries.items() if self._idle(entry, now)]
+        for session_id in expired:
+            await self.evict(session_id)
+
+    async def _enforce_cap(self):
+        # least recently used first; pinned sessions may keep the count above the cap
+        for session_id in [sid for sid, entry in self._entries.items() if entry.in_use == 0]:
+            if len(self._entries) <= self.max_agents:
+                break
+            await self.evict(session_id)
+
+    async def evict(self, session_id: str):
+        """Close the session's MCP connections and drop all of its server state."""
+        entry = self._entries.pop(session_id, None)
+        for store in self.per_session_stores:
+            store.pop(session_id, None)
+        user_id = self._adk_sessions.pop(session_id, None)
+        if user_id is not None:
+            try:
+                await self.session_service.delete_session(app_name=self.app_name, user_id=user_id,
+                                                          session_id=session_id)
+            except Exception as e:
+                logger.warning(f"Failed to delete ADK session {session_id}: {e}")
+        if entry is None:
+            return
+        self._evictions += 1
+        for tool in getattr(entry.agent, "tools", []):
+            close = getattr(tool, "close", None)
+            if close is None:
+                continue
+            try:
+                await close()
+            except Exception as e:
+                logger.warning(f"Failed to close MCP toolset of session {session_id}: {e}")
+        logger.info(f"Evicted session {session_id} ({len(self._entries)} live)")
+
+    async def run_sweeper(self, interval: float = DEFAULT_SWEEP_INTERVAL):
+        """Background task evicting idle sessions even when no requests arrive."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Session sweep failed: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        """Live-object counts for monitoring."""
+        return {
+            "live_agents": len(self._entries),
+            "agents_in_use": sum(1 for entry in self._entries.values() if entry.in_use),
+            "adk_sessions": len(self._adk_sessions),
+            "evictions": self._evictions,
+            "max_agents": self.max_agents,
+        }
+
+
+def manager_from_env(session_service, per_session_stores: List[Dict[str, Any]]) -> SessionManager:
+    """Manager configured by ``DPTB_MAX_AGENTS``/``DPTB_AGENT_IDLE_TTL``/``DPTB_REHYDRATE_TURNS``."""
+    return SessionManager(
+        session_service,
+        per_session_stores,
+        max_agents=int(os.getenv("DPTB_MAX_AGENTS", DEFAULT_MAX_AGENTS)),
+        idle_ttl=float(os.getenv("DPTB_AGENT_IDLE_TTL", DEFAULT_IDLE_TTL)),
+        rehydrate_turns=int(os.getenv("DPTB_REHYDRATE_TURNS", DEFAULT_REHYDRATE_TURNS)),
+    )
@@ -0,0 +1,283 @@
+"""
+Persistent chat session history for the web server.
+
+Sessions used to live in one ``<work_path>/<user_id>/sessions.json`` per user
+that was fully loaded, scanned and rewritten on every chat turn. They are now
+kept in a SQLite database (WAL mode) under ``work_path``:
+
+- ``chats`` holds one metadata row per chat, indexed by user and list position;
+- ``turns`` holds the ``[question, answer]`` pairs, appended one row per turn.
+
+Appending a turn is a single transaction touching one turn row and one chat
+row, listing a user's sessions can page without reading message bodies, and
+concurrent writers are serialized by SQLite. Legacy ``sessions.json`` files are
+imported on first access and renamed to ``sessions.json.migrated``.
+"""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DB_NAME = "sessions.sqlite"
+LEGACY_FILE_NAME = "sessions.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chats (
+    user_id TEXT NOT NULL,
+    chat_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    title TEXT,
+    created_at TEXT,
+    last_active TEXT,
+    turn_count INTEGER NOT NULL DEFAULT 0,
+    extra TEXT,
+    PRIMARY KEY (user_id, chat_id)
+);
+CREATE TABLE IF NOT EXISTS turns (
+    user_id TEXT NOT NULL,
+    chat_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    PRIMARY KEY (user_id, chat_id, seq)
+);
+CREATE TABLE IF NOT EXISTS migrated_users (
+    user_id TEXT PRIMARY KEY
+);
+CREATE INDEX IF NOT EXISTS idx_chats_user_position ON chats (user_id, position);
+"""
+
+# chat fields with their own column; everything else the frontend sends goes to ``extra``
+_CHAT_COLUMNS = ("chat_id", "title", "created_at", "last_active")
+# derived from the stored turns, never taken from the client
+_DERIVED_FIELDS = ("history", "message_count")
+
+
+def history_to_turns(history: List[Any]) -> List[List[str]]:
+    """
+    ``[[question, answer], ...]`` from either stored pairs or the frontend's
+    ``[{"role": "user", ...}, {"role": "assistant", ...}, ...]`` messages.
+    """
+    turns = []
+    question = None
+    for item in history or []:
+        if isinstance(item, (list, tuple)) and len(item) >= 2:
+            turns.append([str(item[0]), str(item[1])])
+        elif isinstance(item, dict) and item.get("role") == "user":
+            question = str(item.get("content", ""))
+        elif isinstance(item, dict) and item.get("role") == "assistant" and question is not None:
+            turns.append([question, str(item.get("content", ""))])
+            question = None
+    return turns
+
+
+def turns_to_messages(turns: List[List[str]]) -> List[Dict[str, str]]:
+    """Frontend message list: one user and one assistant message per turn."""
+    messages = []
+    for question, answer in turns:
+        messages.append({"role": "user", "content": question})
+        messages.append({"role": "assistant", "content": answer})
+    return messages
+
+
+class SessionStore:
+    """
+    SQLite-backed store of chat sessions for all users of a server.
+
+    Parameters
+    ----------
+    work_path : Path
+        Server work directory; holds the database and the legacy per-user
+        ``sessions.json`` files.
+    """
+
+    def __init__(self, work_path: Path):
+        self.work_path = Path(work_path)
+        self.db_path = self.work_path / DB_NAME
+        self._initialized = False
+        self._checked_users = set()
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.work_path.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._initialized = True
+        return conn
+
+    # ---- legacy import ----
+
+    def _ensure_migrated(self, conn: sqlite3.Connection, user_id: str):
+        """Import ``<work_path>/<user_id>/sessions.json`` once per user."""
+        if user_id in self._checked_users:
+            return
+        with self._lock:
+            if user_id in self._checked_users:
+                return
+            legacy_file = self.work_path / user_id / LEGACY_FILE_NAME
+            done = conn.execute("SELECT 1 FROM migrated_users WHERE user_id = ?", (user_id,)).fetchone()
+            if not done and legacy_file.exists():
+                with open(legacy_file, "r", encoding="utf-8") as f:
+                    sessions = json.load(f)
+                with conn:
+                    self._replace(conn, user_id, sessions)
+                    conn.execute("INSERT OR IGNORE INTO migrated_users (user_id) VALUES (?)", (user_id,))
+                os.replace(legacy_file, legacy_file.with_name(LEGACY_FILE_NAME + ".migrated"))
+            elif not done:
+                with conn:
+                    conn.execute("INSERT OR IGNORE INTO migrated_users (user_id) VALUES (?)", (user_id,))
+            self._checked_users.add(user_id)
+
+    # ---- writes ----
+
+    def _insert_turns(self, conn: sqlite3.Connection, user_id: str, chat_id: str, turns: List[List[str]]):
+        conn.executemany(
+            "INSERT INTO turns (user_id, chat_id, seq, question, answer) VALUES (?, ?, ?, ?, ?)",
+            [(user_id, chat_id, seq, question, answer) for seq, (question, answer) in enumerate(turns)])
+
+    def _replace(self, conn: sqlite3.Connection, user_id: str, sessions: List[Dict[str, Any]]):
+        existing = {row["chat_id"] for row in
+                    conn.execute("SELECT chat_id FROM chats WHERE user_id = ?", (user_id,))}
+        kept = set()
+        for position, session in enumerate(sessions):
+            chat_id = str(session.get("chat_id") or "")
+            if not chat_id or chat_id in kept:
+                continue
+            kept.add(chat_id)
+            extra = {key: value for key, value in session.items()
+                     if key not in _CHAT_COLUMNS and key not in _DERIVED_FIELDS}
+            conn.execute(
+                "INSERT INTO chats (user_id, chat_id, position, title, created_at, last_active, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (user_id, chat_id) DO UPDATE SET position = excluded.position, "
+                "title = excluded.title, created_at = COALESCE(excluded.created_at, chats.created_at), "
+                "last_active = COALESCE(excluded.last_active, chats.last_active), extra = excluded.extra",
+                (user_id, chat_id, position, session.get("title"), session.get("created_at"),
+                 session.get("last_active"), json.dumps(extra, ensure_ascii=False)))
+            if chat_id not in existing:
+                # the server owns the turns of known chats; only new chats take the client history
+                turns = history_to_turns(session.get("history", []))
+                self._insert_turns(conn, user_id, chat_id, turns)
+                conn.execute("UPDATE chats SET turn_count = ? WHERE user_id = ? AND chat_id = ?",
+                             (len(turns), user_id, chat_id))
+        removed = sorted(existing - kept)
+        if removed:
+            marks = ", ".join("?" * len(removed))
+            conn.execute(f"DELETE FROM turns WHERE user_id = ? AND chat_id IN ({marks})", [user_id] + removed)
+            conn.execute(f"DELETE FROM chats WHERE user_id = ? AND chat_id IN ({marks})", [user_id] + removed)
+
+    def replace_sessions(self, user_id: str, sessions: List[Dict[str, Any]]):
+        """
+        Make ``sessions`` the user's chat list.
+
+        Titles, order and other metadata are updated, chats missing from the
+        list are deleted with their turns, and only chats new to the store take
+        the history sent along.
+        """
+        with closing(self._connect()) as conn:
+            self._ensure_migrated(conn, user_id)
+            with conn:
+                self._replace(conn, user_id, sessions)
+
+    def append_turn(self, user_id: str, chat_id: str, question: str, answer: str) -> int:
+        """
+        Append one ``[question, answer]`` turn and touch the chat's ``last_active``.
+
+        Chats unknown to the store are created at the end of the user's list.
+        Returns the number of turns in the chat.
+        """
+        now = datetime.now().isoformat()
+        with closing(self._connect()) as conn:
+            self._ensure_migrated(conn, user_id)
+            with conn:
+                # BEGIN IMMEDIATE serializes concurrent appends to the same chat
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    "INSERT INTO chats (user_id, chat_id, position, title, created_at, last_active, extra) "
+                    "SELECT ?, ?, COALESCE(MAX(position) + 1, 0), ?, ?, ?, '{}' FROM chats WHERE user_id = ? "
+                    "ON CONFLICT (user_id, chat_id) DO NOTHING",
+                    (user_id, chat_id, chat_id, now, now, user_id))
+                turn_count = conn.execute("SELECT turn_count FROM chats WHERE user_id = ? AND chat_id = ?",
+                                          (user_id, chat_id)).fetchone()["turn_count"]
+                conn.execute("INSERT INTO turns (user_id, chat_id, seq, question, answer) VALUES (?, ?, ?, ?, ?)",
+                             (user_id, chat_id, turn_count, question, answer))
+                conn.execute("UPDATE chats SET turn_count = ?, last_active = ? WHERE user_id = ? AND chat_id = ?",
+                             (turn_count + 1, now, user_id, chat_id))
+        return turn_count + 1
+
+    # ---- reads ----
+
+    def load_history(self, user_id: str, chat_id: str, offset: int = 0,
+                     limit: Optional[int] = None) -> List[List[str]]:
+        """``[[question, answer], ...]`` of a chat, optionally one page of it."""
+        with closing(self._connect()) as conn:
+            self._ensure_migrated(conn, user_id)
+            rows = conn.execute(
+                "SELECT question, answer FROM turns WHERE user_id = ? AND chat_id = ? ORDER BY seq LIMIT ? OFFSET ?",
+                (user_id, chat_id, -1 if limit is None else int(limit), int(offset))).fetchall()
+        return [[row["question"], row["answer"]] for row in rows]
+
+    def list_sessions(self, user_id: str, offset: int = 0, limit: Optional[int] = None,
+                      include_history: bool = False) -> List[Dict[str, Any]]:
+        """
+        The user's chats in list order.
+
+        Without ``include_history`` only the chat rows are read, so a page
+        costs the same however long the chats are. With it, the turns of the
+        whole page are read in one query on the same connection. ``message_count``
+        counts user and assistant messages, as the frontend does.
+        """
+        page = (user_id, -1 if limit is None else int(limit), int(offset))
+        histories: Dict[str, List[List[str]]] = {}
+        with closing(self._connect()) as conn:
+            self._ensure_migrated(conn, user_id)
+            rows = conn.execute(
+                "SELECT * FROM chats WHERE user_id = ? ORDER BY position LIMIT ? OFFSET ?", page).fetchall()
+            if include_history:
+                turns = conn.execute(
+                    "SELECT chat_id, question, answer FROM turns WHERE user_id = ? AND chat_id IN "
+                    "(SELECT chat_id FROM chats WHERE user_id = ? ORDER BY position LIMIT ? OFFSET ?) "
+                    "ORDER BY chat_id, seq", (user_id,) + page)
+                for turn in turns:
+                    histories.setdefault(turn["chat_id"], []).append([turn["question"], turn["answer"]])
+        sessions = []
+        for row in rows:
+            session = json.loads(row["extra"] or "{}")
+            session.update({
+                "chat_id": row["chat_id"],
+                "title": row["title"],
+                "created_at": row["created_at"],
+                "last_active": row["last_active"],
+                "message_count": 2 * row["turn_count"],
+            })
+            sessions.append(session)
+        if include_history:
+            for session in sessions:
+                session["history"] = turns_to_messages(histories.get(session["chat_id"], []))
+        return sessions
+
+    def count_sessions(self, user_id: str) -> int:
+        with closing(self._connect()) as conn:
+            self._ensure_migrated(conn, user_id)
+            return conn.execute("SELECT COUNT(*) FROM chats WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+
+_stores: Dict[str, SessionStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_session_store(work_path: str) -> SessionStore:
+    """One store per server work directory."""
+    key = os.path.abspath(work_path)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = SessionStore(Path(key))
+        return _stores[key]
@@ -24,6 +24,23 @@ ENVS = {
     "DPTB_COMMAND": "dptb",  # dptb executable command
     "DPTB_PP_PATH": "",  # dptb pseudopotential library path
     "DPTB_ORB_PATH": "",  # dptb orbital library path
+
+    # tool server caches
+    "DPTB_TBSYSTEM_CACHE_ENTRIES": "4",  # max number of cached TBSystem objects
+    "DPTB_TBSYSTEM_CACHE_MB": "4096",  # memory budget of the TBSystem cache
+    "DPTB_BAND_N_WORKERS": "1",  # default k-point worker processes of the band tools
+    "DPTB_BAND_START_METHOD": "forkserver",  # start method of the k-point workers: forkserver, spawn, fork
+    "DPNEGF_SELF_ENERGY_STORE": "",  # shared lead self-energy store, ~/.cache/dptb_pilot/self_energy if empty
+    "DPNEGF_SELF_ENERGY_STORE_GB": "20",  # size budget of the self-energy store
+    "DPNEGF_ARCHIVE_CODEC": "gz",  # codec of relaxed-system/NEGF output bundles: tar, gz, zstd, lz4
+    "DPNEGF_ARCHIVE_LEVEL": "",  # compression level, codec default if empty
+    "DPNEGF_START_METHOD": "forkserver",  # start method of the NEGF snapshot workers: forkserver, spawn, fork
+    "DPTB_RAG_WARMUP": "1",  # load the knowledge-base model in the background at server start
+    "DPTB_RAG_CACHE_SIZE": "256",  # memoized query embeddings / search results
+    "DPTB_HTTP_CACHE_DIR": "",  # response cache of the MP/COD/C2DB tools, ~/.cache/dptb_pilot/http if empty
+    "DPTB_HTTP_CACHE_TTL": "604800",  # lifetime of cached database responses in seconds, 0 disables the cache
+    "DPTB_STRUCTURE_INDEX_DIR": "",  # local structure index and CIF store, ~/.cache/dptb_pilot/structures if empty
+    "DPTB_DIMENSIONALITY_WORKERS": "4",  # processes classifying structure dimensionality for MP searches
     
     "_comments":{
         "DPTB_WORK_PATH": "The working directory for Dptb_Agent, where all temporary files will be stored.",
@@ -41,6 +58,21 @@ ENVS = {
         "DPTB_COMMAND": "The command to execute dptb on local machine.",
         "DPTB_PP_PATH": "The path to the pseudopotential library for Dptb.",
         "DPTB_ORB_PATH": "The path to the orbital library for Dptb.",
+        "DPTB_TBSYSTEM_CACHE_ENTRIES": "The maximum number of TBSystem objects kept alive by the band/Hamiltonian tools.",
+        "DPTB_TBSYSTEM_CACHE_MB": "The approximate memory budget (MB) of the TBSystem cache.",
+        "DPTB_BAND_N_WORKERS": "The default number of processes (or Julia threads) the band tools use to evaluate k-points; 1 runs serially.",
+        "DPTB_BAND_START_METHOD": "The multiprocessing start method of the band k-point workers; fork is only used while the process is single-threaded.",
+        "DPNEGF_SELF_ENERGY_STORE": "The directory of the content-addressed DPNEGF lead self-energy store shared across tasks and sessions.",
+        "DPNEGF_SELF_ENERGY_STORE_GB": "The size budget (GB) of the self-energy store; least recently used entries are evicted beyond it.",
+        "DPNEGF_ARCHIVE_CODEC": "The codec of DPNEGF snapshot and output archives (tar, gz, zstd, lz4); zstd and lz4 fall back to gz when not installed.",
+        "DPNEGF_ARCHIVE_LEVEL": "The compression level of DPNEGF archives; empty uses the codec default.",
+        "DPNEGF_START_METHOD": "The multiprocessing start method of the concurrent NEGF snapshot workers; fork is only used while the process is single-threaded.",
+        "DPTB_RAG_WARMUP": "Whether the tool server warms the knowledge-base client and embedding model in a background thread at start (1/0).",
+        "DPTB_RAG_CACHE_SIZE": "The number of query embeddings and search results memoized by search_knowledge_base; cleared when the knowledge base is rebuilt.",
+        "DPTB_HTTP_CACHE_DIR": "The on-disk response cache shared by the Materials Project, COD and C2DB tools.",
+        "DPTB_HTTP_CACHE_TTL": "The lifetime (seconds) of cached database responses; 0 disables the cache.",
+        "DPTB_STRUCTURE_INDEX_DIR": "The local SQLite structure index and CIF store searched before the MP/COD/C2DB APIs.",
+        "DPTB_DIMENSIONALITY_WORKERS": "The number of processes used to classify structure dimensionality in Materials Project searches.",
         "_comments": "This dictionary contains the default environment variables for Dptb_Agent."
     }
 }
@@ -14,7 +14,10 @@ def dftio_parse(
         out_hamiltonian: bool = False,
         out_overlap: bool = False,
         out_density_matrix: bool = False,
-        out_eigenvalue: bool = False
+        out_eigenvalue: bool = False,
+        num_workers: int = 1,
+        skip_existing: bool = True,
+        output_path: Path = None
 ) -> DftioParseResult:
     """
     Parse raw DFT outputs into DeePTB/dftio dataset files.
@@ -37,11 +40,22 @@ def dftio_parse(
         Export density matrices.
     out_eigenvalue : bool, optional
         Export eigenvalues.
+    num_workers : int, optional
+        Number of parser processes for ABACUS data. Values above 1 distribute
+        the frames over a process pool.
+    skip_existing : bool, optional
+        Skip frames whose outputs already exist in ``output_path`` and are
+        newer than their ABACUS source folder.
+    output_path : Path, optional
+        Persistent output directory. Re-running with the same directory only
+        parses new or changed frames.
 
     Returns
     -------
     DftioParseResult
         Dictionary with ``output_path`` pointing to the parse result directory.
+        Parallel/incremental runs also report ``timing_file_path`` (per-frame
+        timing JSON) and the ``parsed``/``skipped``/``failed`` frame counts.
     """
     return _dftio_parse(
         work_root=work_root,
@@ -52,4 +66,7 @@ def dftio_parse(
         out_overlap=out_overlap,
         out_density_matrix=out_density_matrix,
         out_eigenvalue=out_eigenvalue,
+        num_workers=num_workers,
+        skip_existing=skip_existing,
+        output_path=output_path,
     )
@@ -1,8 +1,9 @@
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List
 
 from dptb_pilot.tools.init import mcp
 from dptb_pilot.tools.modules.deeptb.results_unified import (
+    BandBatchResult,
     BandCompareResult,
     BandGapResult,
     BandResult,
@@ -12,6 +13,7 @@ from dptb_pilot.tools.modules.deeptb.submodules.band import (
     _band_compare,
     _band_gap,
     _band_predict,
+    _band_predict_batch,
     _band_predict_with_julia,
 )
 from dptb_pilot.tools.modules.deeptb.submodules.hamiltonian import _hamiltonian_predict
@@ -23,7 +25,12 @@ def band_predict(
     kpath: str,
     nel_atom: Dict[str, int],
     kmesh: str = None,
-    work_path: str = "."
+    work_path: str = ".",
+    eig_solver: str = "numpy",
+    num_band: int = 30,
+    pseudo_efermi: float = None,
+    n_workers: int = None,
+    k_chunk_size: int = None
 ) -> BandResult:
     """
     使用输入的SK模型预测结构能带。
@@ -35,9 +42,17 @@ def band_predict(
         nel_atom: Dictionary mapping element symbols to number of valence electrons. Example: {'Si': 4, 'H': 1}
         kmesh: 用于计算费米能级的k点网格，默认为[5,5,5]，格式如"[5,5,5]"
         work_path: 能带信息的保存路径。注意应该是文件夹而不是文件。
+        eig_solver: 本征值求解器，默认"numpy"稠密求解。上千轨道的大超胞可使用"sparse"，
+            以稀疏矩阵shift-invert方法只求解费米能级附近的能带，无需Julia。
+        num_band: eig_solver为"sparse"时每个k点求解的能带数，默认30。
+        pseudo_efermi: eig_solver为"sparse"时的粗费米能级（求解窗口中心），此时必须输入。
+        n_workers: 并行求解k点的进程数，默认读取环境变量DPTB_BAND_N_WORKERS（1为串行）。
+        k_chunk_size: 每个进程任务包含的k点数，默认自动划分。
 
     返回:
-        包含能带文件路径的字典。
+        包含能带文件路径、费米能级、k网格本征值缓存文件路径(.mesh.npz)及网格能隙的字典。
+        稀疏求解时fermi_level_source为"window_gap_midpoint"，费米能级只是窗口内能隙中点的估计值。
+        band_gap工具设置use_mesh=True时读取该缓存，无需再次估计费米能级。
 
     抛出:
         AssumptionError: 某些数据输入不合规。
@@ -49,7 +64,64 @@ def band_predict(
                        kpath=kpath,
                        nel_atom=nel_atom,
                        kmesh=kmesh,
-                       work_path=work_path)
+                       eig_solver=eig_solver,
+                       work_path=work_path,
+                       num_band=num_band,
+                       pseudo_efermi=pseudo_efermi,
+                       n_workers=n_workers,
+                       k_chunk_size=k_chunk_size)
+
+
+@mcp.tool()
+def band_predict_batch(
+    model_file_path: Path,
+    kpath: str,
+    nel_atom: Dict[str, int],
+    structure_file_paths: List[Path] = None,
+    structure_glob: str = None,
+    kmesh: str = None,
+    override_overlap: Path = None,
+    eig_solver: str = "numpy",
+    plot: bool = False,
+    work_path: str = "."
+) -> BandBatchResult:
+    """
+    使用同一个模型批量预测多个结构的能带，适用于应变/掺杂等结构扫描。
+
+    模型只加载一次并在各结构间共享，所有结构的能带结果写入同一个npz文件，
+    第i个结构的数据保存在键"{i:04d}/<name>"下（如"0003/eigenvalues"），
+    另有"structures"和"fermi_levels"两个索引数组。
+
+    参数:
+        model_file_path: 使用的model路径。
+        kpath: K-Path，格式如"[[0.0,0.0,0.0,50,G],[0.5,0.0,0.5,1,X]]"，所有结构共用。
+        nel_atom: Dictionary mapping element symbols to number of valence electrons. Example: {'Si': 4, 'H': 1}
+        structure_file_paths: 结构文件路径列表，结构文件应为vasp的格式。
+        structure_glob: 结构所在文件夹或通配符，如"strain/*.vasp"，可与structure_file_paths同时使用。
+        kmesh: 用于计算费米能级的k点网格，默认为[5,5,5]，格式如"[5,5,5]"
+        override_overlap: 覆盖的overlap文件，使用后覆盖模型产生的overlap，对所有结构生效。
+        eig_solver: 本征值求解器，"numpy"或"torch"。
+        plot: 是否为每个结构输出能带图，默认不输出。
+        work_path: 结果的保存路径。注意应该是文件夹而不是文件。
+
+    返回:
+        包含合并后的能带文件路径、各结构费米能级、图片路径及失败结构列表的字典。
+
+    抛出:
+        FileNotFoundError: 模型文件不存在。
+        ValueError: 没有找到任何结构文件。
+    """
+
+    return _band_predict_batch(model_file_path=model_file_path,
+                               kpath=kpath,
+                               nel_atom=nel_atom,
+                               structure_file_paths=structure_file_paths,
+                               structure_glob=structure_glob,
+                               kmesh=kmesh,
+                               override_overlap=override_overlap,
+                               eig_solver=eig_solver,
+                               plot=plot,
+                               work_path=work_path)
 
 
 @mcp.tool()
@@ -67,7 +139,8 @@ def band_predict_with_julia(
         efermi: float = None,
         pseudo_efermi: float = None,
         julia_script_path: Path = None,
-        num_band: int = 30
+        num_band: int = 30,
+        n_workers: int = None
 ) -> BandResult:
     """
     Predict and plot a DeePTB band structure using the Julia sparse solver workflow.
@@ -101,6 +174,8 @@ def band_predict_with_julia(
         is used.
     num_band : int, optional
         Number of bands requested from the sparse solver.
+    n_workers : int, optional
+        Julia threads used for the k-point loop. Defaults to ``DPTB_BAND_N_WORKERS``.
 
     Returns
     -------
@@ -122,6 +197,7 @@ def band_predict_with_julia(
         pseudo_efermi=pseudo_efermi,
         julia_script_path=julia_script_path,
         num_band=num_band,
+        n_workers=n_workers,
     )
 
 
@@ -130,7 +206,8 @@ def band_gap(
         band_structure_file_path: Path,
         fermi_level: float = None,
         n_atoms: int = None,
-        pseudo_fermi_level: float = None
+        pseudo_fermi_level: float = None,
+        use_mesh: bool = False
 ) -> BandGapResult:
     """
     Calculate the band gap from a DeePTB band-structure file.
@@ -145,6 +222,9 @@ def band_gap(
         Number of atoms for the fallback Fermi-level estimator.
     pseudo_fermi_level : float, optional
         Approximate Fermi level for band-center based gap estimation.
+    use_mesh : bool, optional
+        Use the Fermi level and mesh eigenvalues that ``band_predict`` cached
+        in the ``.mesh.npz`` next to the band file. Off by default.
 
     Returns
     -------
@@ -156,6 +236,7 @@ def band_gap(
         fermi_level=fermi_level,
         n_atoms=n_atoms,
         pseudo_fermi_level=pseudo_fermi_level,
+        use_mesh=use_mesh,
     )
 
 
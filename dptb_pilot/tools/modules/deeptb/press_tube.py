@@ -21,7 +21,8 @@ def generate_press_tube_lammps_tasks(
         deepmd_model_name: str = "MODEL.pb",
         ensemble: str = "min",
         dt: float = 1.0,
-        nsteps: int = 5000
+        nsteps: int = 5000,
+        n_workers: int = 1
 ) -> PressTubeTaskResult:
     """
     Generate LAMMPS indentation tasks for pressing a tube-like structure.
@@ -61,6 +62,8 @@ def generate_press_tube_lammps_tasks(
         MD timestep for non-minimization ensembles.
     nsteps : int, optional
         Minimization iteration cap or MD step count.
+    n_workers : int, optional
+        Number of threads writing indentation task directories concurrently.
 
     Returns
     -------
@@ -82,6 +85,7 @@ def generate_press_tube_lammps_tasks(
         ensemble=ensemble,
         dt=dt,
         nsteps=nsteps,
+        n_workers=n_workers,
     )
     task_root = Path(out_root).absolute()
     task_paths = sorted(p for p in task_root.iterdir() if p.is_dir())
@@ -6,12 +6,27 @@ class ModelResult(TypedDict):
     model_path: Path
 
 
-class BandResult(TypedDict):
+class _BandResultBase(TypedDict):
     band_structure_file_path: Path
     image_file_path: Path
     fermi_level: float
 
 
+class BandResult(_BandResultBase, total=False):
+    fermi_level_source: str
+    mesh_file_path: Path
+    band_gap: float
+
+
+class BandBatchResult(TypedDict):
+    band_batch_file_path: Path
+    structure_count: int
+    fermi_levels: List[float]
+    band_gaps: List[float]
+    image_file_paths: List[Path]
+    failed_structures: List[str]
+
+
 class HamiltonianResult(TypedDict):
     hamiltonian_file_path: Path
     overlap_file_path: Path
@@ -58,10 +73,17 @@ class StructureConvertResult(TypedDict):
     structure_file_path: Path
 
 
-class DftioParseResult(TypedDict):
+class _DftioParseResultBase(TypedDict):
     output_path: Path
 
 
+class DftioParseResult(_DftioParseResultBase, total=False):
+    timing_file_path: Path
+    parsed: int
+    skipped: int
+    failed: int
+
+
 class HamiltonianTestResult(TypedDict):
     stats: Dict[str, Any]
 
@@ -15,7 +15,8 @@ def generate_uniaxial_strain_input_file(
         axis='auto',
         target_length=20,
         model_name='model.pb',
-        relax_after_strain=True
+        relax_after_strain=True,
+        n_workers: int = 1
 ) -> GenerateUniaxialStrainInputResult:
     """
     Generate LAMMPS input files for uniaxial strain calculations along a specified axis.
@@ -64,6 +65,10 @@ def generate_uniaxial_strain_input_file(
         If True, the LAMMPS script will perform structural relaxation after applying
         strain. If False, only a single-point calculation will be performed.
 
+    n_workers : int, optional (default=1)
+        Number of threads writing the strain task directories concurrently.
+        Useful for dense strain sweeps with hundreds of tasks.
+
     Returns
     -------
     GenerateUniaxialStrainInputResult
@@ -109,6 +114,7 @@ def generate_uniaxial_strain_input_file(
                                                 axis=axis,
                                                 target_length=target_length,
                                                 model_name=model_name,
-                                                relax_after_strain=relax_after_strain)
+                                                relax_after_strain=relax_after_strain,
+                                                n_workers=n_workers)
 
 
@@ -86,44 +86,159 @@ import glob
 
 from pathlib import Path
 import re
+import threading
+import warnings
+from collections import OrderedDict
 
 
-def _abacus_get_efermi(abacus_out_path: Path):
-    """
-    从Abacus运行结果中提取费米能级
-    优先使用 running_nscf.log，其次 fallback 到 running_*.log
+_BANDS_CACHE_SIZE = 8
+_bands_cache = OrderedDict()
+_bands_cache_lock = threading.Lock()
+
+
+def read_abacus_bands(band_file: Path) -> np.ndarray:
     """
+    读取 ABACUS 的 BANDS_1.dat 为二维数组，按 路径+大小+mtime 缓存
 
-    # --- 1. 优先选择 running_nscf.log ---
+    第一列为 k 点序号，第二列为 k-path 坐标，其后为各条能带。
+    由 numpy 的 C 解析器 (np.loadtxt) 直接读成浮点数组，不经过 Python 字符串列表；
+    gap、plot 与 compare 工具共享同一次解析结果。返回的数组为只读。
+    """
+    band_file = Path(band_file).absolute()
+    stat = band_file.stat()
+    key = (str(band_file), stat.st_size, stat.st_mtime_ns)
+
+    with _bands_cache_lock:
+        data = _bands_cache.get(key)
+        if data is not None:
+            _bands_cache.move_to_end(key)
+            return data
+
+    try:
+        with warnings.catch_warnings():
+            # 空文件由下面的 size 检查报错
+            warnings.simplefilter("ignore", UserWarning)
+            data = np.loadtxt(band_file, dtype=np.float64, ndmin=2)
+    except ValueError as e:
+        raise ValueError(f"{band_file.name} 各行列数不一致: {e}") from e
+    if data.size == 0:
+        raise ValueError(f"{band_file.name} 为空")
+    data.setflags(write=False)
+
+    with _bands_cache_lock:
+        # 同一路径的旧版本不再有用
+        for stale in [k for k in _bands_cache if k[0] == key[0]]:
+            del _bands_cache[stale]
+        _bands_cache[key] = data
+        while len(_bands_cache) > _BANDS_CACHE_SIZE:
+            _bands_cache.popitem(last=False)
+    return data
+
+
+_LOG_PATTERNS = {
+    "efermi": re.compile(rb"EFERMI\s*=\s*([-\d\.Ee+]+)"),
+    "etot": re.compile(rb"!FINAL_ETOT_IS\s+([-\d\.Ee+]+)"),
+    "nkstot": re.compile(rb"nkstot\s*=\s*(\d+)"),
+    "nkstot_ibz": re.compile(rb"nkstot_ibz\s*=\s*(\d+)"),
+    "nbands": re.compile(rb"NBANDS\s*=\s*(\d+)"),
+}
+
+
+def _select_running_log(abacus_out_path: Path) -> Path:
+    """优先使用 running_nscf.log，其次 fallback 到 running_*.log（scf 优先）"""
     nscf_log = abacus_out_path / "running_nscf.log"
-
     if nscf_log.exists():
-        log_file = nscf_log
-    else:
-        # --- 2. fallback: 查找 running_*.log ---
-        log_files = list(abacus_out_path.glob("running_*.log"))
-        if not log_files:
-            raise FileNotFoundError("未找到 running_nscf.log 或 running_*.log 文件")
-
-        # 可选：优先 scf（更稳定）
-        log_files_sorted = sorted(log_files, key=lambda x: ("scf" not in x.name, x.name))
-        log_file = log_files_sorted[0]
-
-    # --- 3. 正则提取 EFERMI ---
-    pattern = re.compile(r"EFERMI\s*=\s*([-\d\.Ee+]+)")
-
-    efermi = None
-    with open(log_file, "r") as f:
-        for line in f:
-            match = pattern.search(line)
+        return nscf_log
+
+    log_files = list(abacus_out_path.glob("running_*.log"))
+    if not log_files:
+        raise FileNotFoundError("未找到 running_nscf.log 或 running_*.log 文件")
+    return sorted(log_files, key=lambda x: ("scf" not in x.name, x.name))[0]
+
+
+def _scan_running_log(log_file: Path) -> dict:
+    """
+    用内存映射一次扫描 running log，提取费米能级、总能量、收敛标志及k点/能带数
+
+    EFERMI 保持与原先一致取第一次出现的值，总能量取最后一次出现的值。
+    """
+    import mmap
+
+    index = {"efermi": None, "etot": None, "converged": None,
+             "nkstot": None, "nkstot_ibz": None, "nbands": None}
+    if log_file.stat().st_size == 0:
+        return index
+
+    with open(log_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for key in ("efermi", "nkstot", "nkstot_ibz", "nbands"):
+            match = _LOG_PATTERNS[key].search(mm)
+            if match:
+                value = match.group(1).decode()
+                index[key] = float(value) if key == "efermi" else int(value)
+
+        # !FINAL_ETOT_IS 位于日志末尾附近，从最后一次出现处开始匹配
+        pos = mm.rfind(b"!FINAL_ETOT_IS")
+        if pos >= 0:
+            match = _LOG_PATTERNS["etot"].match(mm, pos)
             if match:
-                efermi = float(match.group(1))
-                break
+                index["etot"] = float(match.group(1))
+
+        if mm.rfind(b"convergence has NOT been achieved") >= 0:
+            index["converged"] = False
+        elif mm.rfind(b"convergence is achieved") >= 0:
+            index["converged"] = True
 
-    if efermi is None:
-        raise RuntimeError(f"未在 {log_file.name} 中找到 EFERMI")
+    return index
 
-    return {"efermi": efermi}
+
+def _abacus_log_index(abacus_out_path: Path) -> dict:
+    """
+    获取 ABACUS running log 的索引信息
+
+    首次调用扫描日志并写入 OUT.ABACUS 旁的 ``<OUT.ABACUS>.index.json``，
+    之后只要日志的大小与 mtime 未变就直接读取该 JSON。
+    """
+    import json
+
+    abacus_out_path = Path(abacus_out_path)
+    log_file = _select_running_log(abacus_out_path)
+    stat = log_file.stat()
+    sidecar = abacus_out_path.with_name(abacus_out_path.name + ".index.json")
+
+    entries = {}
+    if sidecar.exists():
+        try:
+            entries = json.loads(sidecar.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            entries = {}
+        entry = entries.get(log_file.name)
+        if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            return dict(entry, log_file=log_file.name)
+
+    entry = _scan_running_log(log_file)
+    entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+    entries[log_file.name] = entry
+    try:
+        tmp = sidecar.with_name(sidecar.name + ".tmp")
+        tmp.write_text(json.dumps(entries, indent=2), encoding="utf-8")
+        tmp.replace(sidecar)
+    except OSError:
+        # 只读的输出目录不影响结果，只是下次需要重新扫描
+        pass
+
+    return dict(entry, log_file=log_file.name)
+
+
+def _abacus_get_efermi(abacus_out_path: Path):
+    """
+    从Abacus运行结果中提取费米能级
+    优先使用 running_nscf.log，其次 fallback 到 running_*.log
+    """
+    index = _abacus_log_index(abacus_out_path)
+    if index["efermi"] is None:
+        raise RuntimeError(f"未在 {index['log_file']} 中找到 EFERMI")
+
+    return {"efermi": index["efermi"]}
 
 
 def _abacus_band_plot(
@@ -146,19 +261,10 @@ def _abacus_band_plot(
     if not band_file.exists():
         raise FileNotFoundError("未找到 BANDS_1.dat")
 
-    data = []
-    with open(band_file, "r") as f:
-        for line in f:
-            if not line.strip():
-                continue
-            parts = line.split()
-            # 第一列: index
-            # 第二列: k-path
-            # 后面: 各个能带
-            values = list(map(float, parts))
-            data.append(values)
-
-    data = np.array(data)
+    # 第一列: index
+    # 第二列: k-path
+    # 后面: 各个能带
+    data = read_abacus_bands(band_file)
 
     kpoints = data[:, 1]
     bands = data[:, 2:]
@@ -220,18 +326,7 @@ def _abacus_band_gap(
     if not band_file.exists():
         raise FileNotFoundError("未找到 BANDS_1.dat")
 
-    import numpy as np
-
-    data = []
-    with open(band_file, "r") as f:
-        for line in f:
-            if not line.strip():
-                continue
-            parts = line.split()
-            values = list(map(float, parts))
-            data.append(values)
-
-    data = np.array(data)
+    data = read_abacus_bands(band_file)
 
     # 能带数据
     bands = data[:, 2:]
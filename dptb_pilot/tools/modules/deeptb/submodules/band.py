@@ -1,18 +1,29 @@
+import functools
 import json
 import os
 import shutil
 import subprocess
 import subprocess as sp
 import tempfile
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List
 
 import numpy as np
-from dptb.postprocess.unified import TBSystem
 
 from matplotlib import image as mpimg, pyplot as plt
 
-from dptb_pilot.tools.modules.deeptb.submodules.abacus import _abacus_get_efermi
+from dptb_pilot.tools.modules.deeptb.submodules.abacus import _abacus_get_efermi, read_abacus_bands
+from dptb_pilot.tools.modules.deeptb.submodules.kpoint_pool import (
+    KPointPool,
+    default_n_workers,
+    dense_eigenvalues,
+)
+from dptb_pilot.tools.modules.deeptb.submodules.sparse_eig import (
+    DEFAULT_NUM_BAND,
+    window_fermi_level,
+)
+from dptb_pilot.tools.modules.deeptb.submodules.tbsystem_cache import build_tbsystem, cached_tbsystem
 from dptb_pilot.tools.modules.util.comm import generate_work_path, temporary_chdir
 from dptb_pilot.tools.modules.util.get_dptb_path import get_dptb_path
 
@@ -76,7 +87,9 @@ def parse_kpath_input(input_str):
 
     return kpath_config
 
-def get_fermi_level(tbsystem, nel_atom, kmesh=None):
+def get_fermi_level(tbsystem, nel_atom, kmesh=None, eig_solver="numpy",
+                    pseudo_efermi=None, num_band=DEFAULT_NUM_BAND,
+                    n_workers=None, k_chunk_size=None, pool=None):
     """
     Calculate the Fermi level of a DeePTB ``TBSystem``.
 
@@ -89,18 +102,48 @@ def get_fermi_level(tbsystem, nel_atom, kmesh=None):
     kmesh : list, optional
         Monkhorst-Pack mesh used for Fermi-level integration. Defaults to
         ``[5, 5, 5]``.
+    eig_solver : str, optional
+        ``"sparse"`` uses the shift-invert solver around ``pseudo_efermi``;
+        ``"numpy"``/``"torch"`` are passed to DeePTB.
+    pseudo_efermi : float, optional
+        Shift for the sparse solver, required with ``eig_solver="sparse"``.
+    num_band : int, optional
+        Number of states around the shift solved per k-point in sparse mode.
+    n_workers : int, optional
+        Worker processes sharing the mesh k-points. Defaults to
+        ``DPTB_BAND_N_WORKERS``; above 1 the mesh is solved here instead of
+        by DeePTB's serial ``get_efermi``.
+    k_chunk_size : int, optional
+        K-points per worker task.
+    pool : KPointPool, optional
+        Open pool to solve the mesh with. Parallel workers need the pool's
+        ``builder``, otherwise the mesh is solved serially.
 
     Returns
     -------
     float
-        Calculated Fermi energy stored on the ``TBSystem``.
+        Calculated Fermi energy stored on the ``TBSystem``; with the sparse
+        solver an estimate from the window gap, not from electron counting.
     """
 
     if kmesh is None:
         kmesh = [5, 5, 5]
 
+    if eig_solver == "sparse":
+        return sparse_electronic_summary(tbsystem, nel_atom, pseudo_efermi, kmesh=kmesh,
+                                         num_band=num_band,
+                                         n_workers=n_workers,
+                                         k_chunk_size=k_chunk_size,
+                                         pool=pool)["fermi_level"]
+    if pool is not None or (n_workers or default_n_workers()) > 1:
+        return electronic_summary(tbsystem, nel_atom, kmesh=kmesh,
+                                  eig_solver=eig_solver,
+                                  n_workers=n_workers,
+                                  k_chunk_size=k_chunk_size,
+                                  pool=pool)["fermi_level"]
+
     tbsystem.set_electrons(nel_atom)
-    tbsystem.get_efermi(kmesh=kmesh)
+    tbsystem.get_efermi(kmesh=kmesh, eig_solver=eig_solver)
 
     return tbsystem.efermi
 
@@ -130,8 +173,177 @@ def find_fermi_level(eigenvalues, n_atoms, valence_electrons=4):
 
     return E_F
 
-from pathlib import Path
-import numpy as np
+def _spin_degeneracy(tbsystem):
+    # same rule as TBSystem.estimate_efermi_e: SOC models carry ``soc_param``
+    return 1 if hasattr(tbsystem.model, "soc_param") else 2
+
+
+def _kpoint_pool(tbsystem, pool, n_workers, k_chunk_size):
+    # a caller-owned pool is reused as is, otherwise a one-shot pool is opened
+    if pool is not None:
+        return nullcontext(pool)
+    return KPointPool(tbsystem, n_workers=n_workers, k_chunk_size=k_chunk_size)
+
+
+def _gap_around(energies, fermi_level):
+    energies = np.ravel(energies)
+    valence = energies[energies <= fermi_level]
+    conduction = energies[energies > fermi_level]
+    if valence.size == 0 or conduction.size == 0:
+        return {"band_gap": 0.0}
+    vbm, cbm = float(valence.max()), float(conduction.min())
+    return {"band_gap": max(cbm - vbm, 0.0), "vbm": vbm, "cbm": cbm}
+
+
+def electronic_summary(tbsystem, nel_atom, kmesh=None, eig_solver="numpy", temperature=300.0,
+                       n_workers=None, k_chunk_size=None, pool=None):
+    """
+    Diagonalize the Fermi k-mesh once and derive Fermi level, occupations and gap.
+
+    This replaces ``tbsystem.get_efermi`` in the band tools: the same
+    Gamma-centred mesh is solved, but the eigenvalues are kept and returned
+    instead of being discarded. The Fermi level comes from DeePTB's
+    ``TBSystem.estimate_efermi_e`` and is stored with ``set_efermi``, so the
+    following ``band.compute`` is aligned to it as before.
+
+    Parameters
+    ----------
+    tbsystem : TBSystem
+        Initialized DeePTB tight-binding system.
+    nel_atom : dict
+        Mapping from element symbol to valence electron count.
+    kmesh : list, optional
+        Gamma-centred k-mesh, defaults to ``[5, 5, 5]``.
+    eig_solver : str, optional
+        DeePTB eigenvalue solver, ``"numpy"`` or ``"torch"``.
+    temperature : float, optional
+        Fermi-Dirac smearing temperature in Kelvin, DeePTB's default.
+    n_workers, k_chunk_size : int, optional
+        K-point parallelism, see :class:`KPointPool`.
+    pool : KPointPool, optional
+        Open pool to evaluate the mesh with; ``n_workers`` and
+        ``k_chunk_size`` are ignored when given.
+
+    Returns
+    -------
+    dict
+        ``kpoints``, ``eigenvalues``, ``occupations`` (including the spin
+        degeneracy), ``fermi_level``, ``fermi_level_source``,
+        ``total_electrons``, ``kmesh`` and the mesh ``band_gap``/``vbm``/``cbm``.
+    """
+    from dptb.postprocess.unified.utils import fermi_dirac_smearing
+    from dptb.utils.constants import Boltzmann, eV2J
+    from dptb.utils.make_kpoints import kmesh_sampling
+
+    if kmesh is None:
+        kmesh = [5, 5, 5]
+
+    tbsystem.set_electrons(nel_atom=nel_atom)
+    kpoints = kmesh_sampling(kmesh, is_gamma_center=True)
+    with _kpoint_pool(tbsystem, pool, n_workers, k_chunk_size) as pool:
+        eigenvalues = pool.eigenvalues(kpoints, eig_solver=eig_solver)
+    fermi_level = float(tbsystem.estimate_efermi_e(eigenvalues=eigenvalues, temperature=temperature))
+    tbsystem.set_efermi(fermi_level)
+    occupations = _spin_degeneracy(tbsystem) * fermi_dirac_smearing(
+        eigenvalues, kT=Boltzmann / eV2J * temperature, mu=fermi_level)
+
+    summary = {
+        "kpoints": kpoints,
+        "eigenvalues": eigenvalues,
+        "occupations": occupations,
+        "fermi_level": fermi_level,
+        "fermi_level_source": "electron_count",
+        "total_electrons": float(tbsystem.total_electrons),
+        "kmesh": np.asarray(kmesh),
+    }
+    summary.update(_gap_around(eigenvalues, fermi_level))
+    return summary
+
+
+def sparse_electronic_summary(tbsystem, nel_atom, pseudo_efermi, kmesh=None,
+                              num_band=DEFAULT_NUM_BAND, n_workers=None, k_chunk_size=None,
+                              pool=None):
+    """
+    Sparse counterpart of :func:`electronic_summary`.
+
+    Only ``num_band`` states around ``pseudo_efermi`` are solved per mesh
+    point, so electrons cannot be counted: the returned Fermi level is an
+    estimate, the centre of the window gap enclosing the shift, and is marked
+    with ``fermi_level_source="window_gap_midpoint"``.
+
+    Returns
+    -------
+    dict
+        Same keys as :func:`electronic_summary` except ``occupations``; the
+        ``eigenvalues`` cover the solved window only.
+    """
+    from dptb.utils.make_kpoints import kmesh_sampling
+
+    if pseudo_efermi is None:
+        raise ValueError("The sparse solver needs pseudo_efermi, the shift of the solved energy window.")
+    if kmesh is None:
+        kmesh = [5, 5, 5]
+
+    tbsystem.set_electrons(nel_atom=nel_atom)
+    kpoints = kmesh_sampling(kmesh, is_gamma_center=True)
+    with _kpoint_pool(tbsystem, pool, n_workers, k_chunk_size) as pool:
+        eigenvalues = pool.eigenvalues(kpoints, solver="sparse", sigma=pseudo_efermi, num_band=num_band)
+    fermi_level = window_fermi_level(eigenvalues, pseudo_efermi)
+    tbsystem.set_efermi(fermi_level)
+
+    summary = {
+        "kpoints": kpoints,
+        "eigenvalues": eigenvalues,
+        "fermi_level": fermi_level,
+        "fermi_level_source": "window_gap_midpoint",
+        "total_electrons": float(tbsystem.total_electrons),
+        "kmesh": np.asarray(kmesh),
+    }
+    summary.update(_gap_around(eigenvalues, fermi_level))
+    return summary
+
+
+def kpath_band_data(tbsystem, kpath_config, eigenvalues_at):
+    """
+    DeePTB band data along ``kpath_config`` with externally evaluated eigenvalues.
+
+    The k-path is expanded by DeePTB's ``abacus_kpath``, as
+    ``band.set_kpath(method="abacus")`` does, and the returned
+    ``BandStructureData`` exports and plots exactly like the result of
+    ``band.compute``; only the eigenvalue evaluation is replaced.
+
+    Parameters
+    ----------
+    tbsystem : TBSystem
+        System whose structure and Fermi level are used.
+    kpath_config : dict
+        Output of :func:`parse_kpath_input`.
+    eigenvalues_at : callable
+        Maps the ``(nk, 3)`` reduced k-points to ``(nk, nbands)`` eigenvalues.
+    """
+    from dptb.postprocess.unified.properties.band import BandStructureData
+    from dptb.utils.make_kpoints import abacus_kpath
+
+    assert kpath_config["method"] == "abacus", "只支持abacus格式的k路径"
+    kpoints, xlist, high_sym_kpoints = abacus_kpath(tbsystem.atoms, kpath_config["kpath"])
+    return BandStructureData(eigenvalues=eigenvalues_at(kpoints),
+                             kpoints=kpoints,
+                             xlist=xlist,
+                             labels=kpath_config["klabels"],
+                             high_sym_kpoints=high_sym_kpoints,
+                             fermi_level=tbsystem.efermi)
+
+
+def mesh_file_path(band_structure_file_path):
+    """Path of the mesh-eigenvalue cache stored next to a band-structure file."""
+    return Path(band_structure_file_path).with_suffix(".mesh.npz")
+
+
+def save_electronic_summary(summary, band_structure_file_path):
+    """Write ``summary`` next to the band-structure file and return its path."""
+    path = mesh_file_path(band_structure_file_path)
+    np.savez(path, **summary)
+    return path
 
 def smart_band_gap(eig, pseudo_fermi_level):
     """
@@ -191,7 +403,8 @@ def smart_band_gap(eig, pseudo_fermi_level):
 def _band_gap(band_structure_file_path: Path,
               fermi_level = None,
               n_atoms = None,
-              pseudo_fermi_level: float = None):
+              pseudo_fermi_level: float = None,
+              use_mesh: bool = False):
     """
     Calculate the band gap from a DeePTB band-structure ``.npz`` or ``.npy`` file.
 
@@ -206,6 +419,10 @@ def _band_gap(band_structure_file_path: Path,
     pseudo_fermi_level : float, optional
         Approximate Fermi level for the band-center based gap estimator. Mutually
         exclusive with ``fermi_level``.
+    use_mesh : bool, optional
+        Use the ``.mesh.npz`` written by ``band_predict`` next to the file: its
+        Fermi level, and the gap over the mesh and k-path eigenvalues together.
+        Ignored when a Fermi input is given; raises if the mesh file is missing.
 
     Returns
     -------
@@ -236,6 +453,16 @@ def _band_gap(band_structure_file_path: Path,
     eig = data["eigenvalues"]
 
     # ---------- 3. 处理费米能级 ----------
+    # use_mesh时读取band_predict在能带文件旁缓存的k网格本征值，使用网格上的费米能级与能隙
+    if use_mesh and fermi_level is None and pseudo_fermi_level is None:
+        mesh_path = mesh_file_path(band_structure_file_path)
+        if not mesh_path.exists():
+            raise FileNotFoundError(f"Mesh file not found: {mesh_path}")
+        with np.load(mesh_path) as mesh:
+            mesh_fermi_level = float(mesh["fermi_level"])
+            energies = np.concatenate([np.ravel(mesh["eigenvalues"]), np.ravel(eig)])
+        return _gap_around(energies, mesh_fermi_level)
+
     if fermi_level is None:
         fermi_level = pseudo_fermi_level
 
@@ -284,7 +511,11 @@ def _band_predict(
         kmesh: str = None,
         override_overlap: Path = None,
         eig_solver: str = "numpy",
-        work_path: str = "."
+        work_path: str = ".",
+        num_band: int = DEFAULT_NUM_BAND,
+        pseudo_efermi: float = None,
+        n_workers: int = None,
+        k_chunk_size: int = None
     ):
     """
     使用输入的模型预测结构能带。
@@ -296,14 +527,23 @@ def _band_predict(
         nel_atom: Dictionary mapping element symbols to number of valence electrons. Example: {'Si': 4, 'H': 1}
         kmesh: 用于计算费米能级的k点网格，默认为[5,5,5]，格式如"[5,5,5]"
         override_overlap: 覆盖的overlap文件，使用后覆盖模型产生的overlap
+        eig_solver: 本征值求解器。"sparse"时使用scipy稀疏矩阵与shift-invert Lanczos，
+            只求解pseudo_efermi附近的num_band个能带，适用于上千轨道的超胞
         work_path: 能带信息的保存路径。注意应该是文件夹而不是文件。
+        num_band: 稀疏求解时每个k点求解的能带数
+        pseudo_efermi: 稀疏求解的shift（粗费米能级），eig_solver为"sparse"时必须输入
+        n_workers: 并行计算k点的进程数，默认读取DPTB_BAND_N_WORKERS（1为串行）
+        k_chunk_size: 每个进程任务包含的k点数
 
     返回:
-        包含能带文件路径的字典。
+        包含能带文件路径、费米能级及其来源、k网格本征值缓存文件路径(.mesh.npz)及网格能隙的字典。
+        fermi_level_source为"electron_count"时费米能级由电子数确定，
+        为"window_gap_midpoint"（稀疏求解）时只是求解窗口内能隙中点的估计值。
 
     抛出:
         AssumptionError: 某些数据输入不合规。
         RuntimeError: 写入配置文件失败。
+        ValueError: 稀疏求解未输入pseudo_efermi。
     """
 
     assert model_file_path, "模型必须输入"
@@ -319,38 +559,228 @@ def _band_predict(
 
     import tempfile
 
-    with tempfile.TemporaryDirectory(dir=_work_path):
-        tbsystem = TBSystem(data=str(structure_file_path),
-                            calculator=str(model_file_path),
-                            override_overlap=str(override_overlap) if override_overlap else None)
+    with tempfile.TemporaryDirectory(dir=_work_path), \
+            cached_tbsystem(model_file_path, structure_file_path, override_overlap) as tbsystem:
         kpath_config = parse_kpath_input(kpath)
 
-        tbsystem.set_electrons(nel_atom=nel_atom)
         if kmesh:
             import ast
             kmesh = ast.literal_eval(kmesh)
         else:
             kmesh = [5,5,5]
-        fermi_level = tbsystem.get_efermi(kmesh=kmesh,
-                                          eig_solver=eig_solver)
-
-        tbsystem.band.set_kpath(**kpath_config)
-        band_data = tbsystem.band.compute(eig_solver=eig_solver)
-
         import time
         timestamp = int(time.time())
         bandstructure_filename = f"bandstructure_{timestamp}"
         output_bandstructure_path = work_dir / bandstructure_filename
-        band_data.export(output_bandstructure_path)
-
         band_img_filename = f"band_{timestamp}.png"
         output_band_img_path = work_dir / band_img_filename
+
+        if eig_solver == "sparse" and pseudo_efermi is None:
+            raise ValueError("eig_solver为sparse时必须输入pseudo_efermi")
+
+        # 串行与并行走同一条路径：k路径由DeePTB展开、导出和绘图，
+        # 只有本征值按块求解；并行时各进程由builder各自加载一次模型
+        builder = functools.partial(build_tbsystem, model_file_path, structure_file_path, override_overlap)
+        with KPointPool(tbsystem, n_workers=n_workers, k_chunk_size=k_chunk_size, builder=builder) as pool:
+            # 费米能级所用k网格只对角化一次，本征值保存供band_gap复用
+            if eig_solver == "sparse":
+                summary = sparse_electronic_summary(tbsystem, nel_atom=nel_atom,
+                                                    pseudo_efermi=pseudo_efermi,
+                                                    kmesh=kmesh,
+                                                    num_band=num_band,
+                                                    pool=pool)
+            else:
+                summary = electronic_summary(tbsystem, nel_atom=nel_atom, kmesh=kmesh,
+                                             eig_solver=eig_solver, pool=pool)
+            fermi_level = summary["fermi_level"]
+
+            band_data = kpath_band_data(
+                tbsystem, kpath_config,
+                lambda kpoints: pool.eigenvalues(kpoints,
+                                                 solver="sparse" if eig_solver == "sparse" else "dense",
+                                                 sigma=fermi_level,
+                                                 num_band=num_band,
+                                                 eig_solver=eig_solver))
+        band_data.export(output_bandstructure_path)
         band_data.plot(filename=output_band_img_path,
                        emin=-25,emax=8)
 
+        output_mesh_path = save_electronic_summary(summary, str(output_bandstructure_path) + '.npz')
+
     return {"band_structure_file_path": str(output_bandstructure_path) + '.npz',
             "image_file_path": output_band_img_path,
-            "fermi_level": fermi_level}
+            "fermi_level": fermi_level,
+            "fermi_level_source": summary["fermi_level_source"],
+            "mesh_file_path": output_mesh_path,
+            "band_gap": summary["band_gap"]}
+
+def _resolve_structure_paths(structure_file_paths: List[Path] = None,
+                             structure_glob: str = None) -> List[Path]:
+    """
+    Collect structure files from an explicit list and/or a directory or glob pattern.
+
+    Parameters
+    ----------
+    structure_file_paths : List[Path], optional
+        Explicit structure files.
+    structure_glob : str, optional
+        A directory (all regular files inside are used) or a glob pattern such
+        as ``strain/*.vasp``.
+
+    Returns
+    -------
+    List[Path]
+        De-duplicated structure paths in input order, glob matches sorted.
+    """
+    paths = [Path(p) for p in (structure_file_paths or [])]
+    if structure_glob:
+        glob_root = Path(structure_glob)
+        if glob_root.is_dir():
+            paths += sorted(p for p in glob_root.iterdir() if p.is_file())
+        else:
+            import glob
+            paths += [Path(p) for p in sorted(glob.glob(structure_glob))]
+
+    resolved = []
+    seen = set()
+    for path in paths:
+        key = path.absolute()
+        if key in seen:
+            continue
+        seen.add(key)
+        resolved.append(path)
+    return resolved
+
+def _band_predict_batch(
+        model_file_path: Path,
+        kpath: str,
+        nel_atom: Dict[str, int],
+        structure_file_paths: List[Path] = None,
+        structure_glob: str = None,
+        kmesh: str = None,
+        override_overlap: Path = None,
+        eig_solver: str = "numpy",
+        plot: bool = False,
+        work_path: str = "."
+    ):
+    """
+    Predict band structures of many structures with one DeePTB model.
+
+    The model is loaded for the first structure and its calculator is shared
+    with the systems of the later structures. The batch keeps them out of the
+    ``TBSystem`` cache, so a large sweep does not evict interactive entries.
+    The k-path is expanded and exported by DeePTB as in :func:`_band_predict`,
+    with all of its k-points evaluated in one call. Results are written to a
+    single consolidated ``.npz`` file in which every array exported by DeePTB
+    for structure ``i`` is stored under the key ``"{i:04d}/{name}"``
+    (e.g. ``"0003/eigenvalues"``), next to the index arrays ``structures``,
+    ``fermi_levels`` and the k-mesh ``band_gaps``.
+
+    Parameters
+    ----------
+    model_file_path : Path
+        DeePTB model file shared by all structures.
+    kpath : str
+        K-path string such as ``[[0.0,0.0,0.0,50,G],[0.5,0.0,0.5,1,X]]``.
+    nel_atom : Dict[str, int]
+        Valence electron counts by element.
+    structure_file_paths : List[Path], optional
+        Structures to evaluate.
+    structure_glob : str, optional
+        Directory or glob pattern adding more structures.
+    kmesh : str, optional
+        K-mesh used for the Fermi level, defaults to ``[5,5,5]``.
+    override_overlap : Path, optional
+        Overlap file replacing the model overlap, applied to every structure.
+    eig_solver : str, optional
+        Eigenvalue solver passed to DeePTB, ``"numpy"`` or ``"torch"``.
+    plot : bool, optional
+        Also write one band plot per structure. Off by default.
+    work_path : str, optional
+        Output directory.
+
+    Returns
+    -------
+    dict
+        Consolidated result file path, per-structure Fermi levels, optional image
+        paths and the structures that failed.
+    """
+    import ast
+    import time
+
+    assert model_file_path, "模型必须输入"
+    model_file_path = Path(model_file_path)
+    if not model_file_path.exists():
+        raise FileNotFoundError(f"Model file not found: {model_file_path}")
+
+    structure_paths = _resolve_structure_paths(structure_file_paths, structure_glob)
+    if not structure_paths:
+        raise ValueError("No structure files given for batch band prediction.")
+
+    work_dir = Path(work_path).absolute()
+    work_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = int(time.time())
+    image_dir = work_dir / f"band_batch_{timestamp}"
+    if plot:
+        image_dir.mkdir(parents=True, exist_ok=True)
+
+    kpath_config = parse_kpath_input(kpath)
+    kmesh = ast.literal_eval(kmesh) if kmesh else [5, 5, 5]
+
+    arrays = {}
+    structure_names = []
+    fermi_levels = []
+    band_gaps = []
+    image_file_paths = []
+    failed_structures = []
+
+    calculator = None
+    with tempfile.TemporaryDirectory(dir=work_dir) as temp_dir:
+        for structure_path in structure_paths:
+            try:
+                tbsystem = build_tbsystem(model_file_path, structure_path, override_overlap,
+                                          calculator=calculator)
+                calculator = tbsystem.calculator
+                summary = electronic_summary(tbsystem, nel_atom=nel_atom, kmesh=kmesh,
+                                             eig_solver=eig_solver, n_workers=1)
+                fermi_level = summary["fermi_level"]
+                band_data = kpath_band_data(
+                    tbsystem, kpath_config,
+                    lambda kpoints: dense_eigenvalues(tbsystem, kpoints, eig_solver=eig_solver))
+
+                idx = len(structure_names)
+                export_path = Path(temp_dir) / f"{idx:04d}"
+                band_data.export(export_path)
+                with np.load(str(export_path) + ".npz", allow_pickle=True) as exported:
+                    for key in exported.files:
+                        arrays[f"{idx:04d}/{key}"] = exported[key]
+
+                if plot:
+                    image_path = image_dir / f"band_{idx:04d}_{structure_path.stem}.png"
+                    band_data.plot(filename=image_path, emin=-25, emax=8)
+                    image_file_paths.append(image_path)
+            except Exception as e:
+                print(f"[band_batch] {structure_path} failed: {e}")
+                failed_structures.append(str(structure_path))
+                continue
+
+            structure_names.append(str(Path(structure_path).absolute()))
+            fermi_levels.append(float(fermi_level))
+            band_gaps.append(summary["band_gap"])
+
+    output_path = work_dir / f"band_batch_{timestamp}.npz"
+    np.savez(output_path,
+             structures=np.array(structure_names),
+             fermi_levels=np.array(fermi_levels),
+             band_gaps=np.array(band_gaps),
+             **arrays)
+
+    return {"band_batch_file_path": output_path,
+            "structure_count": len(structure_names),
+            "fermi_levels": fermi_levels,
+            "band_gaps": band_gaps,
+            "image_file_paths": image_file_paths,
+            "failed_structures": failed_structures}
 
 def _band_predict_with_julia(
         model_file_path: Path,
@@ -366,7 +796,8 @@ def _band_predict_with_julia(
         efermi: float = None,
         pseudo_efermi: float = None,
         julia_script_path: Path = None,
-        num_band: int = 30
+        num_band: int = 30,
+        n_workers: int = None
     ):
     """
     使用输入的模型预测结构能带。
@@ -379,6 +810,7 @@ def _band_predict_with_julia(
         kmesh: 用于计算费米能级的k点网格，默认为[5,5,5]，格式如"[5,5,5]"
         override_overlap: 覆盖的overlap文件，使用后覆盖模型产生的overlap
         work_path: 能带信息的保存路径。注意应该是文件夹而不是文件。
+        n_workers: Julia求解k点使用的线程数(JULIA_NUM_THREADS)，默认读取DPTB_BAND_N_WORKERS
 
     返回:
         包含能带文件路径的字典。
@@ -413,11 +845,9 @@ def _band_predict_with_julia(
     if julia_script_path:
         julia_script_path = julia_script_path.absolute()
 
-    with tempfile.TemporaryDirectory(dir=_work_path) as temp_dir:
+    with tempfile.TemporaryDirectory(dir=_work_path) as temp_dir, \
+            cached_tbsystem(model_file_path, structure_file_path, override_overlap) as tbsystem:
         temp_path = Path(temp_dir)
-        tbsystem = TBSystem(data=str(structure_file_path),
-                            calculator=str(model_file_path),
-                            override_overlap=str(override_overlap) if override_overlap else None)
         kpath_config = parse_kpath_input(kpath)
 
         tbsystem.set_electrons(nel_atom=nel_atom)
@@ -483,9 +913,13 @@ def _band_predict_with_julia(
         print(f"Running Julia command: {' '.join(cmd)}")
         print("This may take a moment...")
 
+        # the Julia script loops over k-points itself, so parallelism is handed over as threads
+        julia_env = dict(os.environ)
+        julia_env["JULIA_NUM_THREADS"] = str(n_workers or default_n_workers())
+
         try:
             # Run the script
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True, env=julia_env)
             print("Julia Execution Successful!")
         except subprocess.CalledProcessError as e:
             print("Julia script failed with error:")
@@ -510,7 +944,6 @@ def _band_predict_with_julia(
             print(f"calculated fermi level = {ef}")
 
 
-        import matplotlib.pyplot as plt
         plt.figure(figsize=(6, 5))
 
         x = data["xlist"]
@@ -531,6 +964,7 @@ def _band_predict_with_julia(
         band_img_filename = f"band_{timestamp}.png"
         output_band_img_path = work_dir / band_img_filename
         plt.savefig(output_band_img_path, dpi=300)
+        plt.close()
 
         bandstructure_filename = f"bandstructure_{timestamp}.npy"
         output_bandstructure_path = work_dir / bandstructure_filename
@@ -590,17 +1024,7 @@ def _band_compare(
             f"未找到 DFT 能带文件: {band_file}"
         )
 
-    dft_data = []
-    with open(band_file, "r") as f:
-        for line in f:
-            if not line.strip():
-                continue
-
-            parts = line.split()
-            values = list(map(float, parts))
-            dft_data.append(values)
-
-    dft_data = np.array(dft_data)
+    dft_data = read_abacus_bands(band_file)
 
     dft_kpoints = dft_data[:, 1]
     dft_band = dft_data[:, 2:]
@@ -5,11 +5,92 @@ import subprocess as sp
 import tempfile
 import os
 import shutil
-from dftio.io.abacus.abacus_parser import AbacusParser
 from tqdm import tqdm
 
 from dptb_pilot.tools.modules.util.comm import generate_work_path
 
+# 每种导出量在帧输出目录中对应的文件
+_FRAME_OUTPUT_FILES = {
+    "hamiltonian": "hamiltonians.h5",
+    "overlap": "overlaps.h5",
+    "density_matrix": "density_matrices.h5",
+    "eigenvalue": "eigenvalues.npy",
+}
+# 帧序号 -> 写出该帧的ABACUS源目录，源目录增删导致序号移位时据此判断输出是否过期
+_FRAME_SOURCES_FILE = "frame_sources.json"
+
+_worker_parser = None
+
+
+def _abacus_parser(root: str, prefix: str):
+    from dftio.io.abacus.abacus_parser import AbacusParser
+
+    return AbacusParser(root=root, prefix=prefix)
+
+
+def _latest_mtime(path: Path) -> float:
+    """Newest modification time of ``path`` and everything below it."""
+    latest = path.stat().st_mtime
+    if path.is_dir():
+        for child in path.rglob("*"):
+            latest = max(latest, child.stat().st_mtime)
+    return latest
+
+
+def _read_frame_sources(outroot: Path) -> dict:
+    import json
+
+    try:
+        with open(outroot / _FRAME_SOURCES_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _frame_is_current(outroot: Path, idx: int, source: Path, wanted: list, frame_sources: dict) -> bool:
+    """
+    Whether frame ``idx`` was already written from ``source`` and is newer than it.
+
+    ``AbacusParser`` names frame folders ``<formula>.<idx>``, so the folder is
+    located by its index suffix; ``frame_sources`` (the previous run's
+    ``frame_sources.json``) tells which source that index was written from.
+    """
+    if not wanted or frame_sources.get(str(idx)) != str(source):
+        return False
+    source_mtime = None
+    for frame_dir in outroot.glob(f"*.{idx}"):
+        outputs = [frame_dir / name for name in wanted]
+        if not all(path.exists() for path in outputs):
+            continue
+        if source_mtime is None:
+            source_mtime = _latest_mtime(source)
+        if min(path.stat().st_mtime for path in outputs) > source_mtime:
+            return True
+    return False
+
+
+def _init_parse_worker(make_parser, root: str, prefix: str):
+    global _worker_parser
+    _worker_parser = make_parser(root, prefix)
+
+
+def _write_frame(parser, idx: int, write_kwargs: dict):
+    """Write one frame with ``parser`` and return ``(idx, seconds, error)``."""
+    import time
+
+    start = time.perf_counter()
+    try:
+        parser.write_hdf5(idx=int(idx), **write_kwargs)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return idx, time.perf_counter() - start, error
+
+
+def _write_frame_in_worker(idx: int, write_kwargs: dict):
+    return _write_frame(_worker_parser, idx, write_kwargs)
+
+
 def _dftio_parse_abacus(
         work_root: Path,
         prefix: str = "abacus",
@@ -17,7 +98,9 @@ def _dftio_parse_abacus(
         out_hamiltonian: bool = False,
         out_overlap: bool = False,
         out_density_matrix: bool = False,
-        out_eigenvalue: bool = False
+        out_eigenvalue: bool = False,
+        num_workers: int = 1,
+        skip_existing: bool = True
     ):
     """
     Parse ABACUS raw calculation folders with the Python ``dftio`` parser.
@@ -29,33 +112,106 @@ def _dftio_parse_abacus(
     prefix : str, optional
         Dataset folder prefix used by ``AbacusParser``.
     output_dir_name : str, optional
-        Name of the parser output directory.
+        Parser output directory; relative paths are resolved against the
+        current directory.
     out_hamiltonian, out_overlap, out_density_matrix, out_eigenvalue : bool
         Select which quantities should be written to HDF5 files.
+    num_workers : int, optional
+        Number of parser processes. Frame indices are distributed over a
+        process pool in which every worker owns its own ``AbacusParser``.
+        Workers are started with ``forkserver`` (``spawn`` where unavailable),
+        never forked from the multi-threaded tool server.
+    skip_existing : bool, optional
+        Skip frames whose requested output files were written from the same
+        source folder and are newer than every file in it.
 
-    Notes
-    -----
-    This helper writes parser outputs through ``AbacusParser.write_hdf5`` and does
-    not currently return the generated paths.
+    Returns
+    -------
+    dict
+        ``output_path``, ``timing_file_path`` (per-frame JSON report) and the
+        ``parsed``, ``skipped`` and ``failed`` frame counts.
     """
+    import json
+    import multiprocessing as mp
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
     work_root = work_root.absolute()
+    outroot = Path(output_dir_name).absolute()
+    outroot.mkdir(parents=True, exist_ok=True)
 
-    parser = AbacusParser(
-        root=str(work_root),
-        prefix=prefix,
-    )
+    parser = _abacus_parser(str(work_root), prefix)
     num_entries = len(parser.raw_datas)
 
-    for idx in tqdm(range(num_entries)):
-        parser.write_hdf5(
-            idx=int(idx),
-            hamiltonian=out_hamiltonian,
-            overlap=out_overlap,
-            outroot=output_dir_name,
-            eigenvalue=out_eigenvalue,
-            density_matrix=out_density_matrix,
-            band_index_min=0
-        )
+    write_kwargs = dict(
+        hamiltonian=out_hamiltonian,
+        overlap=out_overlap,
+        outroot=str(outroot),
+        eigenvalue=out_eigenvalue,
+        density_matrix=out_density_matrix,
+        band_index_min=0
+    )
+    wanted = [_FRAME_OUTPUT_FILES[key] for key, flag in (
+        ("hamiltonian", out_hamiltonian),
+        ("overlap", out_overlap),
+        ("density_matrix", out_density_matrix),
+        ("eigenvalue", out_eigenvalue),
+    ) if flag]
+
+    frame_sources = _read_frame_sources(outroot)
+    frames = {}
+    todo = []
+    for idx in range(num_entries):
+        source = Path(parser.raw_datas[idx])
+        frames[idx] = {"idx": idx, "source": str(source), "status": "pending", "seconds": 0.0}
+        if skip_existing and _frame_is_current(outroot, idx, source, wanted, frame_sources):
+            frames[idx]["status"] = "skipped"
+            continue
+        if frame_sources.get(str(idx), str(source)) != str(source):
+            # 序号已移位到另一个源目录，旧帧目录的化学式可能不同，不会被覆盖
+            for stale in outroot.glob(f"*.{idx}"):
+                if stale.is_dir():
+                    shutil.rmtree(stale)
+        todo.append(idx)
+    # 源目录减少后，超出帧数的旧帧目录不再对应任何源
+    for idx in frame_sources:
+        if int(idx) >= num_entries:
+            for stale in outroot.glob(f"*.{idx}"):
+                if stale.is_dir():
+                    shutil.rmtree(stale)
+
+    def record(idx, seconds, error):
+        frames[idx]["seconds"] = round(seconds, 3)
+        frames[idx]["status"] = "failed" if error else "parsed"
+        if error:
+            frames[idx]["error"] = error
+
+    if num_workers <= 1 or len(todo) <= 1:
+        for idx in tqdm(todo):
+            record(*_write_frame(parser, idx, write_kwargs))
+    else:
+        method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        with ProcessPoolExecutor(max_workers=min(num_workers, len(todo)),
+                                 mp_context=mp.get_context(method),
+                                 initializer=_init_parse_worker,
+                                 initargs=(_abacus_parser, str(work_root), prefix)) as pool:
+            futures = [pool.submit(_write_frame_in_worker, idx, write_kwargs) for idx in todo]
+            for future in tqdm(as_completed(futures), total=len(futures)):
+                record(*future.result())
+
+    with open(outroot / _FRAME_SOURCES_FILE, "w") as f:
+        json.dump({str(idx): frame["source"] for idx, frame in frames.items()
+                   if frame["status"] in ("parsed", "skipped")}, f, indent=2)
+
+    counts = {status: sum(frame["status"] == status for frame in frames.values())
+              for status in ("parsed", "skipped", "failed")}
+    timing_file_path = outroot / "parse_timing.json"
+    with open(timing_file_path, "w") as f:
+        json.dump({"num_workers": num_workers, **counts,
+                   "frames": [frames[idx] for idx in range(num_entries)]}, f, indent=2)
+
+    return {"output_path": outroot,
+            "timing_file_path": timing_file_path,
+            **counts}
 
 def _dftio_parse(
         work_root: Path,
@@ -65,11 +221,18 @@ def _dftio_parse(
         out_hamiltonian: bool = False,
         out_overlap: bool = False,
         out_density_matrix: bool = False,
-        out_eigenvalue: bool = False
+        out_eigenvalue: bool = False,
+        num_workers: int = 1,
+        skip_existing: bool = True,
+        output_path: Path = None
     ):
     """
     Convert DFT output folders into DeePTB/dftio training data with the ``dftio`` CLI.
 
+    ABACUS data is parsed in-process by :func:`_dftio_parse_abacus` instead
+    when ``num_workers`` is larger than 1 or a persistent ``output_path`` is
+    given, which enables the worker pool and the incremental skip.
+
     Parameters
     ----------
     work_root : Path
@@ -82,6 +245,12 @@ def _dftio_parse(
         Name of the copied output directory under the generated work path.
     out_hamiltonian, out_overlap, out_density_matrix, out_eigenvalue : bool
         Flags controlling which physical quantities are exported.
+    num_workers : int, optional
+        Number of parser processes.
+    skip_existing : bool, optional
+        Skip frames already parsed into ``output_path`` after their source changed last.
+    output_path : Path, optional
+        Persistent output directory reused across calls.
 
     Returns
     -------
@@ -97,6 +266,19 @@ def _dftio_parse(
 
     assert work_root, "根路径必须输入"
 
+    if mode == "abacus" and (num_workers > 1 or output_path):
+        return _dftio_parse_abacus(
+            work_root=Path(work_root),
+            prefix=prefix,
+            output_dir_name=str(output_path or work_path / output_dir_name),
+            out_hamiltonian=out_hamiltonian,
+            out_overlap=out_overlap,
+            out_density_matrix=out_density_matrix,
+            out_eigenvalue=out_eigenvalue,
+            num_workers=num_workers,
+            skip_existing=skip_existing,
+        )
+
     with tempfile.TemporaryDirectory(dir=work_path) as temp_dir:
         temp_path = Path(temp_dir)
 
@@ -1,7 +1,8 @@
 from pathlib import Path
 
 import numpy as np
-from dptb.postprocess.unified import TBSystem
+
+from dptb_pilot.tools.modules.deeptb.submodules.tbsystem_cache import cached_tbsystem
 
 
 def _hamiltonian_predict(
@@ -41,10 +42,8 @@ def _hamiltonian_predict(
 
     import tempfile
 
-    with tempfile.TemporaryDirectory(dir=work_path):
-        tbsystem = TBSystem(data=str(structure_file_path),
-                            calculator=str(model_file_path),
-                            override_overlap=str(override_overlap) if override_overlap else None)
+    with tempfile.TemporaryDirectory(dir=work_path), \
+            cached_tbsystem(model_file_path, structure_file_path, override_overlap) as tbsystem:
         import ast
         k_points = ast.literal_eval(k_points)
 
@@ -0,0 +1,210 @@
+"""
+K-point parallel eigenvalue evaluation for DeePTB ``TBSystem`` objects.
+
+K-points are split into chunks and evaluated by a process pool. Chunks are
+returned by ``ProcessPoolExecutor.map`` in submission order, so the merged eigenvalues keep
+the input k order, and every chunk is solved by the same DeePTB call in serial
+and parallel runs.
+
+The tool server is multi-threaded, and forking it with a loaded torch model can
+deadlock a child on a lock held by another thread. Workers are therefore
+started with ``forkserver`` (``spawn`` where unavailable) and rebuild the
+``TBSystem`` once, in their initializer, from a picklable ``builder``.
+``DPTB_BAND_START_METHOD=fork`` shares the parent's system copy-on-write
+instead; it is only honoured while the process runs a single thread. A
+worker that fails to start or dies breaks the pool and is reported as an
+error rather than leaving the caller waiting for its chunks.
+"""
+import multiprocessing as mp
+import os
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from dptb_pilot.tools.modules.deeptb.submodules.sparse_eig import (
+    DEFAULT_NUM_BAND,
+    sparse_eigenvalues,
+)
+
+DEFAULT_K_CHUNK_SIZE = 64
+DEFAULT_START_METHOD = "forkserver"
+
+# system evaluated by this worker, set by the initializer
+_worker_tbsystem = None
+
+
+def default_n_workers() -> int:
+    """Worker count from ``DPTB_BAND_N_WORKERS``, 1 (serial) when unset."""
+    return max(int(os.environ.get("DPTB_BAND_N_WORKERS", 1)), 1)
+
+
+def _safe_start_method() -> str:
+    return DEFAULT_START_METHOD if DEFAULT_START_METHOD in mp.get_all_start_methods() else "spawn"
+
+
+def default_start_method() -> str:
+    """Start method from ``DPTB_BAND_START_METHOD``, ``forkserver`` when unset or unavailable."""
+    method = os.environ.get("DPTB_BAND_START_METHOD", DEFAULT_START_METHOD)
+    return method if method in mp.get_all_start_methods() else _safe_start_method()
+
+
+def dense_eigenvalues(tbsystem, k_points, eig_solver: str = "numpy"):
+    """
+    All eigenvalues of ``tbsystem`` at ``k_points``, shape ``(nk, norb)``.
+
+    The k-points are attached to a shallow copy of the atomic data and solved
+    by the calculator's ``get_eigenvalues``, exactly as ``TBSystem.get_efermi``
+    does, so a chunked evaluation gives the same values as one DeePTB call.
+    """
+    import torch
+    from dptb.data import AtomicDataDict
+
+    calculator = tbsystem.calculator
+    k_tensor = torch.as_tensor(np.asarray(k_points), dtype=calculator.dtype, device=calculator.device)
+    data = tbsystem.data.copy()
+    data[AtomicDataDict.KPOINT_KEY] = torch.nested.as_nested_tensor([k_tensor])
+    _, eigenvalues = calculator.get_eigenvalues(data, solver=eig_solver)
+    return eigenvalues.detach().cpu().numpy()
+
+
+def _evaluate(tbsystem, k_points, solver, sigma, num_band, eig_solver):
+    if solver == "sparse":
+        return sparse_eigenvalues(tbsystem, k_points, sigma=sigma, num_band=num_band)
+    return dense_eigenvalues(tbsystem, k_points, eig_solver=eig_solver)
+
+
+def _init_worker(builder, tbsystem=None):
+    global _worker_tbsystem
+
+    # one BLAS/torch thread per worker, otherwise n_workers x n_threads oversubscribe the host
+    try:
+        import torch
+
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    # a forked worker is handed the parent's system without pickling it
+    _worker_tbsystem = tbsystem if tbsystem is not None else builder()
+
+
+def _evaluate_chunk(args):
+    return _evaluate(_worker_tbsystem, *args)
+
+
+class KPointPool:
+    """
+    Evaluate eigenvalues of one ``TBSystem`` in k-point chunks, across processes if ``n_workers > 1``.
+
+    The workers are started on the first parallel call and reused until
+    :meth:`close`, so a band request loads the model once per worker for both
+    the Fermi mesh and the k-path.
+
+    Parameters
+    ----------
+    tbsystem : TBSystem
+        Initialized DeePTB tight-binding system, used for serial evaluation
+        and inherited by forked workers.
+    n_workers : int, optional
+        Number of worker processes. Defaults to ``DPTB_BAND_N_WORKERS``; 1 runs
+        serially in the calling process.
+    k_chunk_size : int, optional
+        K-points per task. Also bounds the dense ``H(k)`` stack held in memory
+        at once. Defaults to 64 or an even split over the workers, whichever is smaller.
+    builder : callable, optional
+        Picklable zero-argument callable returning a ``TBSystem`` equivalent
+        to ``tbsystem``, called once per ``forkserver``/``spawn`` worker.
+        Without it only the ``fork`` start method can run in parallel.
+    start_method : str, optional
+        Multiprocessing start method, defaults to ``DPTB_BAND_START_METHOD``.
+    """
+
+    def __init__(self, tbsystem, n_workers: int = None, k_chunk_size: int = None,
+                 builder=None, start_method: str = None):
+        self.tbsystem = tbsystem
+        self.n_workers = default_n_workers() if n_workers is None else max(int(n_workers), 1)
+        self.k_chunk_size = k_chunk_size
+        self.builder = builder
+        self.start_method = start_method or default_start_method()
+        self._pool = None
+        self._serial = self.n_workers == 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _get_pool(self):
+        if self._pool is not None or self._serial:
+            return self._pool
+        method = self.start_method
+        if method == "fork" and threading.active_count() > 1:
+            warnings.warn("Forking a multi-threaded process with a loaded model is unsafe; "
+                          f"k-point workers use {_safe_start_method()} instead.", RuntimeWarning)
+            method = _safe_start_method()
+        if method != "fork" and self.builder is None:
+            warnings.warn(f"No TBSystem builder for {method} workers; k-points are evaluated serially.",
+                          RuntimeWarning)
+            self._serial = True
+            return None
+        initargs = (None, self.tbsystem) if method == "fork" else (self.builder,)
+        self._pool = ProcessPoolExecutor(self.n_workers, mp_context=mp.get_context(method),
+                                         initializer=_init_worker, initargs=initargs)
+        return self._pool
+
+    def eigenvalues(self, k_points, solver: str = "dense", sigma: float = 0.0,
+                    num_band: int = DEFAULT_NUM_BAND, eig_solver: str = "numpy"):
+        """
+        Eigenvalues at ``k_points`` in input k order, shape ``(nk, nbands)``.
+
+        Parameters
+        ----------
+        k_points : array_like
+            Reduced k-points with shape ``(nk, 3)``.
+        solver : str
+            ``"dense"`` for all eigenvalues, ``"sparse"`` for the ``num_band``
+            states nearest ``sigma``.
+        eig_solver : str
+            DeePTB solver of the dense path, ``"numpy"`` or ``"torch"``.
+        """
+        k_points = np.asarray(k_points, dtype=float).reshape(-1, 3)
+        k_chunk_size = self.k_chunk_size
+        if k_chunk_size is None:
+            k_chunk_size = min(DEFAULT_K_CHUNK_SIZE, -(-len(k_points) // self.n_workers))
+        k_chunk_size = max(int(k_chunk_size), 1)
+        tasks = [(k_points[i:i + k_chunk_size], solver, sigma, num_band, eig_solver)
+                 for i in range(0, len(k_points), k_chunk_size)]
+
+        pool = self._get_pool() if len(tasks) > 1 else None
+        if pool is None:
+            return np.concatenate([_evaluate(self.tbsystem, *task) for task in tasks])
+        try:
+            return np.concatenate(list(pool.map(_evaluate_chunk, tasks)))
+        except BrokenProcessPool as e:
+            self.close()
+            raise RuntimeError(f"A k-point worker process failed to start or died: {e}") from e
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def parallel_eigenvalues(tbsystem, k_points, n_workers: int = None, k_chunk_size: int = None,
+                         solver: str = "dense", sigma: float = 0.0,
+                         num_band: int = DEFAULT_NUM_BAND, eig_solver: str = "numpy",
+                         builder=None):
+    """
+    One-shot :class:`KPointPool` evaluation of ``tbsystem`` at ``k_points``.
+
+    Returns
+    -------
+    numpy.ndarray
+        Eigenvalues in input k order, shape ``(nk, nbands)``.
+    """
+    with KPointPool(tbsystem, n_workers=n_workers, k_chunk_size=k_chunk_size, builder=builder) as pool:
+        return pool.eigenvalues(k_points, solver=solver, sigma=sigma, num_band=num_band,
+                                eig_solver=eig_solver)
@@ -6,7 +6,7 @@ from ase import Atoms
 from ase.io import write, read
 import subprocess as sp
 
-from dptb_pilot.tools.modules.util.comm import generate_work_path
+from dptb_pilot.tools.modules.util.comm import generate_work_path, lammps_id_ranges
 
 
 def write_lammps_data(ase_atoms: Atoms, path: str, specorder=None):
@@ -24,18 +24,17 @@ def write_lammps_data(ase_atoms: Atoms, path: str, specorder=None):
 
 def generate_group_lines_by_ranges(mobile_count, fixed_ids=[], indenter_ids=[]):
     """
-    生成较为简单的 group 定义文本，fixed_ids, indenter_ids 是 atom id (1-based) 列表
+    生成较为简单的 group 定义文本，fixed_ids, indenter_ids 是 atom id (1-based) 列表或数组
+    连续的 id 以 LAMMPS 的区间语法（如 id 1:5000 8000:9000）写出
     """
     lines = []
-    if fixed_ids:
-        ids = " ".join(map(str, sorted(set(fixed_ids))))
-        lines.append(f"group fixed id {ids}")
+    if len(fixed_ids):
+        lines.append(f"group fixed id {lammps_id_ranges(fixed_ids)}")
         lines.append("group mobile subtract all fixed")
     else:
         lines.append("group mobile all")
-    if indenter_ids:
-        ids = " ".join(map(str, sorted(set(indenter_ids))))
-        lines.append(f"group indenter id {ids}")
+    if len(indenter_ids):
+        lines.append(f"group indenter id {lammps_id_ranges(indenter_ids)}")
         # remove indenter from mobile
         lines.append("group mobile subtract indenter")
     return "\n".join(lines)
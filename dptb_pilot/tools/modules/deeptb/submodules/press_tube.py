@@ -1,12 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import numpy as np
+from ase.data import atomic_masses, atomic_numbers
 from ase.io import read
 
 from dptb_pilot.tools.modules.deeptb.submodules.lammps import write_lammps_data, generate_group_lines_by_ranges
 from dptb_pilot.tools.modules.deeptb.submodules.supercell import build_supercell, make_cylinder_indenter
 
 
+def _end_mask(coords, lower, upper, margin):
+    """Atoms within ``margin`` of either end of the tube along its axis."""
+    return (coords < (lower + margin)) | (coords > (upper - margin))
+
+
+def _ensemble_block(ensemble, dt, nsteps):
+    if ensemble.lower() == "min":
+        return (
+            "thermo          100\n"
+            "min_style       cg\n"
+            f"minimize        1e-6 1e-8 1000 {nsteps}\n"
+        )
+    if ensemble.lower() == "nvt":
+        return (
+            f"velocity        mobile create 300 12345 mom yes rot yes dist gaussian\n"
+            f"fix             1 mobile nvt temp 300 300 0.1\n"
+            "thermo          100\n"
+            f"timestep        {dt}\n"
+            f"run             {nsteps}\n"
+        )
+    return (
+        f"velocity        mobile create 300 12345 mom yes rot yes dist gaussian\n"
+        f"fix             1 mobile nve\n"
+        "thermo          100\n"
+        f"timestep        {dt}\n"
+        f"run             {nsteps}\n"
+    )
+
+
 def build_and_generate(poscar_path: str,
                        out_root: str = "tasks_indents",
                        target_length: float = 100.0,
@@ -17,16 +48,22 @@ def build_and_generate(poscar_path: str,
                        indent_depths=None,
                        indenter_spacing=1.42,
                        indenter_symbol='C',
+                       indenter_lattice='simple_cubic',
+                       indenter_min_distance=None,
                        deepmd_model_name="MODEL.pb",
                        ensemble='min',
                        dt=1.0,
-                       nsteps=5000):
+                       nsteps=5000,
+                       n_workers=1):
     """
     poscar_path: POSCAR 或 VASP 结构路径 (ASE 可读)
     target_length: 希望的轴向长度 (Å)
     indent_depths: list of lateral offsets (Å) 表示 indenter 距离中心轴的横向距离；值越小表示越深（靠近管子）
     indenter_radius: 柱半径 (Å)
     indenter_height_factor: indenter 高度 = cell_axis_length * factor
+    indenter_lattice: indenter 晶格类型 'simple_cubic' / 'fcc' / 'graphite'
+    indenter_min_distance: 若给出，去掉与管子原子（含周期镜像）距离小于该值 (Å) 的 indenter 原子
+    n_workers: 并行写任务目录的线程数，supercell 与不随任务变化的输入块只构建一次
     """
     poscar_path = Path(poscar_path)
     out_root = Path(out_root)
@@ -70,22 +107,27 @@ def build_and_generate(poscar_path: str,
         # ensure descending (from far -> near)
         indent_depths = sorted(indent_depths, reverse=True)
 
-    # For writing lammps data we will append indenter atoms to the supercell copy
-    for i, lateral in enumerate(indent_depths):
+    # task-invariant pieces: fixed atoms of the tube, element order, mass/pair/ensemble blocks
+    # fix atoms in the first and last ~5Å of cell along axis
+    margin = min((axis_length * 0.05), 5.0)
+    tube_fixed_mask = _end_mask(positions[:, axis_idx], z_min, z_max, margin)
+    unique_syms = list(dict.fromkeys(supercell.get_chemical_symbols() + [indenter_symbol]))
+    mass_block = "\n".join(f"mass {i_sym} {float(atomic_masses[atomic_numbers[sym]]):.6f}  # {sym}"
+                            for i_sym, sym in enumerate(unique_syms, start=1))
+    # pair coeff placeholder (user must adjust model path)
+    # If multiple species exist, the user should tailor pair_coeff
+    pair_coeff_line = f"pair_style      deepmd {deepmd_model_name}\npair_coeff      * * {' '.join(unique_syms)}\n"
+    ensemble_block = _ensemble_block(ensemble, dt, nsteps)
+
+    def write_task(i, lateral):
         task_name = f"indent_{i:02d}_lat{lateral:.2f}A"
         task_dir = out_root / task_name
-        task_dir.mkdir(parents=True, exist_ok=True)
-
-        # copy supercell
-        atoms_copy = supercell.copy()
 
         # choose cylinder center coordinates:
         # put cylinder center at (cx_pos, cy_pos, base_z)
-        # place cylinder axis parallel to axis vector -> we assume axis_idx is 2 (z) common case
-        # we will put cylinder axis along y if axis_idx==2? to keep generality:
         # we choose coordinates such that cylinder axis is perpendicular to tube axis:
         if axis_idx == 2:
-            # tube axis along z; cylinder axis along y; so cylinder center x = center_x +/- lateral
+            # tube axis along z; cylinder center x = center_x +/- lateral
             cx_pos = 0.5 * (x_min + x_max) + lateral
             cy_pos = 0.5 * (y_min + y_max)
             cz_pos = base_z
@@ -103,87 +145,33 @@ def build_and_generate(poscar_path: str,
                                      radius=indenter_radius,
                                      height=indenter_height,
                                      spacing=indenter_spacing,
-                                     symbol=indenter_symbol)
-        # translate indenter slightly to avoid overlap
-        # place it so its bottom base at cz_pos and cylinder extends +z
-        # concatenate atoms
+                                     symbol=indenter_symbol,
+                                     lattice=indenter_lattice,
+                                     exclude_positions=positions,
+                                     min_distance=indenter_min_distance,
+                                     cell=cell,
+                                     pbc=supercell.pbc)
         if len(ind) == 0:
             print(f"[warn] indenter empty at lateral={lateral:.2f} Å, skipping")
-            continue
+            return
+        task_dir.mkdir(parents=True, exist_ok=True)
 
-        # append indenter atoms to atoms_copy
-        atoms_all = atoms_copy + ind
+        # append indenter atoms to the supercell
+        atoms_all = supercell + ind
 
         # write lammps.data
-        data_path = task_dir / "lammps.data"
-        # we pick specorder so that 'C' appears once (all C)
-        specorder = None
-        write_lammps_data(atoms_all, str(data_path), specorder=specorder)
+        write_lammps_data(atoms_all, str(task_dir / "lammps.data"), specorder=None)
 
-        # find indices for indenter atoms (they are the last N atoms)
+        # indenter atoms are the last N atoms, 1-based ids for LAMMPS
         N_total = len(atoms_all)
-        N_ind = len(ind)
-        indenter_ids = list(range(N_total - N_ind + 1, N_total + 1))  # 1-based indices for LAMMPS
-        # optionally pick fixed atoms near ends: choose atoms with z < z_min + margin or z > z_max - margin
-        positions_all = atoms_all.get_positions()
-        fixed_ids = []
-        # fix atoms in the first and last ~5Å of cell along axis
-        margin = min((axis_length * 0.05), 5.0)
-        for idx, pos in enumerate(positions_all):
-            coord = pos[axis_idx]
-            if coord < (z_min + margin) or coord > (z_max - margin):
-                fixed_ids.append(idx + 1)
-
-        group_lines = generate_group_lines_by_ranges(mobile_count=len(atoms_all), fixed_ids=fixed_ids,
+        indenter_ids = np.arange(N_total - len(ind) + 1, N_total + 1)
+        fixed_mask = np.concatenate([tube_fixed_mask,
+                                     _end_mask(ind.positions[:, axis_idx], z_min, z_max, margin)])
+        fixed_ids = np.flatnonzero(fixed_mask) + 1
+        group_lines = generate_group_lines_by_ranges(mobile_count=N_total, fixed_ids=fixed_ids,
                                                      indenter_ids=indenter_ids)
 
-        # create in.lammps content
-        in_path = task_dir / "in.lammps"
-        with open(in_path, "w", encoding="utf-8") as fh:
-            # mass lines: simple mapping for elements present
-            unique_syms = []
-            for s in atoms_all.get_chemical_symbols():
-                if s not in unique_syms:
-                    unique_syms.append(s)
-            # mass lines
-            mass_lines = []
-            from ase.data import atomic_numbers, atomic_masses
-            for i_sym, sym in enumerate(unique_syms, start=1):
-                z = atomic_numbers[sym]
-                mass_lines.append(f"mass {i_sym} {float(atomic_masses[z]):.6f}  # {sym}")
-            mass_block = "\n".join(mass_lines)
-
-            # pair coeff placeholder (user must adjust model path)
-            # build specorder string for pair_coeff: assume one element only -> use symbol repeated
-            # If multiple species exist, the user should tailor pair_coeff
-            pair_coeff_line = f"pair_style      deepmd {deepmd_model_name}\npair_coeff      * * {' '.join(unique_syms)}\n"
-
-            # ensemble block
-            ensemble_block = ""
-            if ensemble.lower() == "min":
-                ensemble_block = (
-                    "thermo          100\n"
-                    "min_style       cg\n"
-                    f"minimize        1e-6 1e-8 1000 {nsteps}\n"
-                )
-            elif ensemble.lower() == "nvt":
-                ensemble_block = (
-                    f"velocity        mobile create 300 12345 mom yes rot yes dist gaussian\n"
-                    f"fix             1 mobile nvt temp 300 300 0.1\n"
-                    "thermo          100\n"
-                    f"timestep        {dt}\n"
-                    f"run             {nsteps}\n"
-                )
-            else:
-                ensemble_block = (
-                    f"velocity        mobile create 300 12345 mom yes rot yes dist gaussian\n"
-                    f"fix             1 mobile nve\n"
-                    "thermo          100\n"
-                    f"timestep        {dt}\n"
-                    f"run             {nsteps}\n"
-                )
-
-            # write file
+        with open(task_dir / "in.lammps", "w", encoding="utf-8") as fh:
             fh.write(f"""# Auto-generated in.lammps for lateral indent {lateral:.3f} Å
 units           metal
 atom_style      atomic
@@ -215,6 +203,10 @@ write_data      relaxed.data
 """)
         print(f"[out] wrote task '{task_name}' -> {task_dir}")
 
+    # tasks only read the shared supercell, so they can be written concurrently
+    with ThreadPoolExecutor(max_workers=max(int(n_workers), 1)) as pool:
+        list(pool.map(write_task, range(len(indent_depths)), indent_depths))
+
     print("[done] generation finished.")
 
 """
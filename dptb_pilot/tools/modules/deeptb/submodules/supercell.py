@@ -65,35 +65,89 @@ def build_supercell(system: Atoms, axis='auto', target_length=None, n_repeat=Non
     return supercell, axis, rep
 
 
-def make_cylinder_indenter(center, radius, height, spacing=1.42, symbol='C'):
+GRAPHITE_INTERLAYER = 3.35
+
+INDENTER_LATTICES = ("simple_cubic", "fcc", "graphite")
+
+
+def _lattice_basis(lattice, spacing):
+    """
+    Conventional cell vectors and fractional basis of an indenter lattice.
+
+    ``spacing`` is the nearest-neighbour distance for fcc and the in-plane bond
+    length for graphite; the simple cubic grid keeps the historical
+    ``0.9 * spacing`` step.
+    """
+    if lattice == "simple_cubic":
+        return np.eye(3) * spacing * 0.9, np.zeros((1, 3))
+    if lattice == "fcc":
+        a = spacing * np.sqrt(2.0)
+        basis = np.array([[0, 0, 0], [0.5, 0.5, 0], [0.5, 0, 0.5], [0, 0.5, 0.5]])
+        return np.eye(3) * a, basis
+    if lattice == "graphite":
+        # AB-stacked honeycomb layers in the x-y plane, stacked along the cylinder axis
+        a = spacing * np.sqrt(3.0)
+        vectors = np.array([[a, 0, 0], [0, a * np.sqrt(3.0), 0], [0, 0, 2 * GRAPHITE_INTERLAYER]])
+        layer_a = [[0, 0, 0], [0.5, 1 / 6, 0], [0.5, 0.5, 0], [0, 2 / 3, 0]]
+        # layer B is shifted by one bond along y
+        layer_b = [[0, 1 / 3, 0.5], [0.5, 0.5, 0.5], [0.5, 5 / 6, 0.5], [0, 0, 0.5]]
+        basis = np.array(layer_a + layer_b)
+        return vectors, basis
+    raise ValueError(f"Unknown indenter lattice {lattice!r}, expected one of {INDENTER_LATTICES}")
+
+
+def _exclude_near(coords, exclude_positions, min_distance, cell=None, pbc=None):
+    """Drop ``coords`` closer than ``min_distance`` to ``exclude_positions`` or their periodic images."""
+    from scipy.spatial import cKDTree
+
+    exclude_positions = np.asarray(exclude_positions, dtype=float).reshape(-1, 3)
+    if cell is not None and pbc is not None and np.any(pbc):
+        shifts = np.array(np.meshgrid(*[[-1, 0, 1] if periodic else [0] for periodic in pbc],
+                                      indexing="ij")).reshape(3, -1).T
+        exclude_positions = (exclude_positions[None, :, :] + (shifts @ np.asarray(cell))[:, None, :]).reshape(-1, 3)
+    distances, _ = cKDTree(exclude_positions).query(coords, distance_upper_bound=min_distance)
+    return coords[~(distances < min_distance)]
+
+
+def make_cylinder_indenter(center, radius, height, spacing=1.42, symbol='C', lattice='simple_cubic',
+                           exclude_positions=None, min_distance=None, cell=None, pbc=None):
     """
     生成近似“固体”圆柱体的原子阵列（沿 z 方向延伸高度）。
     center: (x,y,z) 中心坐标（底面中心）
     radius: 圆柱半径（Å）
     height: 圆柱高度（Å）
     spacing: 原子间近似间距（Å），默认接近石墨间距 ~1.42 Å
+    lattice: 'simple_cubic'（原有网格，步长 0.9*spacing）、'fcc' 或 'graphite'（AB 堆垛石墨层）
+    exclude_positions: 需要避让的原子坐标（如管子原子），与 min_distance 一起使用
+    min_distance: 与 exclude_positions 的最小距离（Å），更近的 indenter 原子被去掉
+    cell, pbc: 若给出，避让时同时考虑 exclude_positions 的周期镜像
     返回 ASE Atoms 对象（符号为 symbol）
     """
+    center = np.asarray(center, dtype=float)
     cx, cy, cz = center
-    # generate grid in x-y plane that covers cylinder
-    # choose grid spacing = spacing / sqrt(2) to ensure near close packing
-    dx = spacing * 0.9
-    xs = np.arange(cx - radius - dx, cx + radius + dx, dx)
-    ys = np.arange(cy - radius - dx, cy + radius + dx, dx)
-    zs = np.arange(cz, cz + height + dx, dx)
-
-    coords = []
-    for x in xs:
-        for y in ys:
-            # check inside cylinder cross-section
-            if (x - cx) ** 2 + (y - cy) ** 2 <= radius ** 2:
-                for z in zs:
-                    coords.append([x, y, z])
+    vectors, basis = _lattice_basis(lattice, spacing)
+
+    if lattice == "simple_cubic":
+        # keep the historical grid: one step of margin around the cylinder, z from the base up
+        dx = vectors[0, 0]
+        xs = np.arange(cx - radius - dx, cx + radius + dx, dx)
+        ys = np.arange(cy - radius - dx, cy + radius + dx, dx)
+        zs = np.arange(cz, cz + height + dx, dx)
+        coords = np.stack(np.meshgrid(xs, ys, zs, indexing="ij"), axis=-1).reshape(-1, 3)
+        inside = (coords[:, 0] - cx) ** 2 + (coords[:, 1] - cy) ** 2 <= radius ** 2
+    else:
+        lengths = np.diag(vectors)
+        lower = center - [radius, radius, 0]
+        counts = np.ceil((np.array([2 * radius, 2 * radius, height]) / lengths)).astype(int) + 1
+        cells = np.stack(np.meshgrid(*[np.arange(n) for n in counts], indexing="ij"), axis=-1).reshape(-1, 1, 3)
+        coords = (lower + (cells + basis[None, :, :]) * lengths).reshape(-1, 3)
+        inside = (((coords[:, 0] - cx) ** 2 + (coords[:, 1] - cy) ** 2 <= radius ** 2)
+                  & (coords[:, 2] >= cz) & (coords[:, 2] <= cz + height))
+    coords = coords[inside]
+
+    if exclude_positions is not None and min_distance and len(coords) and len(exclude_positions):
+        coords = _exclude_near(coords, exclude_positions, min_distance, cell=cell, pbc=pbc)
 
     if len(coords) == 0:
         return Atoms()
-    symbols = [symbol] * len(coords)
-    ind = Atoms(symbols=symbols, positions=coords)
-    return ind
-
-
+    return Atoms(symbols=[symbol] * len(coords), positions=coords)
@@ -0,0 +1,201 @@
+"""
+Process-wide cache of DeePTB ``TBSystem`` objects.
+
+Building a ``TBSystem`` loads the checkpoint and constructs the atomic graph,
+which dominates the wall time of band/gap/Hamiltonian tools that are called
+back to back on the same model and structure. Entries are keyed on the content
+hashes of the model, structure and override-overlap files and evicted in LRU
+order once the entry cap or the memory budget is exceeded. A new structure on
+a model that is already cached reuses the loaded calculator, so sweeping many
+structures over one model loads the checkpoint once.
+"""
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from dptb_pilot.tools.modules.util.comm import hash_file
+
+DEFAULT_MAX_ENTRIES = 4
+DEFAULT_MAX_MB = 4096
+
+
+def build_tbsystem(model_file_path: Path,
+                   structure_file_path: Path,
+                   override_overlap: Optional[Path] = None,
+                   calculator=None):
+    """
+    Build a fresh, uncached DeePTB ``TBSystem``.
+
+    ``calculator`` is an already loaded calculator of ``model_file_path`` to
+    reuse instead of loading the checkpoint again.
+    """
+    from dptb.postprocess.unified import TBSystem
+
+    return TBSystem(data=str(structure_file_path),
+                    calculator=calculator if calculator is not None else str(model_file_path),
+                    override_overlap=str(override_overlap) if override_overlap else None)
+
+
+class _CacheEntry:
+    """
+    A cached ``TBSystem``. ``nbytes`` is the size of its own graph data and
+    ``model_nbytes`` the size of the (possibly shared) model ``model_hash``.
+    """
+
+    def __init__(self, tbsystem, nbytes: int, model_hash: str = "", model_nbytes: int = 0):
+        self.tbsystem = tbsystem
+        self.nbytes = nbytes
+        self.model_hash = model_hash
+        self.model_nbytes = model_nbytes
+        self.lock = threading.RLock()
+
+
+def _model_nbytes(tbsystem, fallback: int) -> int:
+    """Rough resident size of the model parameters of a ``TBSystem``."""
+    try:
+        model = getattr(tbsystem, "model", None) or getattr(tbsystem.calculator, "model", None)
+        return sum(p.numel() * p.element_size() for p in model.parameters()) or fallback
+    except Exception:
+        return fallback
+
+
+def _data_nbytes(tbsystem, fallback: int) -> int:
+    """Rough resident size of the graph tensors of a ``TBSystem``."""
+    try:
+        import torch
+
+        data = getattr(tbsystem, "data", None)
+        if isinstance(data, dict):
+            return sum(v.numel() * v.element_size() for v in data.values() if torch.is_tensor(v)) or fallback
+        return fallback
+    except Exception:
+        return fallback
+
+
+class TBSystemCache:
+    """
+    LRU cache of ``TBSystem`` objects bounded by entry count and memory budget.
+
+    Parameters
+    ----------
+    max_entries : int
+        Maximum number of live ``TBSystem`` objects.
+    max_bytes : int
+        Approximate memory budget in bytes. A model shared by several entries
+        is counted once, as long as any of them is cached. The most recently
+        used entry is always kept, even if it alone exceeds the budget.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_MB * 1024 ** 2):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str, str], _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model_file_path: Path,
+                 structure_file_path: Path,
+                 override_overlap: Optional[Path] = None) -> Tuple[str, str, str]:
+        return (hash_file(model_file_path),
+                hash_file(structure_file_path),
+                hash_file(override_overlap) if override_overlap else "")
+
+    def _shared_calculator(self, model_hash: str):
+        with self._lock:
+            for key, entry in reversed(self._entries.items()):
+                if key[0] == model_hash:
+                    return entry.tbsystem.calculator
+        return None
+
+    def _build(self, model_file_path: Path, structure_file_path: Path, override_overlap: Optional[Path]) -> _CacheEntry:
+        # the calculator only evaluates the model, so systems of one model can share it
+        model_hash = hash_file(model_file_path)
+        calculator = self._shared_calculator(model_hash)
+        tbsystem = build_tbsystem(model_file_path, structure_file_path, override_overlap,
+                                  calculator=calculator)
+        return _CacheEntry(tbsystem,
+                           _data_nbytes(tbsystem, os.path.getsize(structure_file_path)),
+                           model_hash,
+                           _model_nbytes(tbsystem, os.path.getsize(model_file_path)))
+
+    def _total_nbytes(self) -> int:
+        # every model counts once while any entry holding it is cached
+        models: Dict[str, int] = {}
+        for entry in self._entries.values():
+            models[entry.model_hash] = max(models.get(entry.model_hash, 0), entry.model_nbytes)
+        return sum(entry.nbytes for entry in self._entries.values()) + sum(models.values())
+
+    def _evict(self):
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries
+                                          or self._total_nbytes() > self.max_bytes):
+            self._entries.popitem(last=False)
+
+    @contextmanager
+    def acquire(self,
+                model_file_path: Path,
+                structure_file_path: Path,
+                override_overlap: Optional[Path] = None):
+        """
+        Yield a (possibly cached) ``TBSystem`` for the given inputs.
+
+        The entry is locked for the duration of the ``with`` block, so two
+        concurrent tool calls on the same system do not interleave their
+        ``set_electrons``/``get_efermi``/``band`` state changes.
+        """
+        key = self.make_key(model_file_path, structure_file_path, override_overlap)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if entry is None:
+            entry = self._build(model_file_path, structure_file_path, override_overlap)
+            with self._lock:
+                # another caller may have built the same system meanwhile
+                entry = self._entries.setdefault(key, entry)
+                self._entries.move_to_end(key)
+                self.misses += 1
+                self._evict()
+        with entry.lock:
+            yield entry.tbsystem
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "nbytes": self._total_nbytes(),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_cache = TBSystemCache(
+    max_entries=int(os.environ.get("DPTB_TBSYSTEM_CACHE_ENTRIES", DEFAULT_MAX_ENTRIES)),
+    max_bytes=int(os.environ.get("DPTB_TBSYSTEM_CACHE_MB", DEFAULT_MAX_MB)) * 1024 ** 2,
+)
+
+
+def cached_tbsystem(model_file_path: Path,
+                    structure_file_path: Path,
+                    override_overlap: Optional[Path] = None):
+    """Context manager yielding the process-wide cached ``TBSystem``."""
+    return _cache.acquire(model_file_path, structure_file_path, override_overlap)
+
+
+def clear_tbsystem_cache():
+    """Drop every cached ``TBSystem``."""
+    _cache.clear()
+
+
+def tbsystem_cache_stats() -> Dict[str, Any]:
+    """Return entry count, estimated size and hit/miss counters of the cache."""
+    return _cache.stats()
@@ -5,6 +5,7 @@ consistent with Yang & Han PRL 1999 definition:
 ε = (L - L0) / L0
 """
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List
 
@@ -31,29 +32,29 @@ def apply_uniaxial_strain(atoms, axis, strain_percent):
     return atoms
 
 
-def write_lammps_input(task_dir, symbols, relax=False, model_name='model.pb'):
+def render_lammps_input(symbols, relax=False, model_name='model.pb'):
     """
+    Text of ``in.lammps``; it only depends on the element order, so strain sweeps render it once.
     symbols: unique chemical symbols in specorder order
     """
+    mass_lines = "".join(f"mass {i} {atomic_masses[atomic_numbers[sym]]:.6f}  # {sym}\n"
+                         for i, sym in enumerate(symbols, start=1))
+    if relax:
+        run_block = """
+min_style       cg
+minimize        1e-12 1e-6 1000 10000
+"""
+    else:
+        run_block = "run 0\n"
 
-    with open(task_dir / "in.lammps", "w") as f:
-
-        f.write(f"""
+    return f"""
 units           metal
 atom_style      atomic
 boundary        p p p
 
 read_data       lammps.data
 
-""")
-
-        # ----- MASS SECTION -----
-        for i, sym in enumerate(symbols, start=1):
-            Z = atomic_numbers[sym]
-            mass = atomic_masses[Z]
-            f.write(f"mass {i} {mass:.6f}  # {sym}\n")
-
-        f.write(f"""
+{mass_lines}
 pair_style      deepmd {model_name}
 pair_coeff      * * {' '.join(symbols)}
 
@@ -62,19 +63,39 @@ neigh_modify    every 10 delay 0 check yes
 
 thermo          100
 
-""")
+{run_block}
+write_data      relaxed.data
+"""
 
-        if relax:
-            f.write("""
-min_style       cg
-minimize        1e-12 1e-6 1000 10000
-""")
-        else:
-            f.write("run 0\n")
 
-        f.write("""
-write_data      relaxed.data
-""")
+def write_lammps_input(task_dir, symbols, relax=False, model_name='model.pb'):
+    """
+    symbols: unique chemical symbols in specorder order
+    """
+    with open(task_dir / "in.lammps", "w") as f:
+        f.write(render_lammps_input(symbols, relax=relax, model_name=model_name))
+
+
+def _write_strain_task(output_root: Path, supercell, axis, strain, symbols, in_lammps_text):
+    task_dir = output_root / f"strain_{strain:+.2f}pct"
+    task_dir.mkdir(exist_ok=True)
+
+    strained_atoms = apply_uniaxial_strain(supercell.copy(), axis, strain)
+
+    # Write POSCAR
+    write(task_dir / "POSCAR", strained_atoms)
+
+    # Write LAMMPS data
+    write(task_dir / "lammps.data",
+          strained_atoms,
+          format="lammps-data",
+          specorder=symbols)
+
+    # Write LAMMPS input
+    (task_dir / "in.lammps").write_text(in_lammps_text)
+
+    print(f"Generated strain {strain:+.2f}%")
+    return task_dir / "in.lammps", task_dir / "lammps.data"
 
 def _generate_uniaxial_strain_structure(output_root,
                                         poscar_file:Path,
@@ -141,7 +162,8 @@ def _generate_uniaxial_strain_lammps_input_file(output_root,
                                                 axis='auto',
                                                 target_length=20,
                                                 model_name='model.pb',
-                                                relax_after_strain=True):
+                                                relax_after_strain=True,
+                                                n_workers=1):
     """
     Generate strained structures and matching LAMMPS input/data files.
 
@@ -161,6 +183,9 @@ def _generate_uniaxial_strain_lammps_input_file(output_root,
         DeepMD model filename referenced in generated LAMMPS input scripts.
     relax_after_strain : bool, optional
         Whether generated scripts should relax the strained structure.
+    n_workers : int, optional
+        Threads writing task directories concurrently. The supercell and the
+        ``in.lammps`` text are built once and shared by all tasks.
 
     Returns
     -------
@@ -183,41 +208,17 @@ def _generate_uniaxial_strain_lammps_input_file(output_root,
     print(f"Reference length L0 = {L0:.3f} Å")
 
     # 获取元素顺序（用于 specorder）
-    symbols = []
-    for s in supercell.get_chemical_symbols():
-        if s not in symbols:
-            symbols.append(s)
+    symbols = list(dict.fromkeys(supercell.get_chemical_symbols()))
+    in_lammps_text = render_lammps_input(symbols, relax=relax_after_strain, model_name=model_name)
 
-    in_lammps_file_paths = []
-    lammps_data_file_paths = []
-
-    for strain in strain_list:
-        task_dir = OUTPUT_ROOT_PATH / f"strain_{strain:+.2f}pct"
-        task_dir.mkdir(exist_ok=True)
+    # every task only reads the shared supercell; threads overlap the file writes
+    with ThreadPoolExecutor(max_workers=max(int(n_workers), 1)) as pool:
+        written = list(pool.map(
+            lambda strain: _write_strain_task(OUTPUT_ROOT_PATH, supercell, axis, strain, symbols, in_lammps_text),
+            strain_list))
 
-        strained_atoms = supercell.copy()
-        strained_atoms = apply_uniaxial_strain(
-            strained_atoms, axis, strain
-        )
-
-        # Write POSCAR
-        write(task_dir / "POSCAR", strained_atoms)
-
-        # Write LAMMPS data
-        write(task_dir / "lammps.data",
-              strained_atoms,
-              format="lammps-data",
-              specorder=symbols)
-        lammps_data_file_paths.append(Path(task_dir / "lammps.data"))
-
-        # Write LAMMPS input
-        write_lammps_input(task_dir,
-                           symbols=symbols,
-                           relax=relax_after_strain,
-                           model_name=model_name)
-        in_lammps_file_paths.append(Path(task_dir / "in.lammps"))
-
-        print(f"Generated strain {strain:+.2f}%")
+    in_lammps_file_paths = [in_path for in_path, _ in written]
+    lammps_data_file_paths = [data_path for _, data_path in written]
 
     print("All strain structures generated.")
     return {"in_lammps_file_paths":in_lammps_file_paths, "lammps_data_file_paths":lammps_data_file_paths}
\ No newline at end of file
@@ -21,6 +21,14 @@ class RunDpnegfLammpsResult(TypedDict):
     task_name: str
 
 
+class RunDpnegfLammpsGridResult(TypedDict):
+    task_names: List[str]
+    log_paths: List[Path]
+    relaxed_system_archive_paths: List[Path]
+    failed_tasks: Dict[str, str]
+    skipped_tasks: List[str]
+
+
 class PrepNegfTasksResult(TypedDict):
     task_names: List[str]
     modified_negf_input_configs: List[Dict[str, Any]]
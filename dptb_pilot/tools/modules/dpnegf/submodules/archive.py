@@ -1,21 +1,136 @@
+import io
+import json
+import os
 import tarfile
+import time
+import warnings
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterable, List, Optional, Union
+from typing import Iterable, List, Optional, Tuple, Union
+
+# codec -> (archive suffix, default level)
+CODECS = {
+    "tar": (".tar", None),
+    "gz": (".tar.gz", 6),
+    "zstd": (".tar.zst", 3),
+    "lz4": (".tar.lz4", 0),
+}
+DEFAULT_CODEC = "gz"
+MANIFEST_NAME = ".manifest.json"
+
+_MAGIC = (
+    (b"\x1f\x8b", "gz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+    (b"\x04\x22\x4d\x18", "lz4"),
+)
+_ARCHIVE_SUFFIXES = sorted({suffix for suffix, _ in CODECS.values()} | {".tgz"}, key=len, reverse=True)
+
+
+def _codec_available(codec: str) -> bool:
+    try:
+        if codec == "zstd":
+            import zstandard  # noqa: F401
+        elif codec == "lz4":
+            import lz4.frame  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def resolve_codec(codec: Optional[str] = None, level: Optional[int] = None) -> Tuple[str, Optional[int]]:
+    """
+    Codec and level to pack with.
+
+    Defaults come from ``DPNEGF_ARCHIVE_CODEC``/``DPNEGF_ARCHIVE_LEVEL``. zstd and
+    lz4 fall back to gzip when the ``zstandard``/``lz4`` package is missing.
+    """
+    codec = (codec or os.environ.get("DPNEGF_ARCHIVE_CODEC") or DEFAULT_CODEC).lower()
+    if codec not in CODECS:
+        raise ValueError(f"Unknown archive codec {codec!r}, expected one of {sorted(CODECS)}")
+    if not _codec_available(codec):
+        warnings.warn(f"Archive codec {codec!r} is not installed, falling back to {DEFAULT_CODEC!r}")
+        codec, level = DEFAULT_CODEC, None
+    if level is None and os.environ.get("DPNEGF_ARCHIVE_LEVEL"):
+        level = int(os.environ["DPNEGF_ARCHIVE_LEVEL"])
+    return codec, CODECS[codec][1] if level is None else level
+
+
+def archive_file_name(archive_name: str, codec: str) -> str:
+    """Replace any archive suffix of ``archive_name`` with the one of ``codec``."""
+    for suffix in _ARCHIVE_SUFFIXES:
+        if archive_name.endswith(suffix):
+            archive_name = archive_name[:-len(suffix)]
+            break
+    return archive_name + CODECS[codec][0]
+
+
+def _detect_codec(archive_file_path: Path) -> str:
+    with open(archive_file_path, "rb") as fh:
+        head = fh.read(4)
+    for magic, codec in _MAGIC:
+        if head.startswith(magic):
+            return codec
+    return "tar"
+
+
+@contextmanager
+def _open_tar(archive_path: Path, mode: str, codec: str, level: Optional[int] = None):
+    """Open a tar for sequential access, through the codec's stream compressor if needed."""
+    if codec in ("tar", "gz"):
+        kwargs = {"compresslevel": level} if mode == "w" and codec == "gz" else {}
+        with tarfile.open(archive_path, f"{mode}:gz" if codec == "gz" else f"{mode}:", **kwargs) as tar:
+            yield tar
+        return
+
+    with open(archive_path, f"{mode}b") as raw:
+        if codec == "zstd":
+            import zstandard
+
+            if mode == "w":
+                stream = zstandard.ZstdCompressor(level=level).stream_writer(raw, closefd=False)
+            else:
+                stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=False)
+        else:
+            import lz4.frame
+
+            stream = lz4.frame.open(raw, f"{mode}b", compression_level=level or 0)
+        with stream, tarfile.open(fileobj=stream, mode=f"{mode}|") as tar:
+            yield tar
+
+
+def _add_bytes(tar: tarfile.TarFile, name: str, content: bytes, mtime: float):
+    info = tarfile.TarInfo(name=name)
+    info.size = len(content)
+    info.mtime = mtime
+    info.mode = 0o644
+    tar.addfile(info, io.BytesIO(content))
+
+
+def _add_manifest(tar: tarfile.TarFile, codec: str, files: List[dict], mtime: float):
+    manifest = {"codec": codec, "files": files}
+    _add_bytes(tar, MANIFEST_NAME, json.dumps(manifest, indent=1).encode("utf-8"), mtime)
 
 
 def pack_files(
         work_dir: Union[str, Path],
         file_names: Iterable[Union[str, Path]],
         archive_name: str,
-        output_dir: Optional[Union[str, Path]] = None
+        output_dir: Optional[Union[str, Path]] = None,
+        codec: Optional[str] = None,
+        level: Optional[int] = None
 ) -> Path:
-    """Pack existing files under ``work_dir`` into a gzipped tar archive."""
+    """Pack existing files under ``work_dir`` into an archive with an embedded manifest.
+
+    The suffix of ``archive_name`` is replaced by the one of the codec actually used.
+    """
     work_dir = Path(work_dir).absolute()
     output_dir = Path(output_dir).absolute() if output_dir is not None else work_dir
     output_dir.mkdir(parents=True, exist_ok=True)
-    archive_path = output_dir / archive_name
+    codec, level = resolve_codec(codec, level)
+    archive_path = output_dir / archive_file_name(archive_name, codec)
 
-    with tarfile.open(archive_path, "w:gz") as tar:
+    files = []
+    with _open_tar(archive_path, "w", codec, level) as tar:
         for file_name in file_names:
             file_path = Path(file_name)
             if not file_path.is_absolute():
@@ -23,26 +138,69 @@ def pack_files(
             if not file_path.exists():
                 continue
             tar.add(file_path, arcname=file_path.name)
+            files.append({"name": file_path.name, "size": file_path.stat().st_size})
+        _add_manifest(tar, codec, files, time.time())
 
     return archive_path.absolute()
 
 
+def pack_members(
+        archive_path: Union[str, Path],
+        members: Iterable[Tuple[str, bytes]],
+        codec: Optional[str] = None,
+        level: Optional[int] = None
+) -> Path:
+    """Write ``(name, content)`` pairs straight into an archive with an embedded manifest.
+
+    Members are consumed one at a time, so a generator keeps only the current
+    member in memory and nothing is staged on disk. The suffix of
+    ``archive_path`` is replaced by the one of the codec actually used.
+    """
+    archive_path = Path(archive_path).absolute()
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    codec, level = resolve_codec(codec, level)
+    archive_path = archive_path.with_name(archive_file_name(archive_path.name, codec))
+
+    mtime = time.time()
+    files = []
+    with _open_tar(archive_path, "w", codec, level) as tar:
+        for name, content in members:
+            _add_bytes(tar, name, content, mtime)
+            files.append({"name": name, "size": len(content)})
+        _add_manifest(tar, codec, files, mtime)
+
+    return archive_path
+
+
 def unpack_files(archive_file_path: Union[str, Path], unpack_dir: Union[str, Path]) -> List[Path]:
-    """Unpack a tar/tar.gz archive and return extracted file paths."""
+    """Unpack an archive of any supported codec and return extracted file paths in archive order.
+
+    Paths come from the members themselves, so ``unpack_dir`` is never rescanned.
+    Archives with a manifest are checked for missing members.
+    """
     archive_file_path = Path(archive_file_path).absolute()
     unpack_dir = Path(unpack_dir).absolute()
     unpack_dir.mkdir(parents=True, exist_ok=True)
+    root = str(unpack_dir.resolve())
 
-    before = {path.resolve() for path in unpack_dir.rglob("*")}
-    with tarfile.open(archive_file_path, "r:*") as tar:
-        for member in tar.getmembers():
-            target = (unpack_dir / member.name).resolve()
-            if not str(target).startswith(str(unpack_dir.resolve())):
+    extracted = []
+    names = set()
+    manifest = None
+    with _open_tar(archive_file_path, "r", _detect_codec(archive_file_path)) as tar:
+        for member in tar:
+            if member.name == MANIFEST_NAME:
+                manifest = json.load(tar.extractfile(member))
+                continue
+            target = os.path.realpath(os.path.join(root, member.name))
+            if not (target == root or target.startswith(root + os.sep)):
                 raise RuntimeError(f"Refusing to unpack unsafe archive member: {member.name}")
-        tar.extractall(unpack_dir)
+            tar.extract(member, unpack_dir)
+            names.add(member.name)
+            if member.isfile():
+                extracted.append(unpack_dir / member.name)
 
-    extracted = []
-    for path in unpack_dir.rglob("*"):
-        if path.is_file() and path.resolve() not in before:
-            extracted.append(path.absolute())
+    if manifest is not None:
+        missing = {entry["name"] for entry in manifest["files"]} - names
+        if missing:
+            raise RuntimeError(f"Archive {archive_file_path} is missing members: {sorted(missing)}")
     return extracted
@@ -1,15 +1,19 @@
+import io
+import json
 import os
+import shlex
 import shutil
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
 from ase import Atoms
 from ase.data import atomic_masses, atomic_numbers
 from ase.io import read, write
+from ase.io.lammpsrun import read_lammps_dump_text
 
-from dptb_pilot.tools.modules.dpnegf.submodules.archive import pack_files
-from dptb_pilot.tools.modules.util.comm import run_command
+from dptb_pilot.tools.modules.dpnegf.submodules.archive import pack_files, pack_members
+from dptb_pilot.tools.modules.util.comm import get_physical_cores, hash_file, lammps_id_ranges, run_command
 
 
 def _build_specorder(system: Atoms) -> List[str]:
@@ -30,16 +34,52 @@ def _mass_lines(specorder: List[str]) -> str:
 
 
 def _group_fixed_by_ids(fixed_ids: List[int]) -> str:
-    if not fixed_ids:
+    if not len(fixed_ids):
         return "# no fixed atoms"
-    ids = [str(i) for i in sorted(set(fixed_ids))]
     return "\n".join([
-        f"group fixed id {' '.join(ids)}",
+        f"group fixed id {lammps_id_ranges(fixed_ids)}",
         "group mobile subtract all fixed",
         "fix freeze fixed spring/self 1e8",
     ])
 
 
+def _link_or_copy(src: Path, dst: Path) -> None:
+    """Hardlink ``src`` to ``dst``, falling back to a symlink and finally a copy."""
+    if dst.exists() and os.path.samefile(src, dst):
+        return
+    if dst.exists() or dst.is_symlink():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+    except OSError:
+        try:
+            os.symlink(Path(src).absolute(), dst)
+        except OSError:
+            shutil.copy2(src, dst)
+
+
+def _store_file(src: Path, store_dir: Path, suffix: str) -> Path:
+    """Move/link ``src`` into ``store_dir`` under its content hash and return the stored path."""
+    store_dir.mkdir(parents=True, exist_ok=True)
+    stored = store_dir / f"{hash_file(src)}{suffix}"
+    if not stored.exists():
+        _link_or_copy(src, stored)
+    return stored
+
+
+def _store_lammps_data(system: Atoms, specorder: List[str], store_dir: Path) -> Path:
+    """Write ``system`` once and keep it in ``store_dir`` under its content hash."""
+    import uuid
+
+    store_dir.mkdir(parents=True, exist_ok=True)
+    tmp = store_dir / f"tmp_{uuid.uuid4().hex}.data"
+    write(tmp, system, format="lammps-data", specorder=specorder)
+    try:
+        return _store_file(tmp, store_dir, ".data")
+    finally:
+        tmp.unlink()
+
+
 def _ensemble_block(
         ensemble: str,
         temp: float,
@@ -138,35 +178,40 @@ def prepare_lammps_tasks(
     task_root.mkdir(parents=True, exist_ok=True)
 
     model_name = os.path.basename(inputs_config["deepmd_model_path"])
+    # 结构数据与模型在 store 中按内容哈希只保存一份，各任务目录通过硬链接/软链接引用
+    store_dir = task_root / ".store"
+    model_path = Path(inputs_config["deepmd_model_path"])
+    stored_model = _store_file(model_path.absolute(), store_dir, model_path.suffix) if model_path.exists() else None
     task_paths: List[Path] = []
     task_names: List[str] = []
     task_infos: List[Dict[str, Any]] = []
 
     for conf, system_info in zip(stacked_system_paths, system_infos):
         system = read(conf)
-        fixed_atom_indices = (
-            list(range(1, system_info["atom_index"][0] + 1)) +
-            list(range(system_info["atom_index"][1] + 1, system_info["atom_index"][2] + 1))
-        )
+        a0, a1, a2 = system_info["atom_index"][:3]
+        # 电极原子（0-based 下标）全部固定
+        fixed_mask = np.zeros(len(system), dtype=bool)
+        fixed_mask[:a0] = True
+        fixed_mask[a1:a2] = True
 
         if "device_end_fixed_radius" in relax_config:
             radius = relax_config["device_end_fixed_radius"]
             cell = system.get_cell()
             cell_z = cell[2][2]
             atom_number = system_info["atom_number"]
-            supercell_multiplier = system_info["atom_index"][2] / atom_number
+            supercell_multiplier = a2 / atom_number
             cell_length = cell_z / supercell_multiplier
-            a0, a1 = system_info["atom_index"][0], system_info["atom_index"][1]
             z0_limit = (a0 / atom_number) * cell_length + radius
             z1_limit = (a1 / atom_number) * cell_length - radius
-            positions = system.get_positions()
-            for idx in range(a0, a1):
-                atom_id = idx + 1
-                z_pos = positions[idx][2]
-                if z_pos < z0_limit or z_pos > z1_limit:
-                    fixed_atom_indices.append(atom_id)
+            device_z = system.positions[a0:a1, 2]
+            fixed_mask[a0:a1] |= (device_z < z0_limit) | (device_z > z1_limit)
+
+        fixed_atom_indices = np.flatnonzero(fixed_mask) + 1
 
         specorder = inputs_config.get("deepmd_model_type_map") or _build_specorder(system)
+        stored_data = _store_lammps_data(system, specorder, store_dir)
+        mass_lines = _mass_lines(specorder)
+        group_lines = _group_fixed_by_ids(fixed_atom_indices)
 
         for temp in relax_config["temps"]:
             for pressure in relax_config["press"]:
@@ -181,9 +226,9 @@ def prepare_lammps_tasks(
                 task_dir = task_root / task_name
                 task_dir.mkdir(parents=True, exist_ok=True)
 
-                write(task_dir / "lammps.data", system, format="lammps-data", specorder=specorder)
-                mass_lines = _mass_lines(specorder)
-                group_lines = _group_fixed_by_ids(fixed_atom_indices)
+                _link_or_copy(stored_data, task_dir / "lammps.data")
+                if stored_model is not None:
+                    _link_or_copy(stored_model, task_dir / model_name)
                 additional = relax_config.get("additional") or {}
                 ensemble_block = _ensemble_block(
                     relax_config["ensemble"],
@@ -234,32 +279,83 @@ write_data      relaxed.data
 
 def _build_type_to_element_map(data_file: Path) -> Dict[int, str]:
     atoms = read(data_file, format="lammps-data")
-    types = atoms.arrays["type"]
-    symbols = atoms.get_chemical_symbols()
-    type_map = {}
-    for atom_type, symbol in zip(types, symbols):
-        if atom_type not in type_map:
-            type_map[atom_type] = symbol
-    return type_map
+    types, first = np.unique(atoms.arrays["type"], return_index=True)
+    symbols = np.asarray(atoms.get_chemical_symbols())[first]
+    return dict(zip(types.tolist(), symbols.tolist()))
+
+
+def _type_lookup(type_map: Dict[int, str]) -> np.ndarray:
+    """Atomic numbers indexed by LAMMPS type, -1 for unused types."""
+    lookup = np.full(max(type_map) + 1, -1, dtype=int)
+    for atom_type, symbol in type_map.items():
+        lookup[atom_type] = atomic_numbers[symbol]
+    return lookup
 
 
-def _apply_type_map(atoms: Atoms, type_map: Dict[int, str]) -> Atoms:
+def _apply_type_map(atoms: Atoms, type_lookup: np.ndarray) -> Atoms:
     if "type" in atoms.arrays:
         types = atoms.arrays["type"]
     elif "types" in atoms.arrays:
         types = atoms.arrays["types"]
     else:
         raise KeyError("未找到 type/types 信息，dump 文件可能格式不对")
-    atoms.set_chemical_symbols([type_map[t] for t in types])
+    numbers = type_lookup[types]
+    if (numbers < 0).any():
+        raise KeyError(f"dump 文件中存在 lammps.data 未定义的原子类型: {sorted(set(types[numbers < 0]))}")
+    atoms.numbers = numbers
+    return atoms
+
+
+def _iter_dump_frames(dump_file: Path) -> Iterator[str]:
+    """Yield the text of each frame of a LAMMPS text dump, one at a time."""
+    frame: List[str] = []
+    with open(dump_file, "r", encoding="utf-8") as fd:
+        for line in fd:
+            if line.startswith("ITEM: TIMESTEP") and frame:
+                yield "".join(frame)
+                frame = []
+            frame.append(line)
+    if frame:
+        yield "".join(frame)
+
+
+def _clamp_boundary_z(atoms: Atoms) -> Atoms:
+    scaled = atoms.get_scaled_positions(wrap=False)
+    z = scaled[:, 2]
+    z[:] = np.where(np.abs(z - 1.0) < 1e-6, 1.0 - 1e-8, np.where(np.abs(z) < 1e-6, 1e-8, z))
+    atoms.set_scaled_positions(scaled)
     return atoms
 
 
+def _iter_relaxed_snapshots(dump_file: Path, type_map: Dict[int, str]) -> Iterator[Tuple[str, bytes]]:
+    """Convert dump frames lazily into ``(POSCAR_xxxx.vasp, content)`` pairs."""
+    type_lookup = _type_lookup(type_map)
+    for i, frame in enumerate(_iter_dump_frames(dump_file)):
+        atoms = read_lammps_dump_text(io.StringIO(frame), index=0)
+        atoms = _clamp_boundary_z(_apply_type_map(atoms, type_lookup))
+        buffer = io.StringIO()
+        write(buffer, atoms, format="vasp", vasp5=True)
+        yield f"POSCAR_{i:04d}.vasp", buffer.getvalue().encode("utf-8")
+
+
+def _lammps_command(run_config: Dict[str, Any], mpi_ranks: int = 1, omp_threads: Optional[int] = None) -> str:
+    command = " ".join([run_config["command"], "-i", "in.lammps", "-log", "log.lammps"])
+    if mpi_ranks > 1:
+        mpi_command = run_config.get("mpi_command", "mpirun -np {ranks}")
+        command = f"{mpi_command.format(ranks=mpi_ranks)} {command}"
+    if omp_threads:
+        command = f"OMP_NUM_THREADS={omp_threads} {command}"
+    return command
+
+
 def run_lammps_task(
         task_path: Path,
         task_name: str,
         deepmd_model_path: Path,
         relax_config: Dict[str, Any],
-        work_path: str = "."
+        work_path: str = ".",
+        mpi_ranks: int = 1,
+        omp_threads: Optional[int] = None
 ) -> Dict[str, Any]:
     """Run one prepared NEGF LAMMPS task and archive relaxed structures."""
     task_path = Path(task_path).absolute()
@@ -268,41 +364,126 @@ def run_lammps_task(
     work_dir.mkdir(parents=True, exist_ok=True)
 
     shutil.copy(task_path / "in.lammps", work_dir / "in.lammps")
-    shutil.copy(task_path / "lammps.data", work_dir / "lammps.data")
-    shutil.copy(deepmd_model_path, work_dir / deepmd_model_path.name)
+    # 输入数据与模型只读，链接即可，避免为每个任务复制大文件
+    _link_or_copy(task_path / "lammps.data", work_dir / "lammps.data")
+    _link_or_copy(deepmd_model_path, work_dir / deepmd_model_path.name)
 
-    command = " ".join([relax_config["run_config"]["command"], "-i", "in.lammps", "-log", "log.lammps"])
-    cwd = Path.cwd()
-    try:
-        os.chdir(work_dir)
-        ret, out, err = run_command(command, shell=True)
-    finally:
-        os.chdir(cwd)
+    command = _lammps_command(relax_config["run_config"], mpi_ranks, omp_threads)
+    # cd inside the shell instead of os.chdir so that grid tasks can run from concurrent threads
+    ret, out, err = run_command(f"cd {shlex.quote(str(work_dir))} && {command}", shell=True)
     if ret != 0:
         raise RuntimeError(f"lmp failed\ncommand was: {command}\nout msg: {out}\nerr msg: {err}")
 
     if relax_config["ensemble"] == "smart":
         type_map = _build_type_to_element_map(work_dir / "lammps.data")
-        structures = read(work_dir / "traj.xyz", index=":", format="lammps-dump-text")
-        relaxed_system_paths = []
-        for i, atoms in enumerate(structures):
-            atoms = _apply_type_map(atoms, type_map)
-            scaled = atoms.get_scaled_positions(wrap=False)
-            scaled[np.abs(scaled[:, 2] - 1.0) < 1e-6, 2] = 1.0 - 1e-8
-            scaled[np.abs(scaled[:, 2]) < 1e-6, 2] = 1e-8
-            atoms.set_scaled_positions(scaled)
-            poscar_name = f"POSCAR_{i:04d}.vasp"
-            write(work_dir / poscar_name, atoms, vasp5=True)
-            relaxed_system_paths.append(Path(poscar_name))
+        # 逐帧读取并直接写入压缩包，不在内存或磁盘上保留全部快照
+        archive_path = pack_members(work_dir / "relaxed_system.tar.gz",
+                                    _iter_relaxed_snapshots(work_dir / "traj.xyz", type_map))
     else:
         relaxed_system = read(work_dir / "relaxed.data", format="lammps-data")
         write(work_dir / "relaxed.vasp", relaxed_system, vasp5=True)
-        relaxed_system_paths = [Path("relaxed.vasp")]
+        archive_path = pack_files(work_dir, [Path("relaxed.vasp")], "relaxed_system.tar.gz")
 
-    archive_path = pack_files(work_dir, relaxed_system_paths, "relaxed_system.tar.gz")
     return {
         "log_path": (work_dir / "log.lammps").absolute(),
         "relaxed_system_archive_path": archive_path,
         "extra_outputs_path": None,
         "task_name": task_name,
     }
+
+
+def _read_status(status_path: Path) -> Dict[str, Any]:
+    try:
+        return json.loads(status_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_status(status_path: Path, status: Dict[str, Any]) -> None:
+    tmp = status_path.with_name(status_path.name + ".tmp")
+    tmp.write_text(json.dumps(status, indent=2, default=str), encoding="utf-8")
+    tmp.replace(status_path)
+
+
+def _run_grid_task(
+        task_path: Path,
+        deepmd_model_path: Path,
+        relax_config: Dict[str, Any],
+        work_dir: Path,
+        mpi_ranks: int,
+        omp_threads: int,
+) -> Dict[str, Any]:
+    task_name = task_path.name
+    status_path = work_dir / task_name / "status.json"
+    status_path.parent.mkdir(parents=True, exist_ok=True)
+    _write_status(status_path, {"status": "running"})
+    try:
+        result = run_lammps_task(task_path, task_name, deepmd_model_path, relax_config,
+                                 work_path=str(work_dir), mpi_ranks=mpi_ranks, omp_threads=omp_threads)
+    except Exception as e:
+        _write_status(status_path, {"status": "failed", "error": str(e)})
+        raise
+    _write_status(status_path, {"status": "done", "result": result})
+    return result
+
+
+def run_lammps_grid(
+        task_root_path: Path,
+        deepmd_model_path: Path,
+        relax_config: Dict[str, Any],
+        work_path: str = ".",
+        mpi_ranks: int = 1,
+        omp_threads: int = 1,
+        core_budget: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Run every prepared task under ``task_root_path`` on a local pool.
+
+    Each task uses ``mpi_ranks * omp_threads`` cores and as many tasks run at
+    once as fit into ``core_budget`` (physical cores by default). A
+    ``status.json`` in every task work directory records running/done/failed,
+    so re-running the grid skips finished tasks and resumes the rest.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    task_root_path = Path(task_root_path).absolute()
+    deepmd_model_path = Path(deepmd_model_path).absolute()
+    work_dir = Path(work_path).absolute()
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    task_paths = sorted(path for path in task_root_path.iterdir() if (path / "in.lammps").exists())
+    cores_per_task = max(mpi_ranks, 1) * max(omp_threads, 1)
+    budget = core_budget or get_physical_cores()
+    n_parallel = max(1, budget // cores_per_task)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    pending = []
+    for task_path in task_paths:
+        status = _read_status(work_dir / task_path.name / "status.json")
+        archive = (status.get("result") or {}).get("relaxed_system_archive_path")
+        if status.get("status") == "done" and archive and Path(archive).exists():
+            results[task_path.name] = status["result"]
+        else:
+            pending.append(task_path)
+
+    failed_tasks: Dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=n_parallel) as pool:
+        futures = {
+            pool.submit(_run_grid_task, task_path, deepmd_model_path, relax_config,
+                        work_dir, mpi_ranks, omp_threads): task_path.name
+            for task_path in pending
+        }
+        for future, task_name in futures.items():
+            try:
+                results[task_name] = future.result()
+            except Exception as e:
+                failed_tasks[task_name] = str(e)
+
+    task_names = [path.name for path in task_paths if path.name in results]
+    return {
+        "task_names": task_names,
+        "log_paths": [Path(results[name]["log_path"]) for name in task_names],
+        "relaxed_system_archive_paths": [Path(results[name]["relaxed_system_archive_path"]) for name in task_names],
+        "failed_tasks": failed_tasks,
+        "skipped_tasks": [path.name for path in task_paths if path not in pending],
+    }
@@ -1,9 +1,16 @@
 import copy
+import multiprocessing as mp
 import os
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
 from pathlib import Path
 from typing import Any, Dict, List
 
 from dptb_pilot.tools.modules.dpnegf.submodules.archive import pack_files, unpack_files
+from dptb_pilot.tools.modules.dpnegf.submodules.self_energy_store import default_store, self_energy_key
 from dptb_pilot.tools.modules.util.comm import temporary_chdir
 
 
@@ -34,11 +41,24 @@ def prepare_negf_tasks(
     return {"task_names": task_names, "modified_negf_input_configs": modified_configs}
 
 
+DEFAULT_START_METHOD = "forkserver"
+
+# model of this worker process, built once by the pool initializer
+_shared_model = None
+
+
+def _build_model(deeptb_model_path):
+    from dptb.nn.build import build_model
+
+    return build_model(str(deeptb_model_path), common_options={"device": "cpu"})
+
+
 def _run_single_negf(
         sys_path: Path,
         deeptb_model_path: Path,
         modified_negf_input_config: Dict[str, Any],
         use_common_self_energy: bool,
+        model=None,
 ) -> None:
     import logging
 
@@ -47,7 +67,6 @@ def _run_single_negf(
     from dpnegf.negf.lead_property import _has_saved_self_energy
     from dpnegf.runner.NEGF import NEGF
     from dpnegf.utils.loggers import set_log_handles
-    from dptb.nn.build import build_model
 
     run_dir = Path(sys_path.name.replace(".", "_"))
     run_dir.mkdir(parents=True, exist_ok=True)
@@ -58,24 +77,40 @@ def _run_single_negf(
         model_target = Path(deeptb_model_path.name)
         if not model_target.exists():
             os.symlink(deeptb_model_path, model_target)
-        model = build_model(model_target.name, common_options={"device": "cpu"})
+        if model is None:
+            model = _build_model(model_target.name)
 
         relaxed_target = Path("relaxed.vasp")
         if not relaxed_target.exists():
             os.symlink(sys_path, relaxed_target)
 
         atomic_data_options = modified_negf_input_config.get("AtomicData_options")
-        self_energy_save_path = (Path("..") / "common_self_energy").absolute() if use_common_self_energy else Path(".").absolute()
-        negf = NEGF(
-            model=model,
-            AtomicData_options=atomic_data_options,
-            structure="relaxed.vasp",
-            results_path=".",
-            self_energy_save_path=self_energy_save_path,
-            use_saved_se=_has_saved_self_energy(self_energy_save_path),
-            **modified_negf_input_config["task_options"],
-        )
-        negf.compute()
+        if use_common_self_energy:
+            # 以电极原子、模型、能量网格与k点的哈希为键，在任务与会话之间共享自能；
+            # 计算期间持有该键的文件锁，完成后整体移入自能库
+            se_key = self_energy_key(sys_path, deeptb_model_path, modified_negf_input_config)
+            se_entry = default_store().entry(se_key)
+        else:
+            se_entry = nullcontext()
+        with se_entry as entry:
+            if entry is not None:
+                self_energy_save_path = entry.path
+                use_saved_se = entry.complete and _has_saved_self_energy(self_energy_save_path)
+            else:
+                self_energy_save_path = Path(".").absolute()
+                use_saved_se = _has_saved_self_energy(self_energy_save_path)
+            negf = NEGF(
+                model=model,
+                AtomicData_options=atomic_data_options,
+                structure="relaxed.vasp",
+                results_path=".",
+                self_energy_save_path=self_energy_save_path,
+                use_saved_se=use_saved_se,
+                **modified_negf_input_config["task_options"],
+            )
+            negf.compute()
+            if entry is not None and not use_saved_se:
+                entry.commit()
 
         negf_out = torch.load("negf.out.pth")
         plt.plot(negf_out["uni_grid"], negf_out["DOS"][str(negf_out["k"][0])])
@@ -95,6 +130,102 @@ def _run_single_negf(
         plt.close()
 
 
+def _safe_start_method() -> str:
+    return DEFAULT_START_METHOD if DEFAULT_START_METHOD in mp.get_all_start_methods() else "spawn"
+
+
+def _start_method() -> str:
+    """
+    Start method of the snapshot workers, ``DPNEGF_START_METHOD`` or ``forkserver``.
+
+    The tool server is multi-threaded and torch keeps its own thread pools, so
+    forking it can deadlock a child on a lock held by another thread; ``fork``
+    is only honoured while the process runs a single Python thread.
+    """
+    method = os.environ.get("DPNEGF_START_METHOD", DEFAULT_START_METHOD)
+    if method not in mp.get_all_start_methods():
+        return _safe_start_method()
+    if method == "fork" and threading.active_count() > 1:
+        warnings.warn("Forking a multi-threaded process is unsafe; "
+                      f"NEGF workers use {_safe_start_method()} instead.", RuntimeWarning)
+        return _safe_start_method()
+    return method
+
+
+def _init_negf_worker(deeptb_model_path):
+    global _shared_model
+
+    import matplotlib
+
+    matplotlib.use("Agg")
+    try:
+        import torch
+
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    if _shared_model is not None:
+        # forked from the parent, which already holds the model
+        return
+    # a failure here breaks the pool, which ProcessPoolExecutor reports instead of retrying
+    _shared_model = _build_model(deeptb_model_path)
+
+
+def _run_shared_negf(args) -> None:
+    work_dir, sys_path, deeptb_model_path, modified_negf_input_config, use_common_self_energy = args
+    with temporary_chdir(work_dir):
+        _run_single_negf(sys_path, deeptb_model_path, modified_negf_input_config,
+                         use_common_self_energy, model=_shared_model)
+
+
+def _run_negf_concurrently(
+        relaxed_systems: List[Path],
+        deeptb_model_path: Path,
+        modified_negf_input_config: Dict[str, Any],
+        use_common_self_energy: bool,
+        n_workers: int,
+) -> None:
+    """
+    Run DPNEGF over snapshots with one model per process and shared lead self-energies.
+
+    With ``use_common_self_energy`` the first snapshot runs here and commits
+    the lead self-energies to the self-energy store before any worker starts;
+    the remaining snapshots then only read the stored self-energies. Workers
+    are started with ``forkserver`` (``spawn`` where unavailable) and build the
+    model once each in their initializer; see :func:`_start_method`.
+
+    Raises
+    ------
+    RuntimeError
+        If a worker fails to start or dies; ``ProcessPoolExecutor`` reports
+        this instead of waiting for the lost snapshots forever.
+    """
+    global _shared_model
+
+    pending = list(relaxed_systems)
+    work_dir = Path.cwd()
+    method = _start_method()
+    if use_common_self_energy:
+        _shared_model = _build_model(deeptb_model_path)
+    try:
+        if use_common_self_energy:
+            _run_single_negf(pending.pop(0), deeptb_model_path, modified_negf_input_config,
+                             use_common_self_energy, model=_shared_model)
+        if not pending:
+            return
+        if method != "fork":
+            _shared_model = None
+        with ProcessPoolExecutor(min(n_workers, len(pending)), mp_context=mp.get_context(method),
+                                 initializer=_init_negf_worker, initargs=(deeptb_model_path,)) as pool:
+            list(pool.map(_run_shared_negf,
+                          [(work_dir, sys_path, deeptb_model_path, modified_negf_input_config,
+                            use_common_self_energy) for sys_path in pending]))
+    except BrokenProcessPool as e:
+        raise RuntimeError(f"A NEGF worker process failed to start or died: {e}") from e
+    finally:
+        _shared_model = None
+
+
 def run_negf_task(
         modified_negf_input_config: Dict[str, Any],
         task_name: str,
@@ -103,20 +234,33 @@ def run_negf_task(
         negf_config: Dict[str, Any],
         work_path: str = "."
 ) -> Dict[str, Any]:
-    """Run DPNEGF for all relaxed systems in one relaxed-system archive."""
+    """
+    Run DPNEGF for all relaxed systems in one relaxed-system archive.
+
+    ``negf_config["n_workers"]`` (default 1) above 1 runs the snapshots
+    concurrently with a single model and shared lead self-energies; outputs
+    are still collected in snapshot order.
+    """
     deeptb_model_path = Path(deeptb_model_path).absolute()
     work_dir = Path(work_path).absolute() / task_name
     work_dir.mkdir(parents=True, exist_ok=True)
     relaxed_systems = unpack_files(relaxed_system_archive_path, work_dir)
     use_common_self_energy = negf_config.get("use_common_self_energy", True)
+    n_workers = int(negf_config.get("n_workers", 1))
 
     log_paths: List[Path] = []
     extra_output_archives: List[Path] = []
     negf_result_paths: List[Path] = []
 
     with temporary_chdir(work_dir):
+        if n_workers > 1 and len(relaxed_systems) > 1:
+            _run_negf_concurrently(relaxed_systems, deeptb_model_path, modified_negf_input_config,
+                                   use_common_self_energy, n_workers)
+        else:
+            for sys_path in relaxed_systems:
+                _run_single_negf(sys_path, deeptb_model_path, modified_negf_input_config, use_common_self_energy)
+
         for sys_path in relaxed_systems:
-            _run_single_negf(sys_path, deeptb_model_path, modified_negf_input_config, use_common_self_energy)
             run_dir = Path(sys_path.name.replace(".", "_"))
             log_paths.append((work_dir / run_dir / "log").absolute())
             extra_names = [name for name in ["dos.png", "transmission.png", "profile_report.html"] if (run_dir / name).exists()]
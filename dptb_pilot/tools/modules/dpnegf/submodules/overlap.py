@@ -51,7 +51,8 @@ def convert_overlap(
         input_path: Path,
         running_log_path: Path,
         overlap_csr_path: Path,
-        work_path: str = "."
+        work_path: str = ".",
+        num_workers: int = 1
 ) -> Dict[str, Any]:
     """Convert ABACUS sparse overlap CSR output to dftio overlaps.h5."""
     from dftio.io.parse import ParserRegister
@@ -75,7 +76,7 @@ def convert_overlap(
             "log_level": 20,
             "log_path": None,
             "mode": "abacus",
-            "num_workers": 1,
+            "num_workers": num_workers,
             "root": "../",
             "prefix": work_dir.name,
             "outroot": "convert_result",
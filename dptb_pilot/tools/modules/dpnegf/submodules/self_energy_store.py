@@ -0,0 +1,240 @@
+"""
+Content-addressed on-disk store of DPNEGF lead self-energies.
+
+Lead self-energies only depend on the lead geometry, the DeePTB model, the
+energy grid and the k-points. Entries are keyed on a hash of exactly those
+inputs, so frozen leads are computed once and then reused across
+temperatures, pressures, snapshots, tasks and sessions. The store is shared
+through ``DPNEGF_SELF_ENERGY_STORE`` and trimmed to
+``DPNEGF_SELF_ENERGY_STORE_GB`` by evicting the least recently used entries.
+
+Several tasks may use the store at once. Every key has a file lock: readers
+hold it shared, which keeps the entry from being evicted, and a writer holds
+it exclusively while computing into a private temporary directory that is
+moved into place with ``os.replace`` on commit. A second process computing
+the same key waits for the first one and then reads its result.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from dptb_pilot.tools.modules.util.comm import hash_file
+
+DEFAULT_STORE_PATH = Path.home() / ".cache" / "dptb_pilot" / "self_energy"
+DEFAULT_STORE_GB = 20
+
+_COMPLETE_MARK = ".complete"
+_LOCK_DIR = ".locks"
+# temporary entry directories are named "<key>.tmp-<random>"
+_TMP_SEP = ".tmp-"
+
+# task_options entries that change the lead self-energies
+_ENERGY_GRID_KEYS = ("emin", "emax", "espacing", "e_fermi", "eta_lead", "sgf_solver", "ele_T", "unit")
+# stru_options entries that change the lead self-energies (k-mesh and lead settings)
+_LEAD_OPTION_KEYS = ("kmesh", "pbc", "gamma_center", "time_reversal_symmetry", "nel_atom")
+
+
+def _parse_id_range(id_range: str):
+    start, end = (int(value) for value in str(id_range).split("-"))
+    return start, end
+
+
+def _lead_fingerprint(atoms, lead_options: Dict[str, Any]) -> Dict[str, Any]:
+    import numpy as np
+
+    start, end = _parse_id_range(lead_options["id"])
+    lead = atoms[start:end]
+    return {
+        "numbers": lead.get_atomic_numbers().tolist(),
+        # frozen leads come back from LAMMPS with print-precision noise only
+        "positions": np.round(lead.get_positions(), 5).tolist(),
+        "cell": np.round(atoms.cell.array, 5).tolist(),
+        "options": {key: value for key, value in lead_options.items() if key != "id"},
+    }
+
+
+def self_energy_key(structure_path: Path,
+                    deeptb_model_path: Path,
+                    negf_input_config: Dict[str, Any]) -> str:
+    """
+    Hash of the lead atoms, model checkpoint, energy grid and k-points.
+
+    Parameters
+    ----------
+    structure_path : Path
+        Device structure whose ``lead_L``/``lead_R`` atom ranges are hashed.
+    deeptb_model_path : Path
+        DeePTB checkpoint; hashed by content.
+    negf_input_config : Dict[str, Any]
+        DPNEGF input config with ``task_options.stru_options``.
+
+    Returns
+    -------
+    str
+        Hex digest used as the store entry name.
+    """
+    from ase.io import read
+
+    atoms = read(str(structure_path))
+    task_options = negf_input_config["task_options"]
+    stru_options = task_options["stru_options"]
+    payload = {
+        "model": hash_file(deeptb_model_path),
+        "lead_L": _lead_fingerprint(atoms, stru_options["lead_L"]),
+        "lead_R": _lead_fingerprint(atoms, stru_options["lead_R"]),
+        "energy_grid": {key: task_options.get(key) for key in _ENERGY_GRID_KEYS},
+        "kpoints": {key: stru_options.get(key) for key in _LEAD_OPTION_KEYS},
+        "AtomicData_options": negf_input_config.get("AtomicData_options"),
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _dir_size(path: Path) -> int:
+    return sum(child.stat().st_size for child in path.rglob("*") if child.is_file())
+
+
+class SelfEnergyEntry:
+    """
+    One store entry, opened by :meth:`SelfEnergyStore.entry` under its key lock.
+
+    Attributes
+    ----------
+    path : Path
+        Directory to read the self-energies from when ``complete``, otherwise
+        the temporary directory to compute them into.
+    complete : bool
+        Whether the entry holds finished self-energies.
+    """
+
+    def __init__(self, store: "SelfEnergyStore", key: str, complete: bool):
+        self.store = store
+        self.key = key
+        self.complete = complete
+        if complete:
+            self.path = store.root / key
+        else:
+            self.path = Path(tempfile.mkdtemp(prefix=key + _TMP_SEP, dir=store.root))
+
+    def commit(self):
+        """Move the computed entry into place and trim the store to its size budget."""
+        if self.complete:
+            return
+        (self.path / _COMPLETE_MARK).write_text(str(time.time()), encoding="utf-8")
+        target = self.store.root / self.key
+        if target.exists():
+            # unfinished entry of an older run; the exclusive key lock is held
+            shutil.rmtree(target)
+        os.replace(self.path, target)
+        self.path = target
+        self.complete = True
+        self.store.evict(keep=self.key)
+
+    def discard(self):
+        if not self.complete:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+
+class SelfEnergyStore:
+    """
+    Directory of self-energy entries, one sub-directory per content key.
+
+    Parameters
+    ----------
+    root : Path
+        Store directory, created on demand.
+    max_bytes : int
+        Size budget. The entry committed last and entries in use are never
+        evicted.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    def _lock_path(self, key: str) -> Path:
+        lock_dir = self.root / _LOCK_DIR
+        lock_dir.mkdir(parents=True, exist_ok=True)
+        return lock_dir / f"{key}.lock"
+
+    def is_complete(self, key: str) -> bool:
+        """Whether a finished entry exists; marks it as recently used."""
+        mark = self.root / key / _COMPLETE_MARK
+        try:
+            os.utime(mark)
+        except FileNotFoundError:
+            return False
+        return True
+
+    @contextmanager
+    def entry(self, key: str):
+        """
+        Yield the :class:`SelfEnergyEntry` of ``key`` while holding its lock.
+
+        A complete entry is read under a shared lock. Otherwise the lock is
+        taken exclusively and the entry points at a temporary directory; it is
+        dropped if the block exits without :meth:`SelfEnergyEntry.commit`.
+        """
+        with open(self._lock_path(key), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_SH)
+            complete = self.is_complete(key)
+            if not complete:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                # another process may have committed it while we waited
+                complete = self.is_complete(key)
+                if complete:
+                    fcntl.flock(lock, fcntl.LOCK_SH)
+            entry = SelfEnergyEntry(self, key, complete)
+            try:
+                yield entry
+            finally:
+                entry.discard()
+
+    def _remove_unused(self, key: str, path: Path) -> bool:
+        with open(self._lock_path(key), "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            shutil.rmtree(path, ignore_errors=True)
+            return True
+
+    def evict(self, keep: Optional[str] = None):
+        """
+        Remove least recently used entries until the store fits its budget.
+
+        Directories without a ``.complete`` mark (interrupted or legacy
+        entries) count towards the budget and go first. Entries whose lock is
+        held by a reader or writer are skipped.
+        """
+        entries = []
+        for path in self.root.iterdir():
+            if path.name == _LOCK_DIR or not path.is_dir():
+                continue
+            try:
+                last_used = (path / _COMPLETE_MARK).stat().st_mtime
+            except FileNotFoundError:
+                last_used = float("-inf")
+            entries.append((last_used, path, _dir_size(path)))
+        total = sum(size for _, _, size in entries)
+        for _, path, size in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            key = path.name.split(_TMP_SEP)[0]
+            if key == keep or not self._remove_unused(key, path):
+                continue
+            total -= size
+
+
+def default_store() -> SelfEnergyStore:
+    """Store configured by ``DPNEGF_SELF_ENERGY_STORE``/``DPNEGF_SELF_ENERGY_STORE_GB``."""
+    root = os.environ.get("DPNEGF_SELF_ENERGY_STORE") or DEFAULT_STORE_PATH
+    max_gb = float(os.environ.get("DPNEGF_SELF_ENERGY_STORE_GB", DEFAULT_STORE_GB))
+    return SelfEnergyStore(Path(root), int(max_gb * 1024 ** 3))
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from dptb_pilot.tools.init import mcp
 from dptb_pilot.tools.modules.dpnegf.results_unified import (
@@ -8,11 +8,13 @@ from dptb_pilot.tools.modules.dpnegf.results_unified import (
     ConvertOverlapResult,
     PrepLammpsTasksResult,
     PrepNegfTasksResult,
+    RunDpnegfLammpsGridResult,
     RunDpnegfLammpsResult,
     RunDpnegfResult,
 )
 from dptb_pilot.tools.modules.dpnegf.submodules.lammps import (
     prepare_lammps_tasks,
+    run_lammps_grid,
     run_lammps_task,
 )
 from dptb_pilot.tools.modules.dpnegf.submodules.negf import (
@@ -72,6 +74,35 @@ def dpnegf_run_lammps_task(
     )
 
 
+@mcp.tool()
+def dpnegf_run_lammps_grid(
+        task_root_path: Path,
+        deepmd_model_path: Path,
+        relax_config: Dict[str, Any],
+        work_path: str = ".",
+        mpi_ranks: int = 1,
+        omp_threads: int = 1,
+        core_budget: Optional[int] = None
+) -> RunDpnegfLammpsGridResult:
+    """
+    Run all tasks under a prepared ``task_root_path`` concurrently on this machine.
+
+    Each task uses ``mpi_ranks`` x ``omp_threads`` cores; the number of tasks
+    running at once is bounded by ``core_budget`` (physical cores by default).
+    Finished tasks are recorded in per-task ``status.json`` files and skipped
+    when the grid is run again, so an interrupted grid resumes where it stopped.
+    """
+    return run_lammps_grid(
+        task_root_path=task_root_path,
+        deepmd_model_path=deepmd_model_path,
+        relax_config=relax_config,
+        work_path=work_path,
+        mpi_ranks=mpi_ranks,
+        omp_threads=omp_threads,
+        core_budget=core_budget,
+    )
+
+
 @mcp.tool()
 def dpnegf_prepare_negf_tasks(
         negf_input_config: Dict[str, Any],
@@ -97,7 +128,13 @@ def dpnegf_run_negf_task(
         negf_config: Dict[str, Any],
         work_path: str = "."
 ) -> RunDpnegfResult:
-    """Run one DPNEGF task on a packed relaxed-system archive."""
+    """
+    Run one DPNEGF task on a packed relaxed-system archive.
+
+    ``negf_config`` may set ``use_common_self_energy`` (default True) and
+    ``n_workers`` (default 1); with more workers the snapshots run concurrently
+    on one loaded model and shared lead self-energies.
+    """
     return run_negf_task(
         modified_negf_input_config=modified_negf_input_config,
         task_name=task_name,
@@ -134,13 +171,15 @@ def dpnegf_convert_overlap(
         input_path: Path,
         running_log_path: Path,
         overlap_csr_path: Path,
-        work_path: str = "."
+        work_path: str = ".",
+        num_workers: int = 1
 ) -> ConvertOverlapResult:
-    """Convert ABACUS sparse overlap CSR output to dftio overlaps.h5."""
+    """Convert ABACUS sparse overlap CSR output to dftio overlaps.h5 with ``num_workers`` dftio workers."""
     return convert_overlap(
         stru_path=stru_path,
         input_path=input_path,
         running_log_path=running_log_path,
         overlap_csr_path=overlap_csr_path,
         work_path=work_path,
+        num_workers=num_workers,
     )
@@ -1,14 +1,46 @@
 import os
 import httpx
+import numpy as np
 from dptb_pilot.tools.init import mcp
 from typing import List, Dict, Any
-from pymatgen.core import Structure
+from pymatgen.core import Lattice, Structure
+from dptb_pilot.tools.modules.knowledge.http_cache import cached_get
+from dptb_pilot.tools.modules.knowledge.structure_index import default_index, format_index_rows, record_quietly
 
 # OPTIMADE endpoint for C2DB at DTU
 C2DB_BASE_URL = "https://cmr-optimade.fysik.dtu.dk/v1"
 
+
+def _lattice_properties(lattice_vectors) -> Dict[str, Any]:
+    """Cell lengths, angles and volume of an OPTIMADE ``lattice_vectors`` matrix, if complete."""
+    try:
+        matrix = np.array(lattice_vectors, dtype=float)
+        # OPTIMADE may leave non-periodic vectors as nulls
+        if matrix.shape != (3, 3) or not np.isfinite(matrix).all():
+            return {}
+        lattice = Lattice(matrix)
+    except (TypeError, ValueError):
+        return {}
+    return {
+        "a": lattice.a, "b": lattice.b, "c": lattice.c,
+        "alpha": lattice.alpha, "beta": lattice.beta, "gamma": lattice.gamma,
+        "volume": lattice.volume,
+    }
+
+
+def _index_results(index, results: List[Dict[str, Any]]):
+    for item in results:
+        attrs = item.get("attributes", {})
+        properties = {
+            "formula": attrs.get("chemical_formula_reduced") or attrs.get("chemical_formula_descriptive"),
+        }
+        if attrs.get("lattice_vectors"):
+            properties.update(_lattice_properties(attrs["lattice_vectors"]))
+        index.upsert("c2db", item.get("id"), properties)
+
+
 @mcp.tool()
-def search_c2db(query: str, limit: int = 5) -> str:
+async def search_c2db(query: str, limit: int = 5) -> str:
     """
     Search for 2D materials in the C2DB database using OPTIMADE API.
     
@@ -20,6 +52,16 @@ def search_c2db(query: str, limit: int = 5) -> str:
     Returns:
         Formatted list of materials with C2DB IDs and properties.
     """
+    # Answer from the local structure index first; works without outbound network
+    index = default_index()
+    try:
+        local = index.search_query(query, source="c2db", limit=limit)
+    except Exception as e:
+        print(f"Warning: local structure index unavailable: {e}")
+        local = []
+    if len(local) >= limit:
+        return format_index_rows(local, query, "C2DB", "download_c2db_structure")
+
     try:
         url = f"{C2DB_BASE_URL}/structures"
         
@@ -34,36 +76,40 @@ def search_c2db(query: str, limit: int = 5) -> str:
             "response_fields": "id,chemical_formula_descriptive,chemical_formula_reduced,lattice_vectors"
         }
         
-        with httpx.Client(timeout=15.0) as client:
-            response = client.get(url, params=params)
-            response.raise_for_status()
+        response = await cached_get(url, params=params)
+        response.raise_for_status()
+        
+        data = response.json()
+        results = data.get("data", [])
+        
+        if not results:
+            if local:
+                return format_index_rows(local, query, "C2DB", "download_c2db_structure")
+            return f"No 2D materials found in C2DB for query: {query}"
+        record_quietly(_index_results, index, results)
             
-            data = response.json()
-            results = data.get("data", [])
+        output = f"Found {len(results)} materials in C2DB for '{query}' (showing top {len(results)}):\n\n"
+        
+        for i, item in enumerate(results):
+            c2db_id = item.get("id")
+            # Try to get readable formula
+            attrs = item.get("attributes", {})
+            formula = attrs.get("chemical_formula_descriptive") or attrs.get("chemical_formula_reduced")
             
-            if not results:
-                return f"No 2D materials found in C2DB for query: {query}"
-                
-            output = f"Found {len(results)} materials in C2DB for '{query}' (showing top {len(results)}):\n\n"
+            output += f"{i+1}. **ID: {c2db_id}** - {formula}\n"
             
-            for i, item in enumerate(results):
-                c2db_id = item.get("id")
-                # Try to get readable formula
-                attrs = item.get("attributes", {})
-                formula = attrs.get("chemical_formula_descriptive") or attrs.get("chemical_formula_reduced")
-                
-                output += f"{i+1}. **ID: {c2db_id}** - {formula}\n"
-                
-            output += "\nTo download, use `download_c2db_structure` with the ID."
-            return output
+        output += "\nTo download, use `download_c2db_structure` with the ID."
+        return output
 
     except httpx.RequestError as e:
+        if local:
+            return format_index_rows(local, query, "C2DB", "download_c2db_structure")
         return f"Network error searching C2DB: {str(e)}"
     except Exception as e:
         return f"Error searching C2DB: {str(e)}"
 
 @mcp.tool()
-def download_c2db_structure(c2db_id: str, work_path: str = ".") -> str:
+async def download_c2db_structure(c2db_id: str, work_path: str = ".") -> str:
     """
     Download a structure from C2DB by its ID and save as CIF.
     
@@ -75,53 +121,58 @@ def download_c2db_structure(c2db_id: str, work_path: str = ".") -> str:
         Success message with path.
     """
     try:
-        # OPTIMADE /structures/{id} endpoint
-        url = f"{C2DB_BASE_URL}/structures/{c2db_id}"
+        index = default_index()
+        cif_text = index.get_cif("c2db", c2db_id)
+        if cif_text is not None:
+            struct = Structure.from_str(cif_text, fmt="cif")
+        else:
+            # OPTIMADE /structures/{id} endpoint
+            url = f"{C2DB_BASE_URL}/structures/{c2db_id}"
+        
+            response = await cached_get(url, timeout=30.0)
         
-        with httpx.Client(timeout=30.0) as client:
-            response = client.get(url)
-            
             if response.status_code == 404:
                 return f"Error: C2DB ID {c2db_id} not found."
-                
-            response.raise_for_status()
             
+            response.raise_for_status()
+        
             data = response.json()
             entry = data.get("data")
             if not entry:
                  return f"Error: Empty response for ID {c2db_id}"
-                 
+             
             attrs = entry.get("attributes", {})
-            
+        
             # Convert OPTIMADE structure to Pymatgen Structure
             # OPTIMADE fields:
             # - lattice_vectors: 3x3 matrix
             # - cartesian_site_positions: Nx3 matrix
             # - species_at_sites: list of strings (element symbols)
-            
+        
             lattice = attrs.get("lattice_vectors")
             coords = attrs.get("cartesian_site_positions")
             species = attrs.get("species_at_sites") # e.g., ["Mo", "S", "S"]
-            
+        
             if not lattice or not coords or not species:
                 return "Error: Incomplete structure data from OPTIMADE API."
-                
+            
             # Create Pymatgen structure
             # Note: species_at_sites in OPTIMADE usually maps to element symbols directly
             # but sometimes referencing 'species' list. C2DB usually creates simple species.
-            
+        
             struct = Structure(lattice, species, coords, coords_are_cartesian=True)
-            
-            # Save
-            if not os.path.exists(work_path):
-                 os.makedirs(work_path, exist_ok=True)
-                 
-            filename = f"{c2db_id}.cif"
-            save_path = os.path.join(work_path, filename)
-            
-            struct.to(filename=save_path)
-            
-            return f"Successfully downloaded C2DB structure {c2db_id} to `{save_path}`."
+            record_quietly(index.add_structure, "c2db", c2db_id, struct)
+        
+        # Save
+        if not os.path.exists(work_path):
+             os.makedirs(work_path, exist_ok=True)
+             
+        filename = f"{c2db_id}.cif"
+        save_path = os.path.join(work_path, filename)
+        
+        struct.to(filename=save_path)
+        
+        return f"Successfully downloaded C2DB structure {c2db_id} to `{save_path}`."
 
     except Exception as e:
         return f"Error downloading C2DB structure {c2db_id}: {str(e)}"
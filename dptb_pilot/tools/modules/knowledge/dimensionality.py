@@ -0,0 +1,108 @@
+"""
+Bonding-graph dimensionality of crystal structures.
+
+Structures are classified with the Larsen method (connected components of the
+CrystalNN bonding graph): 0 for molecular crystals, 1 for chains, 2 for
+layered and 3 for bulk frameworks. Classification costs roughly 0.1 s per
+small cell, so larger batches are spread over a process pool and the
+results are meant to be cached per material in the structure index.
+
+The pool is created on first use and kept for the life of the process. Its
+workers are started with ``forkserver`` (``spawn`` where unavailable), since
+forking the multi-threaded tool server is unsafe. Batches smaller than
+``DEFAULT_MIN_POOL_SIZE`` are classified in the calling thread.
+"""
+import multiprocessing as mp
+import os
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+from dptb_pilot.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_N_WORKERS = 4
+# below this many structures, starting workers costs more than it saves
+DEFAULT_MIN_POOL_SIZE = 8
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def default_n_workers() -> int:
+    """Worker count from ``DPTB_DIMENSIONALITY_WORKERS``."""
+    return max(int(os.environ.get("DPTB_DIMENSIONALITY_WORKERS", DEFAULT_N_WORKERS)), 1)
+
+
+def classify_dimensionality(structure_dict: Dict[str, Any]) -> Optional[int]:
+    """
+    Larsen dimensionality of a structure given as ``Structure.as_dict()``.
+
+    Returns ``None`` when the bonding graph cannot be built.
+    """
+    from pymatgen.analysis.dimensionality import get_dimensionality_larsen
+    from pymatgen.analysis.local_env import CrystalNN
+    from pymatgen.core import Structure
+
+    try:
+        with warnings.catch_warnings():
+            # CrystalNN warns about missing oxidation states on every site
+            warnings.simplefilter("ignore")
+            bonded = CrystalNN().get_bonded_structure(Structure.from_dict(structure_dict))
+            return int(get_dimensionality_larsen(bonded))
+    except Exception:
+        return None
+
+
+def _get_pool(n_workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+
+    with _pool_lock:
+        if _pool is None or _pool_workers != n_workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=n_workers, mp_context=mp.get_context(method))
+            _pool_workers = n_workers
+        return _pool
+
+
+def shutdown_pool():
+    """Stop the shared worker pool; the next large batch starts a new one."""
+    global _pool, _pool_workers
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = None
+        _pool_workers = 0
+
+
+def classify_many(structures: Dict[str, Dict[str, Any]], n_workers: Optional[int] = None,
+                  min_pool_size: int = DEFAULT_MIN_POOL_SIZE) -> Dict[str, Optional[int]]:
+    """
+    Classify ``{material_id: Structure.as_dict()}``.
+
+    Batches of at least ``min_pool_size`` structures go to the shared process
+    pool when ``n_workers > 1``; smaller ones are classified in this thread.
+
+    Returns
+    -------
+    Dict[str, Optional[int]]
+        Dimensionality per material id, ``None`` where classification failed.
+    """
+    n_workers = default_n_workers() if n_workers is None else max(int(n_workers), 1)
+    ids = list(structures)
+    if n_workers > 1 and len(ids) >= max(min_pool_size, 2):
+        try:
+            values = _get_pool(n_workers).map(classify_dimensionality,
+                                              [structures[material_id] for material_id in ids])
+            return dict(zip(ids, values))
+        except BrokenProcessPool as e:
+            logger.warning(f"Dimensionality worker pool broke ({e}); classifying {len(ids)} structures serially")
+            shutdown_pool()
+    return {material_id: classify_dimensionality(structures[material_id]) for material_id in ids}
@@ -0,0 +1,170 @@
+"""
+Shared async HTTP client and on-disk TTL response cache for the database tools.
+
+The COD, C2DB and Materials Project tools used to open a fresh connection per
+call and block the MCP event loop. They now share one pooled
+``httpx.AsyncClient`` per event loop and look responses up in a JSON cache
+keyed on the normalized request (namespace, URL and query parameters with
+keys sorted and ``None`` values dropped), so repeated
+lookups across chats and sessions do not hit the network until the entry
+expires.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "dptb_pilot" / "http"
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_CONNECTIONS = 20
+
+# event loop -> (its client, task closing the client when the loop shuts down)
+_clients: Dict[Any, Tuple[httpx.AsyncClient, "asyncio.Task"]] = {}
+
+
+async def _close_on_shutdown(loop, client: httpx.AsyncClient):
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await client.aclose()
+        if _clients.get(loop, (None,))[0] is client:
+            del _clients[loop]
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Pooled ``httpx.AsyncClient`` of the running event loop, shared by all database tools.
+
+    A client is bound to the loop it was created in, so every loop gets its
+    own. It is closed in that loop when the loop cancels its pending tasks on
+    shutdown, as ``asyncio.run`` does, instead of being left open once a later
+    loop (e.g. the next ``asyncio.run``) replaces it.
+    """
+    loop = asyncio.get_running_loop()
+    entry = _clients.get(loop)
+    if entry is not None and not entry[0].is_closed:
+        return entry[0]
+    if entry is not None:
+        entry[1].cancel()
+    client = httpx.AsyncClient(
+        timeout=30.0,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=DEFAULT_MAX_CONNECTIONS,
+                            max_keepalive_connections=DEFAULT_MAX_CONNECTIONS),
+    )
+    _clients[loop] = (client, loop.create_task(_close_on_shutdown(loop, client)))
+    return client
+
+
+def _normalize(value):
+    # only key order and None values are normalized; values are sent as given
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))
+                if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def cache_key(namespace: str, request: Dict[str, Any]) -> str:
+    """Hash of the namespace and the request with ``None`` dropped and keys sorted."""
+    payload = json.dumps({"namespace": namespace, "request": _normalize(request)}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Directory of JSON entries that expire ``ttl`` seconds after being stored.
+
+    Parameters
+    ----------
+    root : Path
+        Cache directory, created on demand.
+    ttl : float
+        Lifetime of an entry in seconds; ``0`` disables the cache.
+    """
+
+    def __init__(self, root: Path, ttl: float = DEFAULT_TTL):
+        self.root = Path(root)
+        self.ttl = ttl
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, namespace: str, request: Dict[str, Any]) -> Optional[Any]:
+        if self.ttl <= 0:
+            return None
+        path = self._path(cache_key(namespace, request))
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("created", 0) > self.ttl:
+            return None
+        return entry["value"]
+
+    def put(self, namespace: str, request: Dict[str, Any], value: Any):
+        if self.ttl <= 0:
+            return
+        path = self._path(cache_key(namespace, request))
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps({"created": time.time(), "value": value}), encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError:
+            # the cache is an optimization only
+            pass
+
+
+def default_cache() -> ResponseCache:
+    """Cache configured by ``DPTB_HTTP_CACHE_DIR``/``DPTB_HTTP_CACHE_TTL``."""
+    root = os.environ.get("DPTB_HTTP_CACHE_DIR") or DEFAULT_CACHE_DIR
+    ttl = float(os.environ.get("DPTB_HTTP_CACHE_TTL", DEFAULT_TTL))
+    return ResponseCache(Path(root), ttl)
+
+
+class CachedResponse:
+    """The parts of an HTTP response the tools use, restorable from the cache."""
+
+    def __init__(self, status_code: int, text: str, url: str = ""):
+        self.status_code = status_code
+        self.text = text
+        self.url = url
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise httpx.HTTPStatusError(f"HTTP {self.status_code} for {self.url}",
+                                        request=httpx.Request("GET", self.url),
+                                        response=httpx.Response(self.status_code, text=self.text))
+
+
+async def cached_get(url: str,
+                     params: Optional[Dict[str, Any]] = None,
+                     timeout: float = 15.0,
+                     cache: Optional[ResponseCache] = None) -> CachedResponse:
+    """
+    GET through the shared client, answering from the cache when possible.
+
+    Only successful (200) responses are cached, so transient errors are retried
+    on the next call.
+    """
+    cache = cache or default_cache()
+    request = {"url": url, "params": params}
+    cached = cache.get("http", request)
+    if cached is not None:
+        return CachedResponse(cached["status_code"], cached["text"], url)
+
+    response = await get_async_client().get(url, params=params, timeout=timeout)
+    result = CachedResponse(response.status_code, response.text, str(response.url))
+    if response.status_code == 200:
+        cache.put("http", request, {"status_code": response.status_code, "text": response.text})
+    return result
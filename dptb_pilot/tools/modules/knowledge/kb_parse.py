@@ -0,0 +1,187 @@
+"""
+Chunking of knowledge-base source files.
+
+Kept apart from ``scripts/build_kb.py`` so that parse worker processes, which
+are started with ``forkserver``/``spawn``, import only the parsers and not
+chromadb or the embedding model.
+"""
+import ast
+import hashlib
+import json
+import os
+
+import pypdf
+
+TEXT_EXTENSIONS = (".md", ".txt", ".rst")
+
+
+def process_python_file(file_path):
+    """Parse Python file using AST to extract classes and functions."""
+    chunks = []
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            content = f.read()
+            
+        tree = ast.parse(content)
+        filename = os.path.basename(file_path)
+        
+        # 1. Extract Module Docstring
+        docstring = ast.get_docstring(tree)
+        if docstring:
+            chunks.append({
+                "text": f"File: {filename}\nType: Module Docstring\n\n{docstring}",
+                "metadata": {"source": file_path, "filename": filename, "type": "code_doc"},
+                "span": "module"
+            })
+
+        # 2. Extract Classes and Functions
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                # Get full source of the function
+                start_line = node.lineno
+                end_line = node.end_lineno
+                func_content = content.splitlines()[start_line-1:end_line]
+                func_text = "\n".join(func_content)
+                
+                chunks.append({
+                    "text": f"File: {filename}\nType: Function\nName: {node.name}\n\n{func_text}",
+                    "metadata": {"source": file_path, "filename": filename, "type": "function", "name": node.name},
+                    "span": f"{start_line}-{end_line}"
+                })
+                
+            elif isinstance(node, ast.ClassDef):
+                # Get full source of the class
+                start_line = node.lineno
+                end_line = node.end_lineno
+                class_content = content.splitlines()[start_line-1:end_line]
+                class_text = "\n".join(class_content)
+                
+                chunks.append({
+                    "text": f"File: {filename}\nType: Class\nName: {node.name}\n\n{class_text}",
+                    "metadata": {"source": file_path, "filename": filename, "type": "class", "name": node.name},
+                    "span": f"{start_line}-{end_line}"
+                })
+                
+    except Exception as e:
+        print(f"Error parsing Python file {file_path}: {e}")
+        # Fallback to simple chunking if AST fails
+        return process_text_file(file_path, "code")
+        
+    return chunks
+
+def process_notebook_file(file_path):
+    """Parse Jupyter Notebook to extract code and markdown cells."""
+    chunks = []
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            notebook = json.load(f)
+            
+        filename = os.path.basename(file_path)
+        
+        for i, cell in enumerate(notebook.get("cells", [])):
+            cell_type = cell.get("cell_type")
+            source = "".join(cell.get("source", []))
+            
+            if not source.strip():
+                continue
+                
+            if cell_type == "markdown":
+                chunks.append({
+                    "text": f"File: {filename}\nType: Notebook Markdown\nCell: {i+1}\n\n{source}",
+                    "metadata": {"source": file_path, "filename": filename, "type": "notebook_md", "page": i+1},
+                    "span": f"cell{i+1}"
+                })
+            elif cell_type == "code":
+                chunks.append({
+                    "text": f"File: {filename}\nType: Notebook Code\nCell: {i+1}\n\n{source}",
+                    "metadata": {"source": file_path, "filename": filename, "type": "notebook_code", "page": i+1},
+                    "span": f"cell{i+1}"
+                })
+                
+    except Exception as e:
+        print(f"Error parsing Notebook {file_path}: {e}")
+        
+    return chunks
+
+def process_text_file(file_path, type_label="doc"):
+    """Simple chunking for text/markdown files."""
+    chunks = []
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            content = f.read()
+            
+        filename = os.path.basename(file_path)
+        chunk_size = 1000
+        overlap = 200
+        
+        for i in range(0, len(content), chunk_size - overlap):
+            chunk = content[i : i + chunk_size]
+            if len(chunk) < 50:
+                continue
+                
+            chunks.append({
+                "text": f"File: {filename}\nType: {type_label}\n\n{chunk}",
+                "metadata": {"source": file_path, "filename": filename, "type": type_label},
+                "span": f"{i}-{i + len(chunk)}"
+            })
+    except Exception as e:
+        print(f"Error reading file {file_path}: {e}")
+        
+    return chunks
+
+def process_pdf_file(file_path):
+    """Split each PDF page into overlapping text chunks."""
+    chunks = []
+    file = os.path.basename(file_path)
+    try:
+        reader = pypdf.PdfReader(file_path)
+        for i, page in enumerate(reader.pages):
+            text = page.extract_text()
+            if not text: continue
+
+            chunk_size = 1000
+            overlap = 200
+            for j in range(0, len(text), chunk_size - overlap):
+                chunk = text[j : j + chunk_size]
+                if len(chunk) < 50: continue
+
+                chunks.append({
+                    "text": f"File: {file}\nPage: {i+1}\n\n{chunk}",
+                    "metadata": {"source": file_path, "filename": file, "type": "pdf", "page": i+1},
+                    "span": f"p{i+1}:{j}-{j + len(chunk)}"
+                })
+    except Exception as e:
+        print(f"Error processing PDF {file_path}: {e}")
+
+    return chunks
+
+
+def process_file(file_path):
+    """Dispatch a source file to its chunker by extension."""
+    file = os.path.basename(file_path)
+    if file.endswith(".py"):
+        print(f"  [AST] Parsing Python: {file}")
+        return process_python_file(file_path)
+    if file.endswith(".ipynb"):
+        print(f"  [NB]  Parsing Notebook: {file}")
+        return process_notebook_file(file_path)
+    if file.endswith(TEXT_EXTENSIONS):
+        print(f"  [DOC] Reading Document: {file}")
+        return process_text_file(file_path, "doc")
+    if file.endswith(".pdf"):
+        print(f"  [PDF] Reading Paper: {file}")
+        return process_pdf_file(file_path)
+    return []
+
+
+def chunk_id(source, span, text):
+    """Deterministic chunk id: unchanged chunks keep their id (and embedding) across builds."""
+    return hashlib.sha256(f"{source}\0{span}\0{text}".encode("utf-8")).hexdigest()
+
+
+def parse_file(file_path):
+    """Chunk one file; returns ``(file_path, {chunk_id: chunk})``."""
+    chunks = {}
+    for chunk in process_file(file_path):
+        chunks[chunk_id(file_path, chunk["span"], chunk["text"])] = chunk
+    return file_path, chunks
@@ -1,11 +1,134 @@
+import asyncio
 import os
+import threading
 from typing import List, Dict, Any
 from mp_api.client import MPRester
+from pymatgen.core import Structure
 from pymatgen.io.cif import CifWriter
 from dptb_pilot.tools.init import mcp
+from dptb_pilot.tools.modules.knowledge.dimensionality import classify_many
+from dptb_pilot.tools.modules.knowledge.http_cache import default_cache
+from dptb_pilot.tools.modules.knowledge.structure_index import default_index, format_index_rows, record_quietly
+
+# summary searches only print these, the structure is fetched by download_mp_structure
+SUMMARY_FIELDS = ["material_id", "formula_pretty", "symmetry", "energy_above_hull",
+                  "formation_energy_per_atom", "band_gap", "is_metal"]
+# candidates fetched per requested result when filtering by dimensionality
+DIMENSIONALITY_OVERFETCH = 5
+
+_mpr = None
+_mpr_api_key = None
+_mpr_lock = threading.Lock()
+
+
+def _get_mprester(api_key: str) -> MPRester:
+    """One ``MPRester`` (and HTTP session) per API key, shared by all MP tool calls."""
+    global _mpr, _mpr_api_key
+    with _mpr_lock:
+        if _mpr is None or _mpr_api_key != api_key:
+            if _mpr is not None:
+                try:
+                    _mpr.session.close()
+                except Exception:
+                    pass
+            _mpr = MPRester(api_key)
+            _mpr_api_key = api_key
+        return _mpr
+
+
+def _summary_to_dict(doc) -> Dict[str, Any]:
+    return {
+        "material_id": str(doc.material_id),
+        "formula_pretty": doc.formula_pretty,
+        "symmetry": {
+            "symbol": doc.symmetry.symbol,
+            "number": doc.symmetry.number,
+            "crystal_system": str(doc.symmetry.crystal_system),
+            "point_group": doc.symmetry.point_group,
+        },
+        "energy_above_hull": doc.energy_above_hull,
+        "formation_energy_per_atom": doc.formation_energy_per_atom,
+        "band_gap": doc.band_gap,
+        "is_metal": doc.is_metal,
+    }
+
+
+def _search_summaries(api_key: str, query: str, search_args: Dict[str, Any]) -> List[Dict[str, Any]]:
+    mpr = _get_mprester(api_key)
+    # Try searching by formula or elements
+    docs = mpr.summary.search(
+        formula=query if "-" not in query and "mp-" not in query else None,
+        chemsys=query if "-" in query else None,
+        material_ids=[query] if "mp-" in query else None,
+        **search_args
+    )
+
+    # If standard search fails or returns nothing, and it looks like a formula, try strict formula
+    if not docs and "mp-" not in query:
+        docs = mpr.summary.search(formula=query, **search_args)
+    return [_summary_to_dict(doc) for doc in docs]
+
+
+def _index_summaries(index, docs: List[Dict[str, Any]]):
+    for doc in docs:
+        symmetry = doc["symmetry"]
+        index.upsert("mp", doc["material_id"], {
+            "formula": doc["formula_pretty"],
+            "spacegroup_symbol": symmetry["symbol"],
+            "spacegroup_number": symmetry["number"],
+            "crystal_system": symmetry["crystal_system"],
+            "band_gap": doc["band_gap"],
+            "is_metal": doc["is_metal"],
+            "energy_above_hull": doc["energy_above_hull"],
+            "formation_energy_per_atom": doc["formation_energy_per_atom"],
+        })
+
+
+def _fetch_structures(api_key: str, material_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    mpr = _get_mprester(api_key)
+    docs = mpr.summary.search(material_ids=material_ids, fields=["material_id", "structure"])
+    return {str(doc.material_id): doc.structure.as_dict() for doc in docs}
+
+
+async def _dimensionalities(api_key: str, index, material_ids: List[str]) -> Dict[str, int]:
+    """
+    Larsen dimensionality per material, computed once and cached in the structure index.
+
+    Structures come from the response cache or one batched MP request; the
+    classification runs in a process pool off the event loop.
+    """
+    try:
+        known = index.get_column("mp", material_ids, "dimensionality")
+    except Exception as e:
+        print(f"Warning: local structure index unavailable: {e}")
+        known = {}
+    missing = [material_id for material_id in material_ids if material_id not in known]
+    if not missing:
+        return known
+
+    cache = default_cache()
+    structures = {}
+    for material_id in missing:
+        structure_dict = cache.get("mp_structure", {"mp_id": material_id})
+        if structure_dict is not None:
+            structures[material_id] = structure_dict
+    to_fetch = [material_id for material_id in missing if material_id not in structures]
+    if to_fetch:
+        fetched = await asyncio.to_thread(_fetch_structures, api_key, to_fetch)
+        for material_id, structure_dict in fetched.items():
+            cache.put("mp_structure", {"mp_id": material_id}, structure_dict)
+        structures.update(fetched)
+
+    computed = await asyncio.to_thread(classify_many, structures)
+    for material_id, value in computed.items():
+        if value is not None:
+            known[material_id] = value
+            record_quietly(index.upsert, "mp", material_id, {"dimensionality": value})
+    return known
+
 
 @mcp.tool()
-def search_materials_project(query: str, is_metal: bool = None, dimensionality: int = None, 
+async def search_materials_project(query: str, is_metal: bool = None, dimensionality: int = None, 
                            band_gap_min: float = None, band_gap_max: float = None,
                            energy_above_hull_max: float = None, limit: int = 3) -> str:
     """
@@ -23,86 +146,90 @@ def search_materials_project(query: str, is_metal: bool = None, dimensionality:
     Returns:
         A formatted string list of found materials with their IDs, formulas, band gap, stability, and structure info.
     """
+    # answer from the local structure index when it already holds enough matches
+    index = default_index()
+    try:
+        local = index.search_query(query, source="mp", is_metal=is_metal, band_gap_min=band_gap_min,
+                                   band_gap_max=band_gap_max, energy_above_hull_max=energy_above_hull_max,
+                                   dimensionality=dimensionality, limit=limit)
+    except Exception as e:
+        print(f"Warning: local structure index unavailable: {e}")
+        local = []
+    if len(local) >= limit:
+        return format_index_rows(local, query, "Materials Project", "download_mp_structure")
+
     api_key = os.environ.get("MP_API_KEY")
     if not api_key:
+        if local:
+            return format_index_rows(local, query, "Materials Project", "download_mp_structure")
         return "Error: MP_API_KEY environment variable not set. Please configure it in .env."
 
     try:
-        with MPRester(api_key) as mpr:
-            # Prepare search arguments
-            search_args = {
-                "fields": ["material_id", "formula_pretty", "symmetry", "energy_above_hull", "formation_energy_per_atom", "band_gap", "is_metal", "structure"],
-                "num_chunks": 1,
-                "chunk_size": limit
-            }
-            
-            if is_metal is not None:
-                search_args["is_metal"] = is_metal
-            
-            if band_gap_min is not None or band_gap_max is not None:
-                search_args["band_gap"] = (band_gap_min if band_gap_min is not None else 0, 
-                                         band_gap_max if band_gap_max is not None else 100)
-                                         
-            if energy_above_hull_max is not None:
-                search_args["energy_above_hull"] = (0, energy_above_hull_max)
-
-            # Try searching by formula or elements
-            docs = mpr.summary.search(
-                formula=query if "-" not in query and "mp-" not in query else None,
-                chemsys=query if "-" in query else None,
-                material_ids=[query] if "mp-" in query else None,
-                **search_args
-            )
-            
-            # If standard search fails or returns nothing, and it looks like a formula, try strict formula
-            if not docs and "mp-" not in query:
-                 docs = mpr.summary.search(formula=query, **search_args)
-
-            # Filter by dimensionality if requested
-            # Since summary docs might not have dimensionality directly, we might need to infer it or it might be there.
-            # Let's assume we filter by checking the structure if we have it, or rely on the agent to check the description.
-            # Wait, fetching structure for all search results is heavy.
-            # Let's check if we can filter by 'dimensionality' in search. 
-            # If not, we will rely on the output description.
-            # But wait, the user wants "Graphene".
-            # Let's add logic to calculate dimensionality if possible, or just return symmetry which is a good proxy.
-            # Spacegroup 191 (P6/mmm) is typical for Graphene.
-            
-            # Let's just return more detailed info so the Agent can decide.
-            
-            # Sort by stability (energy above hull)
-            docs.sort(key=lambda x: x.energy_above_hull)
-            
-            filtered_docs = []
-            for doc in docs:
-                if dimensionality is not None:
-                    # Heuristic: 2D materials usually have specific space groups or we can try to use pymatgen's dimensionality finder if structure is available.
-                    # But structure is heavy.
-                    # Let's just return all and let the Agent read the symmetry.
-                    pass
-                filtered_docs.append(doc)
-            
-            results = filtered_docs[:limit]
-            
-            if not results:
-                return f"No materials found for query: {query}"
-            
-            output = f"Found {len(results)} materials for '{query}' (showing top {len(results)}):\n\n"
-            for i, doc in enumerate(results):
-                output += f"{i+1}. **{doc.formula_pretty}** (ID: `{doc.material_id}`)\n"
-                output += f"   - Symmetry: {doc.symmetry.symbol} (No. {doc.symmetry.number}, {doc.symmetry.crystal_system}, Point Group: {doc.symmetry.point_group})\n"
-                output += f"   - Band Gap: {doc.band_gap:.3f} eV ({'Metal' if doc.is_metal else 'Insulator/Semiconductor'})\n"
-                output += f"   - Stability: {doc.energy_above_hull:.3f} eV/atom above hull\n"
-                output += f"   - Formation Energy: {doc.formation_energy_per_atom:.3f} eV/atom\n\n"
-                
-            output += "To download a structure, use the `download_mp_structure` tool with the Material ID."
-            return output
+        # Prepare search arguments
+        search_args = {
+            "fields": SUMMARY_FIELDS,
+            "num_chunks": 1,
+            # over-fetch when the dimensionality filter will drop candidates
+            "chunk_size": limit if dimensionality is None else limit * DIMENSIONALITY_OVERFETCH
+        }
+
+        if is_metal is not None:
+            search_args["is_metal"] = is_metal
+
+        if band_gap_min is not None or band_gap_max is not None:
+            search_args["band_gap"] = (band_gap_min if band_gap_min is not None else 0,
+                                     band_gap_max if band_gap_max is not None else 100)
+
+        if energy_above_hull_max is not None:
+            search_args["energy_above_hull"] = (0, energy_above_hull_max)
+
+        cache = default_cache()
+        request = {"query": query, **search_args}
+        docs = cache.get("mp_summary", request)
+        if docs is None:
+            try:
+                # MPRester is synchronous, keep it off the MCP event loop
+                docs = await asyncio.to_thread(_search_summaries, api_key, query, search_args)
+            except Exception:
+                # offline: fall back to whatever the local index has
+                if local:
+                    return format_index_rows(local, query, "Materials Project", "download_mp_structure")
+                raise
+            cache.put("mp_summary", request, docs)
+            record_quietly(_index_summaries, index, docs)
+
+        # Sort by stability (energy above hull)
+        docs = sorted(docs, key=lambda x: x["energy_above_hull"])
+
+        # Filter by dimensionality if requested
+        dims = {}
+        if dimensionality is not None:
+            dims = await _dimensionalities(api_key, index, [doc["material_id"] for doc in docs])
+            docs = [doc for doc in docs if dims.get(doc["material_id"]) == dimensionality]
+        results = docs[:limit]
+
+        if not results:
+            return f"No materials found for query: {query}"
+
+        output = f"Found {len(results)} materials for '{query}' (showing top {len(results)}):\n\n"
+        for i, doc in enumerate(results):
+            symmetry = doc["symmetry"]
+            output += f"{i+1}. **{doc['formula_pretty']}** (ID: `{doc['material_id']}`)\n"
+            output += f"   - Symmetry: {symmetry['symbol']} (No. {symmetry['number']}, {symmetry['crystal_system']}, Point Group: {symmetry['point_group']})\n"
+            if doc["material_id"] in dims:
+                output += f"   - Dimensionality: {dims[doc['material_id']]}D\n"
+            output += f"   - Band Gap: {doc['band_gap']:.3f} eV ({'Metal' if doc['is_metal'] else 'Insulator/Semiconductor'})\n"
+            output += f"   - Stability: {doc['energy_above_hull']:.3f} eV/atom above hull\n"
+            output += f"   - Formation Energy: {doc['formation_energy_per_atom']:.3f} eV/atom\n\n"
+
+        output += "To download a structure, use the `download_mp_structure` tool with the Material ID."
+        return output
 
     except Exception as e:
         return f"Error searching Materials Project: {str(e)}"
 
 @mcp.tool()
-def download_mp_structure(mp_id: str, filename: str = None, work_path: str = ".") -> str:
+async def download_mp_structure(mp_id: str, filename: str = None, work_path: str = ".") -> str:
     """
     Download a crystal structure from Materials Project by its ID.
     
@@ -114,37 +241,49 @@ def download_mp_structure(mp_id: str, filename: str = None, work_path: str = "."
     Returns:
         Success message with the path to the downloaded file.
     """
-    api_key = os.environ.get("MP_API_KEY")
-    if not api_key:
-        return "Error: MP_API_KEY environment variable not set."
-
     try:
-        with MPRester(api_key) as mpr:
-            structure = mpr.get_structure_by_material_id(mp_id)
-            
-            if not filename:
-                filename = f"{mp_id}.cif"
+        index = default_index()
+        cif_text = index.get_cif("mp", mp_id)
+        if cif_text is not None:
+            structure = Structure.from_str(cif_text, fmt="cif")
+        else:
+            api_key = os.environ.get("MP_API_KEY")
+            if not api_key:
+                return "Error: MP_API_KEY environment variable not set."
+
+            cache = default_cache()
+            structure_dict = cache.get("mp_structure", {"mp_id": mp_id})
+            if structure_dict is None:
+                mpr = _get_mprester(api_key)
+                structure = await asyncio.to_thread(mpr.get_structure_by_material_id, mp_id)
+                cache.put("mp_structure", {"mp_id": mp_id}, structure.as_dict())
+            else:
+                structure = Structure.from_dict(structure_dict)
+            record_quietly(index.add_structure, "mp", mp_id, structure)
+        
+        if not filename:
+            filename = f"{mp_id}.cif"
+        
+        if not filename.endswith(".cif") and not filename.endswith(".poscar"):
+            filename += ".cif"
             
-            if not filename.endswith(".cif") and not filename.endswith(".poscar"):
-                filename += ".cif"
-                
-            # Ensure work_path exists
-            if not os.path.exists(work_path):
-                try:
-                    os.makedirs(work_path, exist_ok=True)
-                except Exception as e:
-                    return f"Error creating workspace directory {work_path}: {e}"
+        # Ensure work_path exists
+        if not os.path.exists(work_path):
+            try:
+                os.makedirs(work_path, exist_ok=True)
+            except Exception as e:
+                return f"Error creating workspace directory {work_path}: {e}"
 
-            save_path = os.path.join(work_path, filename)
+        save_path = os.path.join(work_path, filename)
+        
+        # Write file
+        if filename.lower().endswith(".cif"):
+            writer = CifWriter(structure)
+            writer.write_file(save_path)
+        else:
+            structure.to(filename=save_path)
             
-            # Write file
-            if filename.lower().endswith(".cif"):
-                writer = CifWriter(structure)
-                writer.write_file(save_path)
-            else:
-                structure.to(filename=save_path)
-                
-            return f"Successfully downloaded structure {mp_id} to `{save_path}`. You can now visualize it using `visualize_structure`."
+        return f"Successfully downloaded structure {mp_id} to `{save_path}`. You can now visualize it using `visualize_structure`."
 
     except Exception as e:
         return f"Error downloading structure {mp_id}: {str(e)}"
@@ -1,4 +1,8 @@
+import json
 import os
+import threading
+from collections import OrderedDict
+
 import chromadb
 from sentence_transformers import SentenceTransformer
 from dptb_pilot.tools.init import mcp
@@ -7,24 +11,129 @@ from dptb_pilot.tools.init import mcp
 CHROMA_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "chroma_db")
 COLLECTION_NAME = "deeptb_knowledge"
 EMBEDDING_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+MANIFEST_PATH = os.path.join(CHROMA_DB_PATH, "kb_manifest.json")
+DEFAULT_CACHE_SIZE = 256
 
-# Global resources (lazy loaded)
+# Global resources (lazy loaded, or warmed by warmup_resources at tool-server start)
 _client = None
 _collection = None
 _model = None
+_resources_lock = threading.Lock()
+
+
+class _LRU:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+_cache_size = int(os.environ.get("DPTB_RAG_CACHE_SIZE", DEFAULT_CACHE_SIZE))
+_embedding_cache = _LRU(_cache_size)
+_result_cache = _LRU(_cache_size)
+# (mtime_ns, size) of the build manifest the caches and collection handle belong to
+_manifest_stamp = None
+_normalize_embeddings = False
+
+
+def _read_manifest_stamp():
+    try:
+        stat = os.stat(MANIFEST_PATH)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _check_manifest():
+    """Drop cached queries and the collection handle once the knowledge base has been rebuilt."""
+    global _collection, _manifest_stamp, _normalize_embeddings
+    stamp = _read_manifest_stamp()
+    if stamp == _manifest_stamp:
+        return
+    with _resources_lock:
+        if stamp == _manifest_stamp:
+            return
+        _embedding_cache.clear()
+        _result_cache.clear()
+        try:
+            with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+                _normalize_embeddings = bool(json.load(f).get("normalize_embeddings", False))
+        except (OSError, ValueError):
+            _normalize_embeddings = False
+        if _client is not None:
+            try:
+                _collection = _client.get_collection(name=COLLECTION_NAME)
+            except Exception as e:
+                print(f"Error reloading RAG collection: {e}")
+                _collection = None
+        _manifest_stamp = stamp
+
 
 def get_resources():
     global _client, _collection, _model
-    if _client is None:
-        try:
-            _client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
-            _collection = _client.get_collection(name=COLLECTION_NAME)
-            _model = SentenceTransformer(model_name_or_path=EMBEDDING_MODEL, local_files_only=True)
-        except Exception as e:
-            print(f"Error initializing RAG resources: {e}")
-            return None, None, None
+    with _resources_lock:
+        if _client is None:
+            try:
+                _client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
+                _collection = _client.get_collection(name=COLLECTION_NAME)
+                _model = SentenceTransformer(model_name_or_path=EMBEDDING_MODEL, local_files_only=True)
+            except Exception as e:
+                print(f"Error initializing RAG resources: {e}")
+                _client = _collection = _model = None
+                return None, None, None
+    _check_manifest()
     return _client, _collection, _model
 
+
+def warmup_resources():
+    """
+    Load the Chroma client and embedding model in a background thread.
+
+    Called at tool-server start so that the first knowledge query does not pay
+    the model load. Queries arriving earlier simply wait for the same lock.
+    """
+    def _warm():
+        _, _, model = get_resources()
+        if model is not None:
+            # the first encode initializes the tokenizer and kernels
+            _encode_query("warmup")
+
+    thread = threading.Thread(target=_warm, name="rag-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def _encode_query(query):
+    embedding = _embedding_cache.get(query)
+    if embedding is None:
+        embedding = _model.encode([query], normalize_embeddings=_normalize_embeddings).tolist()[0]
+        _embedding_cache.put(query, embedding)
+    return embedding
+
+
+def clear_query_caches():
+    """Forget memoized query embeddings and search results."""
+    _embedding_cache.clear()
+    _result_cache.clear()
+
 @mcp.tool()
 def search_knowledge_base(query: str, n_results: int = 5) -> str:
     """
@@ -42,8 +151,12 @@ def search_knowledge_base(query: str, n_results: int = 5) -> str:
     if collection is None:
         return "Error: Knowledge base not initialized. Please run build_knowledge_base.py first."
 
+    cached = _result_cache.get((query, n_results))
+    if cached is not None:
+        return cached
+
     try:
-        query_embedding = model.encode([query]).tolist()
+        query_embedding = [_encode_query(query)]
         
         results = collection.query(
             query_embeddings=query_embedding,
@@ -62,7 +175,8 @@ def search_knowledge_base(query: str, n_results: int = 5) -> str:
             
             output += f"--- Result {i+1} ({doc_type}: {source}) ---\n"
             output += doc + "\n\n"
-            
+
+        _result_cache.put((query, n_results), output)
         return output
         
     except Exception as e:
@@ -0,0 +1,342 @@
+"""
+Local catalogue of structures from Materials Project, COD and C2DB.
+
+Every structure the database tools download (or that is bulk-imported with
+``import_cif_files``) is recorded in a SQLite index with formula, chemical
+system, elements, space group, band gap and lattice columns, and its CIF text
+is kept in a content-addressed store next to the index. Searches are answered
+from the index first, so lookups stay local and keep working on clusters
+without outbound network; the remote APIs are only a fallback. Search
+results returned by the remote APIs are recorded as well (without CIF), so
+repeated questions can be answered offline.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+DEFAULT_INDEX_DIR = Path.home() / ".cache" / "dptb_pilot" / "structures"
+
+_COLUMNS = ("source", "source_id", "formula", "chemsys", "nelements", "spacegroup_symbol",
+            "spacegroup_number", "crystal_system", "band_gap", "is_metal", "energy_above_hull",
+            "formation_energy_per_atom", "a", "b", "c", "alpha", "beta", "gamma", "volume",
+            "dimensionality", "cif_sha256", "updated")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS structures (
+    source TEXT NOT NULL,
+    source_id TEXT NOT NULL,
+    formula TEXT,
+    chemsys TEXT,
+    nelements INTEGER,
+    spacegroup_symbol TEXT,
+    spacegroup_number INTEGER,
+    crystal_system TEXT,
+    band_gap REAL,
+    is_metal INTEGER,
+    energy_above_hull REAL,
+    formation_energy_per_atom REAL,
+    a REAL, b REAL, c REAL, alpha REAL, beta REAL, gamma REAL, volume REAL,
+    dimensionality INTEGER,
+    cif_sha256 TEXT,
+    updated REAL,
+    PRIMARY KEY (source, source_id)
+);
+CREATE TABLE IF NOT EXISTS elements (
+    source TEXT NOT NULL,
+    source_id TEXT NOT NULL,
+    element TEXT NOT NULL,
+    PRIMARY KEY (source, source_id, element)
+);
+CREATE INDEX IF NOT EXISTS idx_structures_formula ON structures (formula);
+CREATE INDEX IF NOT EXISTS idx_structures_chemsys ON structures (chemsys);
+CREATE INDEX IF NOT EXISTS idx_structures_band_gap ON structures (band_gap);
+CREATE INDEX IF NOT EXISTS idx_elements_element ON elements (element);
+"""
+
+# columns added after the first schema, appended to existing index files on open
+_ADDED_COLUMNS = {"dimensionality": "INTEGER"}
+
+
+def _composition(formula: str):
+    from pymatgen.core import Composition
+
+    try:
+        return Composition(formula.replace(" ", ""))
+    except Exception:
+        return None
+
+
+def normalize_formula(formula: str) -> Optional[str]:
+    """Reduced formula (``"Mo2S4"`` -> ``"MoS2"``), ``None`` if it cannot be parsed."""
+    composition = _composition(formula) if formula else None
+    return composition.reduced_formula if composition else None
+
+
+def _elements_of(formula: Optional[str]) -> List[str]:
+    composition = _composition(formula) if formula else None
+    return sorted(str(element) for element in composition.elements) if composition else []
+
+
+class StructureIndex:
+    """
+    SQLite structure index plus content-addressed CIF store.
+
+    Parameters
+    ----------
+    root : Path
+        Directory holding ``index.sqlite`` and ``cif/``; created on demand.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.db_path = self.root / "index.sqlite"
+        self.cif_root = self.root / "cif"
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.root.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(structures)")}
+            for column, column_type in _ADDED_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE structures ADD COLUMN {column} {column_type}")
+            self._initialized = True
+        return conn
+
+    # ---- CIF store ----
+
+    def _cif_path(self, sha256: str) -> Path:
+        return self.cif_root / sha256[:2] / f"{sha256}.cif"
+
+    def store_cif(self, cif_text: str) -> str:
+        sha256 = hashlib.sha256(cif_text.encode("utf-8")).hexdigest()
+        path = self._cif_path(sha256)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(cif_text, encoding="utf-8")
+            os.replace(tmp_path, path)
+        return sha256
+
+    def get_cif(self, source: str, source_id: str) -> Optional[str]:
+        """CIF text of an indexed structure, ``None`` if it was never downloaded."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT cif_sha256 FROM structures WHERE source = ? AND source_id = ?",
+                               (source, str(source_id))).fetchone()
+        if row is None or not row["cif_sha256"]:
+            return None
+        try:
+            return self._cif_path(row["cif_sha256"]).read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    # ---- writes ----
+
+    def upsert(self, source: str, source_id: str, properties: Dict[str, Any]):
+        """
+        Insert or update one entry; ``None`` values never overwrite known ones.
+
+        ``properties`` may hold any index column; ``formula`` is reduced and
+        ``chemsys``/``nelements``/elements are derived from it.
+        """
+        values = {key: value for key, value in properties.items() if key in _COLUMNS and value is not None}
+        if values.get("formula"):
+            values["formula"] = normalize_formula(values["formula"]) or values["formula"]
+        elements = _elements_of(values.get("formula"))
+        if elements:
+            values["chemsys"] = "-".join(elements)
+            values["nelements"] = len(elements)
+        if "is_metal" in values:
+            values["is_metal"] = int(bool(values["is_metal"]))
+        values.update(source=source, source_id=str(source_id), updated=time.time())
+
+        columns = list(values)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns
+                            if column not in ("source", "source_id"))
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                f"INSERT INTO structures ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT (source, source_id) DO UPDATE SET {updates}",
+                [values[column] for column in columns])
+            if elements:
+                conn.execute("DELETE FROM elements WHERE source = ? AND source_id = ?", (source, str(source_id)))
+                conn.executemany("INSERT INTO elements (source, source_id, element) VALUES (?, ?, ?)",
+                                 [(source, str(source_id), element) for element in elements])
+
+    def add_structure(self, source: str, source_id: str, structure, cif_text: Optional[str] = None,
+                      properties: Optional[Dict[str, Any]] = None):
+        """Index a pymatgen ``Structure`` and keep its CIF (``cif_text`` or a generated one)."""
+        if cif_text is None:
+            from pymatgen.io.cif import CifWriter
+
+            cif_text = str(CifWriter(structure))
+        lattice = structure.lattice
+        values = {
+            "formula": structure.composition.reduced_formula,
+            "a": lattice.a, "b": lattice.b, "c": lattice.c,
+            "alpha": lattice.alpha, "beta": lattice.beta, "gamma": lattice.gamma,
+            "volume": lattice.volume,
+            "cif_sha256": self.store_cif(cif_text),
+        }
+        try:
+            symbol, number = structure.get_space_group_info()
+            values.update(spacegroup_symbol=symbol, spacegroup_number=number)
+        except Exception:
+            pass
+        values.update(properties or {})
+        self.upsert(source, source_id, values)
+
+    # ---- reads ----
+
+    def get_column(self, source: str, source_ids: Iterable[str], column: str) -> Dict[str, Any]:
+        """Known (non-null) values of ``column`` for ``source_ids``."""
+        if column not in _COLUMNS:
+            raise ValueError(f"Unknown index column {column!r}")
+        source_ids = [str(source_id) for source_id in source_ids]
+        if not source_ids:
+            return {}
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT source_id, {column} FROM structures WHERE source = ? AND {column} IS NOT NULL "
+                f"AND source_id IN ({', '.join('?' * len(source_ids))})", [source] + source_ids).fetchall()
+        return {row["source_id"]: row[column] for row in rows}
+
+    def search(self,
+               source: Optional[str] = None,
+               source_id: Optional[str] = None,
+               formula: Optional[str] = None,
+               chemsys: Optional[str] = None,
+               elements: Optional[Iterable[str]] = None,
+               band_gap_min: Optional[float] = None,
+               band_gap_max: Optional[float] = None,
+               is_metal: Optional[bool] = None,
+               energy_above_hull_max: Optional[float] = None,
+               dimensionality: Optional[int] = None,
+               limit: int = 10) -> List[Dict[str, Any]]:
+        """Indexed lookup by id, reduced formula, chemical system or elements plus range filters."""
+        clauses, params = [], []
+        if source is not None:
+            clauses.append("s.source = ?")
+            params.append(source)
+        if source_id is not None:
+            clauses.append("s.source_id = ?")
+            params.append(str(source_id))
+        if formula is not None:
+            clauses.append("s.formula = ?")
+            params.append(normalize_formula(formula) or formula)
+        if chemsys is not None:
+            clauses.append("s.chemsys = ?")
+            params.append("-".join(sorted(chemsys.split("-"))))
+        if elements:
+            elements = sorted(set(elements))
+            clauses.append(
+                "(s.source, s.source_id) IN (SELECT source, source_id FROM elements "
+                f"WHERE element IN ({', '.join('?' * len(elements))}) "
+                "GROUP BY source, source_id HAVING COUNT(*) = ?)")
+            params.extend(elements + [len(elements)])
+        if band_gap_min is not None:
+            clauses.append("s.band_gap >= ?")
+            params.append(band_gap_min)
+        if band_gap_max is not None:
+            clauses.append("s.band_gap <= ?")
+            params.append(band_gap_max)
+        if is_metal is not None:
+            clauses.append("s.is_metal = ?")
+            params.append(int(bool(is_metal)))
+        if energy_above_hull_max is not None:
+            clauses.append("s.energy_above_hull <= ?")
+            params.append(energy_above_hull_max)
+        if dimensionality is not None:
+            clauses.append("s.dimensionality = ?")
+            params.append(int(dimensionality))
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (f"SELECT * FROM structures s {where} "
+               "ORDER BY s.energy_above_hull IS NULL, s.energy_above_hull, s.source_id LIMIT ?")
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql, params + [int(limit)]).fetchall()
+        return [dict(row) for row in rows]
+
+    def search_query(self, query: str, source: Optional[str] = None, **filters) -> List[Dict[str, Any]]:
+        """
+        Interpret a tool query string: an id of ``source``, a chemical system
+        (``"Mo-S"``) or a formula (``"MoS2"``).
+        """
+        query = query.strip()
+        rows = self.search(source=source, source_id=query, **filters)
+        if rows:
+            return rows
+        if "-" in query and all(re.fullmatch(r"[A-Z][a-z]?", part) for part in query.split("-")):
+            return self.search(source=source, chemsys=query, **filters)
+        if normalize_formula(query):
+            return self.search(source=source, formula=query, **filters)
+        return []
+
+
+def default_index() -> StructureIndex:
+    """Index configured by ``DPTB_STRUCTURE_INDEX_DIR``."""
+    return StructureIndex(Path(os.environ.get("DPTB_STRUCTURE_INDEX_DIR") or DEFAULT_INDEX_DIR))
+
+
+def import_cif_files(paths: Iterable[Path], source: str, index: Optional[StructureIndex] = None) -> int:
+    """
+    Bulk-import CIF files, e.g. a COD mirror, into the index.
+
+    The file stem is used as the source id. Returns the number of imported files;
+    unreadable files are skipped.
+    """
+    from pymatgen.core import Structure
+
+    index = index or default_index()
+    count = 0
+    for path in paths:
+        path = Path(path)
+        try:
+            cif_text = path.read_text(encoding="utf-8")
+            structure = Structure.from_str(cif_text, fmt="cif")
+        except Exception as e:
+            print(f"Skipping {path}: {e}")
+            continue
+        index.add_structure(source, path.stem, structure, cif_text=cif_text)
+        count += 1
+    return count
+
+
+def format_index_rows(rows: List[Dict[str, Any]], query: str, database: str, download_tool: str) -> str:
+    """Tool output for results answered from the local index."""
+    output = f"Found {len(rows)} materials in the local {database} index for '{query}':\n\n"
+    for i, row in enumerate(rows):
+        output += f"{i+1}. **{row['formula']}** (ID: `{row['source_id']}`)\n"
+        if row.get("spacegroup_symbol"):
+            number = row.get("spacegroup_number")
+            output += f"   - Space Group: {row['spacegroup_symbol']}" + (f" (No. {number})" if number else "") + "\n"
+        if row.get("band_gap") is not None:
+            kind = "Metal" if row.get("is_metal") else "Insulator/Semiconductor"
+            output += f"   - Band Gap: {row['band_gap']:.3f} eV ({kind})\n"
+        if row.get("dimensionality") is not None:
+            output += f"   - Dimensionality: {row['dimensionality']}D\n"
+        if row.get("energy_above_hull") is not None:
+            output += f"   - Stability: {row['energy_above_hull']:.3f} eV/atom above hull\n"
+        if row.get("a") is not None:
+            output += f"   - Cell parameters: a={row['a']:.3f} Å, b={row['b']:.3f} Å, c={row['c']:.3f} Å\n"
+        output += "\n"
+    output += f"To download a structure, use the `{download_tool}` tool with the ID."
+    return output
+
+
+def record_quietly(fn, *args, **kwargs):
+    """Run an index write; failures (read-only disk, locked DB) never fail the calling tool."""
+    try:
+        fn(*args, **kwargs)
+    except Exception as e:
+        print(f"Warning: could not update the local structure index: {e}")
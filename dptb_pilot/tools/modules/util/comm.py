@@ -1,5 +1,6 @@
 import subprocess
 import select
+import hashlib
 from pathlib import Path
 from typing import List, Tuple, Union, Optional
 import os
@@ -8,6 +9,7 @@ import json
 import traceback
 import uuid
 import glob
+import functools
 
 def run_command(
         cmd,
@@ -41,6 +43,23 @@ def run_command(
             break
     return return_code, out, err
 
+def lammps_id_ranges(ids) -> str:
+    """
+    Encode atom ids as compact LAMMPS ``group ... id`` arguments.
+
+    Contiguous runs become ``start:end`` (inclusive), isolated ids stay single,
+    e.g. ``[1, 2, 3, 7, 9, 10]`` -> ``"1:3 7 9:10"``.
+    """
+    import numpy as np
+
+    ids = np.unique(np.asarray(ids, dtype=np.int64))
+    if ids.size == 0:
+        return ""
+    breaks = np.flatnonzero(np.diff(ids) != 1)
+    starts = ids[np.r_[0, breaks + 1]]
+    ends = ids[np.r_[breaks, ids.size - 1]]
+    return " ".join(f"{start}:{end}" if end > start else f"{start}" for start, end in zip(starts, ends))
+
 def remove_comm_prefix(paths: Union[List[Path], List[str]]) -> List[str]:
     """
     Remove the common prefix from a list of paths.
@@ -63,6 +82,30 @@ def remove_comm_prefix(paths: Union[List[Path], List[str]]) -> List[str]:
     
     return relative_paths
 
+HASH_MEMO_SIZE = 1024
+
+
+@functools.lru_cache(maxsize=HASH_MEMO_SIZE)
+def _hash_file_content(path: str, size: int, mtime_ns: int) -> str:
+    # size and mtime are part of the cache key only, so a rewritten file is re-read
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+def hash_file(path: Union[str, Path]) -> str:
+    """
+    Return the sha256 hex digest of a file's content.
+
+    Digests are memoized on (path, size, mtime) in an LRU of the last
+    ``HASH_MEMO_SIZE`` files, so repeated calls on large, unchanged files
+    (model checkpoints, overlaps) do not re-read them.
+    """
+    path = Path(path).absolute()
+    stat = path.stat()
+    return _hash_file_content(str(path), stat.st_size, stat.st_mtime_ns)
+
 def get_physical_cores():
     """
     """
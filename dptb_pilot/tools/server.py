@@ -37,6 +37,7 @@ def load_tools():
         band_compare,
         band_gap,
         band_predict,
+        band_predict_batch,
         band_predict_with_julia,
         hamiltonian_predict,
     )
@@ -61,6 +62,7 @@ def load_tools():
         dpnegf_get_abacus_overlap,
         dpnegf_prepare_lammps_tasks,
         dpnegf_prepare_negf_tasks,
+        dpnegf_run_lammps_grid,
         dpnegf_run_lammps_task,
         dpnegf_run_negf_task,
     )
@@ -69,7 +71,9 @@ def load_tools():
     from dptb_pilot.tools.modules.knowledge.mp_tool import search_materials_project, download_mp_structure
     from dptb_pilot.tools.modules.knowledge.cod_tool import search_cod_structures, download_cod_structure
     from dptb_pilot.tools.modules.knowledge.c2db_tool import search_c2db, download_c2db_structure
-    from dptb_pilot.tools.modules.knowledge.rag_tool import search_knowledge_base
+    from dptb_pilot.tools.modules.knowledge.rag_tool import search_knowledge_base, warmup_resources
+    if os.environ.get("DPTB_RAG_WARMUP", "1") == "1":
+        warmup_resources()
 
     # System
     from dptb_pilot.tools.modules.system.workspace_tool import list_workspace_files, read_file_content
@@ -4,15 +4,18 @@ from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
 import subprocess
 from pathlib import Path
-import uuid
+import hashlib
 import shutil
-import pypdf
-import ast
 import json
+import multiprocessing as mp
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 # Configuration
 # Assuming script is run from project root or installed as package
 import dptb_pilot.tools
+from dptb_pilot.tools.modules.knowledge.kb_parse import TEXT_EXTENSIONS, parse_file
 TOOLS_DIR = os.path.dirname(dptb_pilot.tools.__file__)
 KNOWLEDGE_BASE_DIR = os.path.join(TOOLS_DIR, "data", "deeptb_knowledge")
 REPO_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "repo")
@@ -21,6 +24,10 @@ NOTEBOOK_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "notebook")
 CHROMA_DB_PATH = os.path.join(TOOLS_DIR, "data", "chroma_db")
 COLLECTION_NAME = "deeptb_knowledge"
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+MANIFEST_PATH = os.path.join(CHROMA_DB_PATH, "kb_manifest.json")
+MANIFEST_VERSION = 1
+EMBED_BATCH_SIZE = 64
+QUEUE_BATCHES = 8
 
 def ensure_git_repo(
     base_dir: str,
@@ -64,225 +71,207 @@ def ensure_git_repo(
         raise e
 
 
-def process_python_file(file_path):
-    """Parse Python file using AST to extract classes and functions."""
-    chunks = []
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-            
-        tree = ast.parse(content)
-        filename = os.path.basename(file_path)
-        
-        # 1. Extract Module Docstring
-        docstring = ast.get_docstring(tree)
-        if docstring:
-            chunks.append({
-                "text": f"File: {filename}\nType: Module Docstring\n\n{docstring}",
-                "metadata": {"source": file_path, "filename": filename, "type": "code_doc"}
-            })
-
-        # 2. Extract Classes and Functions
-        for node in tree.body:
-            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                # Get full source of the function
-                start_line = node.lineno
-                end_line = node.end_lineno
-                func_content = content.splitlines()[start_line-1:end_line]
-                func_text = "\n".join(func_content)
-                
-                chunks.append({
-                    "text": f"File: {filename}\nType: Function\nName: {node.name}\n\n{func_text}",
-                    "metadata": {"source": file_path, "filename": filename, "type": "function", "name": node.name}
-                })
-                
-            elif isinstance(node, ast.ClassDef):
-                # Get full source of the class
-                start_line = node.lineno
-                end_line = node.end_lineno
-                class_content = content.splitlines()[start_line-1:end_line]
-                class_text = "\n".join(class_content)
-                
-                chunks.append({
-                    "text": f"File: {filename}\nType: Class\nName: {node.name}\n\n{class_text}",
-                    "metadata": {"source": file_path, "filename": filename, "type": "class", "name": node.name}
-                })
-                
-    except Exception as e:
-        print(f"Error parsing Python file {file_path}: {e}")
-        # Fallback to simple chunking if AST fails
-        return process_text_file(file_path, "code")
-        
-    return chunks
-
-def process_notebook_file(file_path):
-    """Parse Jupyter Notebook to extract code and markdown cells."""
-    chunks = []
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            notebook = json.load(f)
-            
-        filename = os.path.basename(file_path)
-        
-        for i, cell in enumerate(notebook.get("cells", [])):
-            cell_type = cell.get("cell_type")
-            source = "".join(cell.get("source", []))
-            
-            if not source.strip():
+def iter_source_files(notebook_path=NOTEBOOK_PATH, repo_path=REPO_PATH, paper_path=PAPER_PATH):
+    """Yield every file that contributes chunks to the knowledge base."""
+    for base in (notebook_path, repo_path):
+        for root, _, files in os.walk(base):
+            if "/." in root or "/tests" in root or "/__pycache__" in root:
                 continue
-                
-            if cell_type == "markdown":
-                chunks.append({
-                    "text": f"File: {filename}\nType: Notebook Markdown\nCell: {i+1}\n\n{source}",
-                    "metadata": {"source": file_path, "filename": filename, "type": "notebook_md", "page": i+1}
-                })
-            elif cell_type == "code":
-                chunks.append({
-                    "text": f"File: {filename}\nType: Notebook Code\nCell: {i+1}\n\n{source}",
-                    "metadata": {"source": file_path, "filename": filename, "type": "notebook_code", "page": i+1}
-                })
-                
-    except Exception as e:
-        print(f"Error parsing Notebook {file_path}: {e}")
-        
-    return chunks
-
-def process_text_file(file_path, type_label="doc"):
-    """Simple chunking for text/markdown files."""
-    chunks = []
+            for file in sorted(files):
+                if file.endswith((".py", ".ipynb") + TEXT_EXTENSIONS):
+                    yield os.path.join(root, file)
+
+    if os.path.exists(paper_path):
+        for file in sorted(os.listdir(paper_path)):
+            if file.endswith(".pdf"):
+                yield os.path.join(paper_path, file)
+
+
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(manifest_path=MANIFEST_PATH):
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-            
-        filename = os.path.basename(file_path)
-        chunk_size = 1000
-        overlap = 200
-        
-        for i in range(0, len(content), chunk_size - overlap):
-            chunk = content[i : i + chunk_size]
-            if len(chunk) < 50:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(manifest, manifest_path=MANIFEST_PATH):
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+
+def _iter_parsed(file_paths, num_workers):
+    """Parse files, in a process pool when ``num_workers > 1``; results keep input order."""
+    if num_workers <= 1 or len(file_paths) <= 1:
+        yield from map(parse_file, file_paths)
+        return
+    # never fork: this runs on the kb-parse producer thread
+    method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+    with ProcessPoolExecutor(max_workers=num_workers, mp_context=mp.get_context(method)) as pool:
+        yield from pool.map(parse_file, file_paths, chunksize=4)
+
+
+_DONE = object()
+
+
+def sync_collection(collection, model, source_files, manifest, batch_size=EMBED_BATCH_SIZE,
+                    num_workers=1, normalize_embeddings=True, queue_batches=QUEUE_BATCHES):
+    """
+    Bring ``collection`` in line with ``source_files`` and return the new manifest.
+
+    Only files whose content hash differs from ``manifest`` are re-chunked; of
+    their chunks only ids not already indexed are embedded. Chunks of changed
+    files that no longer exist and all chunks of vanished files are deleted.
+
+    The work is pipelined: a producer thread parses changed files in a pool of
+    ``num_workers`` processes and feeds new chunks through a queue bounded to
+    ``queue_batches`` batches; the calling thread encodes ``batch_size`` chunks
+    at a time while the previous batch is written to Chroma by a writer thread.
+    """
+    old_files = manifest["files"]
+    new_files = {}
+    changed = []
+    to_delete = []
+
+    for file_path in source_files:
+        sha256 = file_sha256(file_path)
+        previous = old_files.get(file_path)
+        if previous is not None and previous["sha256"] == sha256:
+            new_files[file_path] = previous
+        else:
+            changed.append((file_path, sha256))
+
+    for file_path in old_files.keys() - {file_path for file_path in source_files}:
+        print(f"  [DEL] Source removed: {file_path}")
+        to_delete.extend(old_files[file_path]["ids"])
+
+    print(f"{len(source_files)} files, {len(changed)} changed or new.")
+
+    chunk_queue = queue.Queue(maxsize=max(queue_batches, 1) * batch_size)
+    producer_error = []
+
+    def produce():
+        try:
+            sha256s = dict(changed)
+            for file_path, chunks in _iter_parsed([file_path for file_path, _ in changed], num_workers):
+                previous = old_files.get(file_path)
+                old_ids = set(previous["ids"]) if previous else set()
+                to_delete.extend(old_ids - chunks.keys())
+                new_files[file_path] = {"sha256": sha256s[file_path], "ids": list(chunks)}
+                for cid, chunk in chunks.items():
+                    if cid not in old_ids:
+                        chunk_queue.put((cid, chunk))
+        except BaseException as e:
+            producer_error.append(e)
+        finally:
+            chunk_queue.put(_DONE)
+
+    def write(batch, embeddings):
+        # upsert: ids are deterministic, so a build interrupted before the manifest was saved is simply redone
+        collection.upsert(
+            documents=[chunk["text"] for _, chunk in batch],
+            embeddings=embeddings,
+            metadatas=[chunk["metadata"] for _, chunk in batch],
+            ids=[cid for cid, _ in batch]
+        )
+
+    producer = threading.Thread(target=produce, name="kb-parse", daemon=True)
+    producer.start()
+
+    n_embedded = 0
+    pending = None
+    with ThreadPoolExecutor(max_workers=1) as writer:
+        done = False
+        while not done:
+            batch = []
+            while len(batch) < batch_size:
+                item = chunk_queue.get()
+                if item is _DONE:
+                    done = True
+                    break
+                batch.append(item)
+            if not batch:
                 continue
-                
-            chunks.append({
-                "text": f"File: {filename}\nType: {type_label}\n\n{chunk}",
-                "metadata": {"source": file_path, "filename": filename, "type": type_label}
-            })
-    except Exception as e:
-        print(f"Error reading file {file_path}: {e}")
-        
-    return chunks
-
-def build_knowledge_base():
+
+            embeddings = model.encode([chunk["text"] for _, chunk in batch], batch_size=batch_size,
+                                      normalize_embeddings=normalize_embeddings).tolist()
+            if pending is not None:
+                pending.result()
+            pending = writer.submit(write, batch, embeddings)
+            n_embedded += len(batch)
+            print(f"Embedded {n_embedded} chunks")
+        if pending is not None:
+            pending.result()
+
+    producer.join()
+    if producer_error:
+        raise producer_error[0]
+
+    print(f"{n_embedded} chunks embedded, {len(to_delete)} chunks to delete.")
+    for i in range(0, len(to_delete), batch_size):
+        collection.delete(ids=to_delete[i : i + batch_size])
+
+    return {"version": MANIFEST_VERSION, "embedding_model": manifest["embedding_model"],
+            "normalize_embeddings": normalize_embeddings,
+            "files": {file_path: new_files[file_path] for file_path in source_files}}
+
+
+def build_knowledge_base(full_rebuild=False, num_workers=None, batch_size=EMBED_BATCH_SIZE,
+                         normalize_embeddings=True):
     print("Initializing embedding model...")
     model = SentenceTransformer(EMBEDDING_MODEL)
 
     print(f"Initializing ChromaDB at {CHROMA_DB_PATH}...")
     client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
-    
-    try:
-        client.delete_collection(name=COLLECTION_NAME)
-        print(f"Deleted existing collection: {COLLECTION_NAME}")
-    except Exception:
-        pass
-
-    collection = client.create_collection(name=COLLECTION_NAME)
-
-    documents = []
-    metadatas = []
-    ids = []
-
-    print("Scanning notebook for files...")
-    for root, _, files in os.walk(NOTEBOOK_PATH):
-        if "/." in root or "/tests" in root or "/__pycache__" in root:
-            continue
-
-        for file in files:
-            file_path = os.path.join(root, file)
-            file_chunks = []
-
-            if file.endswith(".py"):
-                print(f"  [AST] Parsing Python: {file}")
-                file_chunks = process_python_file(file_path)
-            elif file.endswith(".ipynb"):
-                print(f"  [NB]  Parsing Notebook: {file}")
-                file_chunks = process_notebook_file(file_path)
-            elif file.endswith(".md") or file.endswith(".txt") or file.endswith(".rst"):
-                print(f"  [DOC] Reading Document: {file}")
-                file_chunks = process_text_file(file_path, "doc")
-
-            for chunk in file_chunks:
-                documents.append(chunk["text"])
-                metadatas.append(chunk["metadata"])
-                ids.append(str(uuid.uuid4()))
-
-    print("Scanning repository for files...")
-    for root, _, files in os.walk(REPO_PATH):
-        if "/." in root or "/tests" in root or "/__pycache__" in root:
-            continue
-
-        for file in files:
-            file_path = os.path.join(root, file)
-            file_chunks = []
-            
-            if file.endswith(".py"):
-                print(f"  [AST] Parsing Python: {file}")
-                file_chunks = process_python_file(file_path)
-            elif file.endswith(".ipynb"):
-                print(f"  [NB]  Parsing Notebook: {file}")
-                file_chunks = process_notebook_file(file_path)
-            elif file.endswith(".md") or file.endswith(".txt") or file.endswith(".rst"):
-                print(f"  [DOC] Reading Document: {file}")
-                file_chunks = process_text_file(file_path, "doc")
-                
-            for chunk in file_chunks:
-                documents.append(chunk["text"])
-                metadatas.append(chunk["metadata"])
-                ids.append(str(uuid.uuid4()))
-
-    # Process PDFs
-    print("Scanning for PDF files...")
-    if os.path.exists(PAPER_PATH):
-        for file in os.listdir(PAPER_PATH):
-            if file.endswith(".pdf"):
-                file_path = os.path.join(PAPER_PATH, file)
-                try:
-                    reader = pypdf.PdfReader(file_path)
-                    for i, page in enumerate(reader.pages):
-                        text = page.extract_text()
-                        if not text: continue
-                        
-                        chunk_size = 1000
-                        overlap = 200
-                        for j in range(0, len(text), chunk_size - overlap):
-                            chunk = text[j : j + chunk_size]
-                            if len(chunk) < 50: continue
-                            
-                            documents.append(f"File: {file}\nPage: {i+1}\n\n{chunk}")
-                            metadatas.append({"source": file_path, "filename": file, "type": "pdf", "page": i+1})
-                            ids.append(str(uuid.uuid4()))
-                except Exception as e:
-                    print(f"Error processing PDF {file_path}: {e}")
-
-    print(f"Found {len(documents)} chunks. Generating embeddings and storing...")
-    
-    batch_size = 100
-    for i in range(0, len(documents), batch_size):
-        batch_docs = documents[i : i + batch_size]
-        batch_metas = metadatas[i : i + batch_size]
-        batch_ids = ids[i : i + batch_size]
-        
-        embeddings = model.encode(batch_docs).tolist()
-        
-        collection.add(
-            documents=batch_docs,
-            embeddings=embeddings,
-            metadatas=batch_metas,
-            ids=batch_ids
-        )
-        print(f"Processed batch {i // batch_size + 1}/{(len(documents) + batch_size - 1) // batch_size}")
+
+    manifest = load_manifest()
+    if (full_rebuild or manifest is None or manifest.get("embedding_model") != EMBEDDING_MODEL
+            or manifest.get("normalize_embeddings", normalize_embeddings) != normalize_embeddings):
+        # no usable manifest (first build, random-id collection from older builds, or new embedding settings)
+        try:
+            client.delete_collection(name=COLLECTION_NAME)
+            print(f"Deleted existing collection: {COLLECTION_NAME}")
+        except Exception:
+            pass
+        manifest = {"version": MANIFEST_VERSION, "embedding_model": EMBEDDING_MODEL, "files": {}}
+
+    collection = client.get_or_create_collection(name=COLLECTION_NAME)
+
+    print("Scanning notebook, repository and papers for files...")
+    manifest = sync_collection(collection, model, list(iter_source_files()), manifest,
+                               batch_size=batch_size,
+                               num_workers=num_workers or os.cpu_count() or 1,
+                               normalize_embeddings=normalize_embeddings)
+    save_manifest(manifest)
 
     print("Knowledge base built successfully!")
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or incrementally update the DeePTB knowledge base")
+    parser.add_argument("--full", action="store_true", help="drop the collection and re-embed everything")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: all CPUs)")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="chunks per embedding batch")
+    parser.add_argument("--no-normalize", action="store_true", help="store unnormalized embeddings")
+    args = parser.parse_args()
+
     ensure_git_repo(REPO_PATH, "https://github.com/deepmodeling/DeePTB.git")
-    build_knowledge_base()
+    build_knowledge_base(full_rebuild=args.full,
+                         num_workers=args.workers,
+                         batch_size=args.batch_size,
+                         normalize_embeddings=not args.no_normalize)
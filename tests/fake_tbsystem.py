@@ -0,0 +1,82 @@
+"""
+Stand-in for a DeePTB ``TBSystem`` built on a two-orbital chain.
+
+Only the system and its calculator are replaced; the k-path, k-mesh, Fermi
+level and band data still come from DeePTB, so tests using it need ``dptb``.
+``build_fake_tbsystem`` is importable by spawned k-point workers.
+"""
+import numpy as np
+import torch
+from ase import Atoms
+
+ONSITE = 2.0
+HOPPING = 0.5
+
+
+class _Model:
+    pass
+
+
+class _SOCModel:
+    soc_param = None
+
+
+class FakeCalculator:
+    dtype = torch.float64
+    device = torch.device("cpu")
+
+    def __init__(self, soc: bool = False):
+        self.model = _SOCModel() if soc else _Model()
+        self.calls = 0
+
+    def get_hk(self, atomic_data, k_points=None):
+        k = np.asarray(k_points, dtype=float).reshape(-1, 3)[:, 0]
+        hk = np.zeros((len(k), 2, 2), dtype=complex)
+        hk[:, 0, 0] = -ONSITE - HOPPING * np.cos(2 * np.pi * k)
+        hk[:, 1, 1] = ONSITE + HOPPING * np.cos(2 * np.pi * k)
+        hk[:, 0, 1] = hk[:, 1, 0] = 0.3
+        return torch.as_tensor(hk), None
+
+    def get_eigenvalues(self, atomic_data, solver=None, **kwargs):
+        from dptb.data import AtomicDataDict
+
+        self.calls += 1
+        hk, _ = self.get_hk(atomic_data, atomic_data[AtomicDataDict.KPOINT_KEY][0].numpy())
+        return atomic_data, torch.linalg.eigvalsh(hk)
+
+
+class FakeTBSystem:
+    def __init__(self, atoms: Atoms = None, calculator: FakeCalculator = None, soc: bool = False):
+        self.atoms = atoms if atoms is not None else Atoms("C", cell=np.eye(3) * 2.0, pbc=True)
+        self.calculator = calculator if calculator is not None else FakeCalculator(soc)
+        self.data = {}
+        self.total_electrons = None
+        self._efermi = None
+
+    @property
+    def model(self):
+        return self.calculator.model
+
+    @property
+    def efermi(self):
+        return self._efermi
+
+    def set_electrons(self, nel_atom):
+        self.total_electrons = sum(nel_atom[symbol] for symbol in self.atoms.get_chemical_symbols())
+
+    def set_efermi(self, efermi):
+        self._efermi = efermi
+
+    def estimate_efermi_e(self, eigenvalues, temperature=300, **kwargs):
+        from dptb.postprocess.unified.utils import calculate_fermi_level
+
+        return calculate_fermi_level(eigenvalues=eigenvalues,
+                                     total_electrons=self.total_electrons,
+                                     spindeg=1 if hasattr(self.model, "soc_param") else 2,
+                                     temperature=temperature)
+
+
+def build_fake_tbsystem(model_file_path, structure_file_path, override_overlap=None, calculator=None):
+    from ase.io import read
+
+    return FakeTBSystem(atoms=read(str(structure_file_path)), calculator=calculator)
@@ -0,0 +1,55 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from dptb_pilot.tools.modules.deeptb.submodules.abacus import _abacus_band_gap, read_abacus_bands
+
+
+def test_read_abacus_bands_cached_by_mtime(tmp_path: Path):
+    (tmp_path / "running_scf.log").write_text(" EFERMI = 0.5 eV\n", encoding="utf-8")
+    band_file = tmp_path / "BANDS_1.dat"
+    band_file.write_text("1 0.0 -1.0 2.0\n\n2 0.1 -0.5 1.5\n", encoding="utf-8")
+
+    data = read_abacus_bands(band_file)
+    assert data.shape == (2, 4)
+    assert read_abacus_bands(band_file) is data
+    assert np.isclose(_abacus_band_gap(tmp_path)["band_gap"], 2.0)
+
+    band_file.write_text("1 0.0 -1.0 3.0\n", encoding="utf-8")
+    stat = band_file.stat()
+    os.utime(band_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert read_abacus_bands(band_file).shape == (1, 4)
+
+
+def test_read_abacus_bands_rejects_ragged_and_empty_files(tmp_path: Path):
+    band_file = tmp_path / "BANDS_1.dat"
+    band_file.write_text("1 0.0 -1.0 2.0\n2 0.1 -0.5\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="列数不一致"):
+        read_abacus_bands(band_file)
+
+    empty = tmp_path / "BANDS_2.dat"
+    empty.write_text("\n\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="为空"):
+        read_abacus_bands(empty)
+
+
+def test_abacus_log_index_sidecar(tmp_path: Path):
+    from dptb_pilot.tools.modules.deeptb.submodules.abacus import _abacus_get_efermi, _abacus_log_index
+
+    out_dir = tmp_path / "OUT.ABACUS"
+    out_dir.mkdir()
+    (out_dir / "running_scf.log").write_text(
+        " nkstot = 64\n nkstot_ibz = 8\n NBANDS = 12\n"
+        " charge density convergence is achieved\n"
+        " EFERMI = -1.25 eV\n !FINAL_ETOT_IS -215.5 eV\n",
+        encoding="utf-8",
+    )
+
+    index = _abacus_log_index(out_dir)
+    assert index["efermi"] == -1.25 and index["etot"] == -215.5
+    assert index["converged"] is True
+    assert (index["nkstot"], index["nkstot_ibz"], index["nbands"]) == (64, 8, 12)
+    assert (tmp_path / "OUT.ABACUS.index.json").exists()
+    assert _abacus_get_efermi(out_dir) == {"efermi": -1.25}
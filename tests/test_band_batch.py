@@ -0,0 +1,80 @@
+from pathlib import Path
+
+import pytest
+
+from dptb_pilot.tools.modules.deeptb.submodules.band import _resolve_structure_paths
+
+
+def test_resolve_structure_paths(tmp_path: Path):
+    strain_dir = tmp_path / "strain"
+    strain_dir.mkdir()
+    for i in (2, 0, 1):
+        (strain_dir / f"POSCAR_{i}.vasp").write_text("structure", encoding="utf-8")
+    extra = tmp_path / "POSCAR_extra"
+    extra.write_text("structure", encoding="utf-8")
+
+    from_dir = _resolve_structure_paths(structure_glob=str(strain_dir))
+    assert [p.name for p in from_dir] == ["POSCAR_0.vasp", "POSCAR_1.vasp", "POSCAR_2.vasp"]
+
+    # explicit paths come first and duplicates from the glob are dropped
+    mixed = _resolve_structure_paths([extra, strain_dir / "POSCAR_1.vasp"],
+                                     str(strain_dir / "*.vasp"))
+    assert [p.name for p in mixed] == ["POSCAR_extra", "POSCAR_1.vasp", "POSCAR_0.vasp", "POSCAR_2.vasp"]
+
+
+def test_band_predict_batch_shares_the_model(tmp_path: Path, monkeypatch):
+    pytest.importorskip("dptb")
+    import numpy as np
+    from ase import Atoms
+    from ase.io import write
+    from fake_tbsystem import build_fake_tbsystem
+
+    from dptb_pilot.tools.modules.deeptb.submodules import band
+
+    model = tmp_path / "model.pth"
+    model.write_bytes(b"weights")
+    structures = []
+    for i, a in enumerate((2.0, 2.2)):
+        structures.append(tmp_path / f"POSCAR_{i}")
+        write(structures[-1], Atoms("C", cell=np.eye(3) * a, pbc=True), format="vasp")
+    broken = tmp_path / "POSCAR_broken"
+    broken.write_text("not a structure", encoding="utf-8")
+
+    built = []
+    calculators = set()
+
+    def fake_build(model_file_path, structure_file_path, override_overlap=None, calculator=None):
+        built.append((Path(structure_file_path).name, calculator is None, override_overlap))
+        tbsystem = build_fake_tbsystem(model_file_path, structure_file_path, override_overlap, calculator)
+        calculators.add(id(tbsystem.calculator))
+        return tbsystem
+
+    def no_cache(*args, **kwargs):
+        raise AssertionError("batch prediction must not go through the TBSystem cache")
+
+    monkeypatch.setattr(band, "build_tbsystem", fake_build)
+    monkeypatch.setattr(band, "cached_tbsystem", no_cache)
+
+    overlap = tmp_path / "overlap.h5"
+    overlap.write_bytes(b"overlap")
+    result = band._band_predict_batch(model, kpath="[[0.0,0.0,0.0,4,G],[0.5,0.0,0.0,1,X]]",
+                                      nel_atom={"C": 2},
+                                      structure_file_paths=[structures[0], broken, structures[1]],
+                                      kmesh="[4,1,1]", override_overlap=overlap,
+                                      work_path=str(tmp_path / "out"))
+
+    # the model is loaded for the first structure only, the overlap goes to every structure
+    assert built == [("POSCAR_0", True, overlap), ("POSCAR_broken", False, overlap),
+                     ("POSCAR_1", False, overlap)]
+    assert len(calculators) == 1
+
+    assert result["structure_count"] == 2
+    assert result["failed_structures"] == [str(broken)]
+    assert len(result["fermi_levels"]) == len(result["band_gaps"]) == 2
+    with np.load(result["band_batch_file_path"]) as batch:
+        assert list(batch["structures"]) == [str(p.absolute()) for p in structures]
+        assert np.array_equal(batch["fermi_levels"], result["fermi_levels"])
+        for i in range(2):
+            assert batch[f"{i:04d}/eigenvalues"].shape == (5, 2)
+            assert float(batch[f"{i:04d}/fermi_level"]) == result["fermi_levels"][i]
+        assert "0002/eigenvalues" not in batch.files
@@ -0,0 +1,43 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from dptb_pilot.tools.modules.deeptb.submodules.band import _band_gap, save_electronic_summary
+
+
+def test_band_gap_reads_mesh_only_when_asked(tmp_path: Path):
+    band_file = tmp_path / "bandstructure_0.npz"
+    # the k-path misses the band edges that the mesh contains
+    np.savez(band_file, eigenvalues=np.array([[-1.0, 1.5], [-2.0, 2.0]]), fermi_level=0.0)
+    mesh = {"eigenvalues": np.array([[-0.5, 0.5]]), "fermi_level": 0.0}
+    save_electronic_summary(mesh, band_file)
+
+    assert np.isclose(_band_gap(band_file)["band_gap"], 2.5)
+    assert np.isclose(_band_gap(band_file, use_mesh=True)["band_gap"], 1.0)
+    # an explicit Fermi level wins over the cached mesh
+    assert np.isclose(_band_gap(band_file, fermi_level=1.0, use_mesh=True)["band_gap"], 2.5)
+
+    without_mesh = tmp_path / "bandstructure_1.npz"
+    without_mesh.write_bytes(band_file.read_bytes())
+    with pytest.raises(FileNotFoundError):
+        _band_gap(without_mesh, use_mesh=True)
+
+
+@pytest.mark.parametrize("soc, filled_bands", [(False, 1), (True, 2)])
+def test_electronic_summary_follows_model_spin_degeneracy(soc, filled_bands):
+    pytest.importorskip("dptb")
+    from fake_tbsystem import FakeTBSystem
+
+    from dptb_pilot.tools.modules.deeptb.submodules.band import electronic_summary
+
+    tbsystem = FakeTBSystem(soc=soc)
+    summary = electronic_summary(tbsystem, {"C": 2}, kmesh=[6, 1, 1], eig_solver="torch")
+
+    assert summary["eigenvalues"].shape == (6, 2)
+    assert tbsystem.efermi == summary["fermi_level"]
+    assert np.isclose(summary["occupations"].sum() / 6, 2.0, atol=1e-3)
+    # spin-degenerate: one band holds both electrons; SOC: two singly occupied bands
+    assert np.allclose(summary["occupations"][:, :filled_bands].sum(axis=1), 2.0, atol=1e-2)
+    if not soc:
+        assert summary["vbm"] < summary["fermi_level"] < summary["cbm"]
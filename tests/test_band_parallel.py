@@ -0,0 +1,112 @@
+import functools
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+from ase import Atoms
+from ase.io import write
+from fake_tbsystem import FakeTBSystem, build_fake_tbsystem
+
+from dptb_pilot.tools.modules.deeptb.submodules import band
+from dptb_pilot.tools.modules.deeptb.submodules.kpoint_pool import KPointPool, parallel_eigenvalues
+
+K_POINTS = np.stack([np.linspace(0, 0.5, 37), np.zeros(37), np.zeros(37)], axis=1)
+
+
+def _sparse(pool):
+    # the sparse path only needs the calculator's H(k), so these tests run without dptb
+    return pool.eigenvalues(K_POINTS, solver="sparse", sigma=0.0, num_band=2)
+
+
+def test_default_workers_match_serial_evaluation():
+    with KPointPool(FakeTBSystem(), n_workers=1) as pool:
+        serial = _sparse(pool)
+    with KPointPool(FakeTBSystem(), n_workers=3, k_chunk_size=5, builder=FakeTBSystem) as pool:
+        parallel = _sparse(pool)
+        assert pool._pool._mp_context.get_start_method() in ("forkserver", "spawn")
+    assert serial.shape == (37, 2)
+    assert np.array_equal(serial, parallel)
+
+
+def test_failed_worker_start_is_reported(tmp_path):
+    builder = functools.partial(build_fake_tbsystem, tmp_path / "model.pth", tmp_path / "missing.vasp")
+    with KPointPool(FakeTBSystem(), n_workers=2, k_chunk_size=5, builder=builder) as pool:
+        with pytest.raises(RuntimeError, match="failed to start or died"):
+            _sparse(pool)
+
+
+def test_pool_workers_rebuild_the_system_and_keep_k_order():
+    pytest.importorskip("dptb")
+    serial = parallel_eigenvalues(FakeTBSystem(), K_POINTS, n_workers=1)
+    parallel = parallel_eigenvalues(FakeTBSystem(), K_POINTS, n_workers=3, k_chunk_size=5,
+                                    builder=FakeTBSystem)
+    assert serial.shape == (37, 2)
+    assert np.array_equal(serial, parallel)
+
+
+def test_pool_without_builder_runs_serially():
+    tbsystem = FakeTBSystem()
+    with KPointPool(tbsystem, n_workers=3, k_chunk_size=5, start_method="spawn") as pool:
+        with pytest.warns(RuntimeWarning, match="serially"):
+            eigenvalues = _sparse(pool)
+        assert pool._pool is None
+    assert eigenvalues.shape == (37, 2)
+
+
+def test_fork_is_refused_in_a_threaded_process():
+    stop = threading.Event()
+    thread = threading.Thread(target=stop.wait)
+    thread.start()
+    try:
+        with KPointPool(FakeTBSystem(), n_workers=2, k_chunk_size=5, builder=FakeTBSystem,
+                        start_method="fork") as pool:
+            with pytest.warns(RuntimeWarning, match="unsafe"):
+                eigenvalues = _sparse(pool)
+            assert pool._pool._mp_context.get_start_method() != "fork"
+    finally:
+        stop.set()
+        thread.join()
+    assert np.array_equal(eigenvalues, parallel_eigenvalues(FakeTBSystem(), K_POINTS, n_workers=1,
+                                                            solver="sparse", num_band=2))
+
+
+@pytest.fixture
+def band_inputs(tmp_path, monkeypatch):
+    structure = tmp_path / "POSCAR"
+    write(structure, Atoms("C", cell=np.eye(3) * 2.0, pbc=True), format="vasp")
+    model = tmp_path / "model.pth"
+    model.touch()
+
+    @contextmanager
+    def fake_cached_tbsystem(model_file_path, structure_file_path, override_overlap=None):
+        yield build_fake_tbsystem(model_file_path, structure_file_path, override_overlap)
+
+    monkeypatch.setattr(band, "cached_tbsystem", fake_cached_tbsystem)
+    monkeypatch.setattr(band, "build_tbsystem", build_fake_tbsystem)
+    monkeypatch.setattr(band, "generate_work_path", lambda: str(tmp_path))
+    return model, structure
+
+
+@pytest.mark.parametrize("eig_solver", ["numpy", "sparse"])
+def test_serial_and_parallel_band_files_are_identical(band_inputs, tmp_path, eig_solver):
+    pytest.importorskip("dptb")
+    model, structure = band_inputs
+    outputs = {}
+    for n_workers in (1, 2):
+        work_path = tmp_path / f"workers_{n_workers}"
+        work_path.mkdir()
+        outputs[n_workers] = band._band_predict(model, structure,
+                                                kpath="[[0.0,0.0,0.0,20,G],[0.5,0.0,0.0,1,X]]",
+                                                nel_atom={"C": 2}, kmesh="[8,1,1]",
+                                                eig_solver=eig_solver, work_path=str(work_path),
+                                                num_band=2, pseudo_efermi=0.0,
+                                                n_workers=n_workers, k_chunk_size=4)
+
+    serial, parallel = outputs[1], outputs[2]
+    assert serial["fermi_level"] == parallel["fermi_level"]
+    for key in ("band_structure_file_path", "mesh_file_path"):
+        with np.load(serial[key]) as expected, np.load(parallel[key]) as actual:
+            assert sorted(expected.files) == sorted(actual.files)
+            for name in expected.files:
+                assert np.array_equal(expected[name], actual[name]), name
@@ -0,0 +1,74 @@
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+chromadb = pytest.importorskip("chromadb")
+
+SCRIPT = Path(__file__).resolve().parents[1] / "scripts" / "build_kb.py"
+
+
+def _load_builder():
+    spec = importlib.util.spec_from_file_location("build_kb", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class _CountingModel:
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, docs, batch_size=32, normalize_embeddings=False):
+        self.encoded.extend(docs)
+        return np.ones((len(docs), 4))
+
+
+def test_build_kb_incremental_sync(tmp_path: Path):
+    kb = _load_builder()
+    (tmp_path / "a.py").write_text("def f():\n    return 1\n\n\ndef g():\n    return 2\n", encoding="utf-8")
+    (tmp_path / "b.md").write_text("DeePTB band structure docs. " * 10, encoding="utf-8")
+    files = [str(tmp_path / "a.py"), str(tmp_path / "b.md")]
+
+    collection = chromadb.EphemeralClient().get_or_create_collection("kb_test_incremental")
+    manifest = {"version": kb.MANIFEST_VERSION, "embedding_model": "fake", "files": {}}
+    model = _CountingModel()
+    manifest = kb.sync_collection(collection, model, files, manifest)
+    assert len(model.encoded) == 3 and collection.count() == 3
+
+    # nothing changed: nothing embedded
+    model.encoded.clear()
+    manifest = kb.sync_collection(collection, model, files, manifest)
+    assert model.encoded == [] and collection.count() == 3
+
+    # change g only: f keeps its id, g is re-embedded and its old chunk removed
+    (tmp_path / "a.py").write_text("def f():\n    return 1\n\n\ndef g():\n    return 3\n", encoding="utf-8")
+    manifest = kb.sync_collection(collection, model, files, manifest)
+    assert len(model.encoded) == 1 and "return 3" in model.encoded[0]
+    assert collection.count() == 3
+
+    # b.md disappeared
+    manifest = kb.sync_collection(collection, model, files[:1], manifest)
+    assert collection.count() == 2 and list(manifest["files"]) == files[:1]
+
+    kb.save_manifest(manifest, str(tmp_path / "db" / "kb_manifest.json"))
+    assert kb.load_manifest(str(tmp_path / "db" / "kb_manifest.json")) == manifest
+
+
+def test_build_kb_parallel_pipeline(tmp_path: Path):
+    kb = _load_builder()
+    files = []
+    for i in range(6):
+        path = tmp_path / f"mod{i}.py"
+        path.write_text("".join(f"def f{j}():\n    return {i * 10 + j}\n\n\n" for j in range(5)), encoding="utf-8")
+        files.append(str(path))
+
+    collection = chromadb.EphemeralClient().get_or_create_collection("kb_test_pipeline")
+    manifest = {"version": kb.MANIFEST_VERSION, "embedding_model": "fake", "files": {}}
+    model = _CountingModel()
+    manifest = kb.sync_collection(collection, model, files, manifest, batch_size=4, num_workers=3, queue_batches=1)
+
+    assert len(model.encoded) == 30 and collection.count() == 30
+    assert list(manifest["files"]) == files
+    assert manifest["normalize_embeddings"] is True
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from scipy.spatial.distance import cdist, pdist
+
+from dptb_pilot.tools.modules.deeptb.submodules.supercell import make_cylinder_indenter
+
+
+@pytest.mark.parametrize("lattice", ["simple_cubic", "fcc", "graphite"])
+def test_cylinder_indenter_lattices(lattice):
+    ind = make_cylinder_indenter(center=(1.0, 2.0, -0.5), radius=4.0, height=12.0, lattice=lattice)
+    pos = ind.get_positions()
+    assert len(ind) > 0
+    assert np.all((pos[:, 0] - 1.0) ** 2 + (pos[:, 1] - 2.0) ** 2 <= 16.0 + 1e-9)
+    assert pos[:, 2].min() >= -0.5
+    assert pdist(pos).min() > 1.2
+
+
+def test_cylinder_indenter_periodic_exclusion():
+    cell = np.diag([20.0, 20.0, 10.0])
+    # one obstacle atom just below the periodic boundary in z, the indenter starts at z = 0
+    obstacle = np.array([[0.0, 0.0, 9.5]])
+    kept = make_cylinder_indenter(center=(0, 0, 0), radius=3.0, height=5.0,
+                                  exclude_positions=obstacle, min_distance=2.0)
+    periodic = make_cylinder_indenter(center=(0, 0, 0), radius=3.0, height=5.0,
+                                      exclude_positions=obstacle, min_distance=2.0,
+                                      cell=cell, pbc=[True, True, True])
+    assert len(periodic) < len(kept)
+    images = obstacle + np.array([[0, 0, -10.0]])
+    assert cdist(periodic.get_positions(), images).min() >= 2.0
@@ -0,0 +1,126 @@
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+
+from dptb_pilot.tools.modules.deeptb.submodules import dftio
+
+
+class StubParser:
+    """
+    ``AbacusParser`` stand-in: one frame per ``<prefix>*`` folder, named after the
+    folder's ``formula`` file (``C2`` by default), failing where a ``broken`` file exists.
+    """
+
+    def __init__(self, root, prefix):
+        self.raw_datas = sorted(str(path) for path in Path(root).glob(f"{prefix}*"))
+
+    def write_hdf5(self, idx, outroot, hamiltonian=False, overlap=False, **kwargs):
+        source = Path(self.raw_datas[idx])
+        with open(Path(outroot).parent / "calls.log", "a") as log:
+            log.write(f"{idx}\n")
+        if (source / "broken").exists():
+            raise ValueError(f"cannot read {source.name}")
+        formula = (source / "formula").read_text() if (source / "formula").exists() else "C2"
+        frame_dir = Path(outroot) / f"{formula}.{idx}"
+        frame_dir.mkdir(parents=True, exist_ok=True)
+        if hamiltonian:
+            (frame_dir / "hamiltonians.h5").write_bytes(b"H")
+        if overlap:
+            (frame_dir / "overlaps.h5").write_bytes(b"S")
+
+
+@pytest.fixture
+def frames(tmp_path, monkeypatch):
+    # passed to the pool workers by reference, so they build the stub as well
+    monkeypatch.setattr(dftio, "_abacus_parser", StubParser)
+    root = tmp_path / "raw"
+    for i in range(4):
+        (root / f"abacus.{i}").mkdir(parents=True)
+        (root / f"abacus.{i}" / "running_scf.log").write_text("scf", encoding="utf-8")
+    (root / "abacus.2" / "broken").touch()
+    # sources older than anything the parser writes
+    past = time.time() - 100
+    for path in root.rglob("*"):
+        os.utime(path, (past, past))
+    return root
+
+
+def _parse(root, tmp_path, num_workers, **kwargs):
+    calls = tmp_path / "calls.log"
+    calls.unlink(missing_ok=True)
+    result = dftio._dftio_parse_abacus(root, output_dir_name=str(tmp_path / "out"),
+                                       out_hamiltonian=True, out_overlap=True,
+                                       num_workers=num_workers, **kwargs)
+    parsed = sorted(int(line) for line in calls.read_text().split()) if calls.exists() else []
+    return result, parsed
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_parse_skips_current_frames_and_reparses_changed_ones(frames, tmp_path, num_workers):
+    result, parsed = _parse(frames, tmp_path, num_workers)
+    assert parsed == [0, 1, 2, 3]
+    assert (result["parsed"], result["skipped"], result["failed"]) == (3, 0, 1)
+
+    with open(result["timing_file_path"]) as f:
+        timing = json.load(f)
+    assert timing["num_workers"] == num_workers
+    assert (timing["parsed"], timing["skipped"], timing["failed"]) == (3, 0, 1)
+    assert [frame["idx"] for frame in timing["frames"]] == [0, 1, 2, 3]
+    assert [frame["status"] for frame in timing["frames"]] == ["parsed", "parsed", "failed", "parsed"]
+    assert timing["frames"][2]["error"] == "ValueError: cannot read abacus.2"
+
+    # only the failed frame is retried
+    result, parsed = _parse(frames, tmp_path, num_workers)
+    assert parsed == [2]
+    assert (result["parsed"], result["skipped"], result["failed"]) == (0, 3, 1)
+
+    # a source file newer than the frame output makes the frame stale
+    future = time.time() + 100
+    os.utime(frames / "abacus.1" / "running_scf.log", (future, future))
+    result, parsed = _parse(frames, tmp_path, num_workers)
+    assert parsed == [1, 2]
+    assert (result["parsed"], result["skipped"], result["failed"]) == (1, 2, 1)
+
+    result, parsed = _parse(frames, tmp_path, num_workers, skip_existing=False)
+    assert parsed == [0, 1, 2, 3]
+
+
+def test_shifted_frame_indices_are_reparsed(frames, tmp_path):
+    (frames / "abacus.2" / "broken").unlink()
+    (frames / "abacus.3" / "formula").write_text("BN")
+    result, parsed = _parse(frames, tmp_path, 1)
+    assert parsed == [0, 1, 2, 3]
+
+    # removing the first folder moves every other source one index down
+    shutil.rmtree(frames / "abacus.0")
+    result, parsed = _parse(frames, tmp_path, 1)
+    assert parsed == [0, 1, 2]
+    assert sorted(path.name for path in (tmp_path / "out").iterdir() if path.is_dir()) == \
+        ["BN.2", "C2.0", "C2.1"]
+
+    with open(tmp_path / "out" / "frame_sources.json") as f:
+        assert json.load(f)["2"] == str(frames / "abacus.3")
+    result, parsed = _parse(frames, tmp_path, 1)
+    assert parsed == []
+
+
+def test_frame_needs_every_requested_output(tmp_path):
+    source = tmp_path / "abacus.0"
+    source.mkdir()
+    past = time.time() - 100
+    os.utime(source, (past, past))
+    frame_dir = tmp_path / "out" / "C2.0"
+    frame_dir.mkdir(parents=True)
+    (frame_dir / "hamiltonians.h5").write_bytes(b"H")
+    sources = {"0": str(source), "1": str(source)}
+
+    assert dftio._frame_is_current(tmp_path / "out", 0, source, ["hamiltonians.h5"], sources)
+    assert not dftio._frame_is_current(tmp_path / "out", 0, source, ["hamiltonians.h5", "overlaps.h5"], sources)
+    assert not dftio._frame_is_current(tmp_path / "out", 1, source, ["hamiltonians.h5"], sources)
+    assert not dftio._frame_is_current(tmp_path / "out", 0, source, [], sources)
+    # output written from another source folder
+    assert not dftio._frame_is_current(tmp_path / "out", 0, source, ["hamiltonians.h5"], {"0": str(tmp_path / "x")})
@@ -1,6 +1,11 @@
+import io
+import json
+import tarfile
 from pathlib import Path
 
-from dptb_pilot.tools.modules.dpnegf.submodules.archive import pack_files, unpack_files
+import pytest
+
+from dptb_pilot.tools.modules.dpnegf.submodules.archive import MANIFEST_NAME, pack_files, pack_members, unpack_files
 
 
 def test_dpnegf_archive_roundtrip(tmp_path: Path):
@@ -17,3 +22,47 @@ def test_dpnegf_archive_roundtrip(tmp_path: Path):
     assert sorted(path.name for path in extracted) == ["a.txt", "b.txt"]
     assert (out_dir / "a.txt").read_text(encoding="utf-8") == "alpha"
     assert (out_dir / "b.txt").read_text(encoding="utf-8") == "beta"
+
+
+def test_dpnegf_archive_codecs_and_manifest(tmp_path: Path):
+    for codec, name in (("tar", "snap.tar"), ("gz", "snap.tar.gz")):
+        archive = pack_members(tmp_path / "snap.tar.gz", iter([("b.vasp", b"b"), ("a.vasp", b"a")]), codec=codec)
+        assert archive.name == name
+        extracted = unpack_files(archive, tmp_path / codec)
+        assert [path.name for path in extracted] == ["b.vasp", "a.vasp"]
+        assert not (tmp_path / codec / MANIFEST_NAME).exists()
+
+    manifest = json.dumps({"codec": "tar", "files": [{"name": "a.vasp"}, {"name": "b.vasp"}]}).encode()
+    with tarfile.open(tmp_path / "truncated.tar", "w") as tar:
+        tar.add(tmp_path / "tar" / "b.vasp", arcname="b.vasp")
+        info = tarfile.TarInfo(MANIFEST_NAME)
+        info.size = len(manifest)
+        tar.addfile(info, io.BytesIO(manifest))
+    with pytest.raises(RuntimeError, match="missing members"):
+        unpack_files(tmp_path / "truncated.tar", tmp_path / "truncated")
+
+
+@pytest.mark.parametrize("codec, module, suffix", [("zstd", "zstandard", ".tar.zst"), ("lz4", "lz4.frame", ".tar.lz4")])
+def test_dpnegf_archive_optional_codecs(tmp_path: Path, codec, module, suffix):
+    pytest.importorskip(module)
+    archive = pack_members(tmp_path / "snap.tar.gz", iter([("b.vasp", b"b" * 1000), ("a.vasp", b"a")]), codec=codec)
+    assert archive.name == "snap" + suffix
+
+    # the codec is detected from the file content, not the suffix
+    renamed = archive.rename(tmp_path / "snap.bin")
+    extracted = unpack_files(renamed, tmp_path / codec)
+    assert [path.name for path in extracted] == ["b.vasp", "a.vasp"]
+    assert (tmp_path / codec / "b.vasp").read_bytes() == b"b" * 1000
+
+
+def test_dpnegf_archive_falls_back_to_gz(tmp_path: Path, monkeypatch):
+    from dptb_pilot.tools.modules.dpnegf.submodules import archive as archive_module
+
+    monkeypatch.setattr(archive_module, "_codec_available", lambda codec: codec in ("tar", "gz"))
+    monkeypatch.setenv("DPNEGF_ARCHIVE_CODEC", "zstd")
+    with pytest.warns(UserWarning, match="falling back to 'gz'"):
+        archive = pack_members(tmp_path / "snap.tar.zst", iter([("a.vasp", b"a")]))
+    assert archive.name == "snap.tar.gz"
+    with tarfile.open(archive, "r:gz") as tar:
+        assert "a.vasp" in tar.getnames()
+    assert [path.name for path in unpack_files(archive, tmp_path / "out")] == ["a.vasp"]
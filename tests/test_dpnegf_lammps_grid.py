@@ -0,0 +1,92 @@
+import json
+from pathlib import Path
+
+from ase import Atoms
+from ase.io import write
+
+from dptb_pilot.tools.modules.dpnegf.submodules.lammps import run_lammps_grid
+
+
+def test_dpnegf_run_lammps_grid_resumes(tmp_path: Path):
+    task_root = tmp_path / "tasks"
+    atoms = Atoms("C2", positions=[[0, 0, 0], [0, 0, 1.4]], cell=[5, 5, 5], pbc=True)
+    for name in ("lmp_relax_a_300K_0bar", "lmp_relax_a_600K_0bar"):
+        (task_root / name).mkdir(parents=True)
+        (task_root / name / "in.lammps").write_text("# dummy", encoding="utf-8")
+        write(task_root / name / "lammps.data", atoms, format="lammps-data")
+    model = tmp_path / "frozen_model.pb"
+    model.write_bytes(b"model")
+    relax_config = {
+        "ensemble": "nvt",
+        # stands in for lmp: produce relaxed.data and a log, ignore the lmp arguments
+        "run_config": {"command": "cp lammps.data relaxed.data && touch log.lammps && true"},
+    }
+
+    work_dir = tmp_path / "work"
+    result = run_lammps_grid(task_root, model, relax_config, work_path=str(work_dir), core_budget=2)
+    assert result["task_names"] == ["lmp_relax_a_300K_0bar", "lmp_relax_a_600K_0bar"]
+    assert not result["failed_tasks"] and not result["skipped_tasks"]
+    assert all(path.exists() for path in result["relaxed_system_archive_paths"])
+    status = json.loads((work_dir / "lmp_relax_a_300K_0bar" / "status.json").read_text())
+    assert status["status"] == "done"
+
+    again = run_lammps_grid(task_root, model, relax_config, work_path=str(work_dir), core_budget=2)
+    assert again["skipped_tasks"] == result["task_names"]
+
+
+def test_dpnegf_prepare_lammps_tasks_shares_inputs(tmp_path: Path):
+    from dptb_pilot.tools.modules.dpnegf.submodules.lammps import prepare_lammps_tasks
+
+    atoms = Atoms("C6", positions=[[0, 0, 1.4 * i] for i in range(6)], cell=[8, 8, 8.4], pbc=True)
+    conf = tmp_path / "chain.vasp"
+    write(conf, atoms, format="vasp")
+    model = tmp_path / "frozen_model.pb"
+    model.write_bytes(b"model" * 100)
+    relax_config = {"ensemble": "nvt", "dt": 0.001, "nsteps": 10,
+                    "temps": [300, 600], "press": [0, 1], "run_config": {"command": "lmp"}}
+
+    result = prepare_lammps_tasks([conf], [{"atom_index": [2, 4, 6], "atom_number": 2}], relax_config,
+                                  {"deepmd_model_path": str(model)}, work_path=str(tmp_path / "prep"))
+
+    assert len(result["task_paths"]) == 4
+    data_files = [path / "lammps.data" for path in result["task_paths"]]
+    model_files = [path / "frozen_model.pb" for path in result["task_paths"]]
+    assert len({path.stat().st_ino for path in data_files}) == 1
+    assert len({path.stat().st_ino for path in model_files}) == 1
+    assert "group fixed id 1:2 5:6" in (result["task_paths"][0] / "in.lammps").read_text()
+
+
+def test_dpnegf_run_lammps_task_streams_smart_snapshots(tmp_path: Path):
+    import tarfile
+
+    from ase.io import read
+
+    from dptb_pilot.tools.modules.dpnegf.submodules.lammps import run_lammps_task
+
+    task_path = tmp_path / "task"
+    task_path.mkdir()
+    (task_path / "in.lammps").write_text("# dummy", encoding="utf-8")
+    atoms = Atoms("CH", positions=[[0, 0, 0], [1, 1, 1]], cell=[5, 5, 10], pbc=True)
+    write(task_path / "lammps.data", atoms, format="lammps-data", specorder=["C", "H"], masses=True)
+    frame = ("ITEM: TIMESTEP\n{step}\nITEM: NUMBER OF ATOMS\n2\nITEM: BOX BOUNDS pp pp pp\n"
+             "0 5\n0 5\n0 10\nITEM: ATOMS id type xu yu zu\n1 1 0 0 0\n2 2 1 1 10\n")
+    dump = tmp_path / "traj.xyz"
+    dump.write_text("".join(frame.format(step=step) for step in (0, 1000, 2000)), encoding="utf-8")
+    model = tmp_path / "frozen_model.pb"
+    model.write_bytes(b"model")
+    relax_config = {"ensemble": "smart",
+                    "run_config": {"command": f"cp {dump} traj.xyz && touch log.lammps && true"}}
+
+    result = run_lammps_task(task_path, "smart", model, relax_config, work_path=str(tmp_path / "work"))
+
+    with tarfile.open(result["relaxed_system_archive_path"]) as tar:
+        names = tar.getnames()
+        snapshot = tar.extractfile("POSCAR_0002.vasp").read().decode()
+    assert names == ["POSCAR_0000.vasp", "POSCAR_0001.vasp", "POSCAR_0002.vasp", ".manifest.json"]
+    assert not list((tmp_path / "work" / "smart").glob("POSCAR_*"))
+
+    (tmp_path / "POSCAR").write_text(snapshot, encoding="utf-8")
+    relaxed = read(tmp_path / "POSCAR", format="vasp")
+    assert relaxed.get_chemical_symbols() == ["C", "H"]
+    z = relaxed.get_scaled_positions(wrap=False)[:, 2]
+    assert 0 < z[0] < 1e-6 and 1 - 1e-6 < z[1] < 1
@@ -0,0 +1,92 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from dptb_pilot.tools.modules.dpnegf.submodules import negf
+from dptb_pilot.tools.modules.dpnegf.submodules.archive import pack_members
+from dptb_pilot.tools.modules.dpnegf.submodules.self_energy_store import default_store
+
+SNAPSHOTS = [f"snap_{i}.vasp" for i in range(5)]
+
+
+def _fake_build_model(deeptb_model_path):
+    return {"model": str(deeptb_model_path), "pid": os.getpid()}
+
+
+def _fake_run_single_negf(sys_path, deeptb_model_path, modified_negf_input_config,
+                          use_common_self_energy, model=None):
+    # records where it ran and whether the lead self-energies were already stored
+    run_dir = Path(sys_path.name.replace(".", "_"))
+    run_dir.mkdir(parents=True, exist_ok=True)
+    record = {"snapshot": sys_path.name, "saved_se": None,
+              "pid": os.getpid(), "model_pid": model["pid"] if model else None}
+    if use_common_self_energy:
+        with default_store().entry("lead") as entry:
+            record["saved_se"] = entry.complete
+            if not entry.complete:
+                (entry.path / "se.pth").write_bytes(b"self-energy")
+                entry.commit()
+    (run_dir / "negf.out.pth").write_text(json.dumps(record), encoding="utf-8")
+
+
+@pytest.fixture
+def snapshots(tmp_path, monkeypatch):
+    monkeypatch.setenv("DPNEGF_SELF_ENERGY_STORE", str(tmp_path / "store"))
+    # the stubs only reach the workers through fork
+    monkeypatch.setattr(negf, "_start_method", lambda: "fork")
+    monkeypatch.setattr(negf, "_build_model", _fake_build_model)
+    monkeypatch.setattr(negf, "_run_single_negf", _fake_run_single_negf)
+    return pack_members(tmp_path / "relaxed.tar.gz", iter([(name, b"structure") for name in SNAPSHOTS]))
+
+
+def _run(snapshots, tmp_path, use_common_self_energy):
+    result = negf.run_negf_task({}, "task", tmp_path / "model.pth", snapshots,
+                                {"n_workers": 2, "use_common_self_energy": use_common_self_energy},
+                                work_path=str(tmp_path / "work"))
+    return [json.loads(Path(path).read_text(encoding="utf-8")) for path in result["negf_result_paths"]]
+
+
+def test_first_snapshot_commits_the_self_energies_for_the_workers(snapshots, tmp_path):
+    records = _run(snapshots, tmp_path, use_common_self_energy=True)
+
+    assert [record["snapshot"] for record in records] == SNAPSHOTS
+    first, rest = records[0], records[1:]
+    # the first snapshot runs in this process on the model built here and computes the self-energies
+    assert first["pid"] == first["model_pid"] == os.getpid() and not first["saved_se"]
+    assert all(record["saved_se"] for record in rest)
+    assert all(record["pid"] != os.getpid() for record in rest)
+
+
+def test_workers_build_their_own_model_without_a_shared_self_energy(snapshots, tmp_path):
+    records = _run(snapshots, tmp_path, use_common_self_energy=False)
+
+    assert [record["snapshot"] for record in records] == SNAPSHOTS
+    assert all(record["pid"] != os.getpid() and record["model_pid"] == record["pid"] for record in records)
+
+
+def test_default_workers_report_a_failed_start(tmp_path, monkeypatch):
+    # real forkserver/spawn workers; the model cannot be built, so every worker dies in its initializer
+    monkeypatch.chdir(tmp_path)
+    snapshots = [tmp_path / name for name in SNAPSHOTS[:3]]
+    with ThreadPoolExecutor(1) as runner:
+        run = runner.submit(negf._run_negf_concurrently, snapshots, tmp_path / "missing.pth", {},
+                            use_common_self_energy=False, n_workers=2)
+        with pytest.raises(RuntimeError, match="failed to start or died"):
+            run.result(timeout=300)
+
+
+def test_fork_is_refused_in_a_threaded_process(monkeypatch):
+    monkeypatch.setenv("DPNEGF_START_METHOD", "fork")
+    stop = threading.Event()
+    thread = threading.Thread(target=stop.wait)
+    thread.start()
+    try:
+        with pytest.warns(RuntimeWarning, match="unsafe"):
+            assert negf._start_method() != "fork"
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,107 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from ase import Atoms
+from ase.io import write
+
+from dptb_pilot.tools.modules.dpnegf.submodules.self_energy_store import SelfEnergyStore, self_energy_key
+
+
+def _config(lead_l="0-2", lead_r="4-6", emax=2.0):
+    return {"task_options": {
+        "emin": -2.0, "emax": emax, "espacing": 0.01,
+        "stru_options": {
+            "kmesh": [1, 1, 1],
+            "device": {"id": "2-4"},
+            "lead_L": {"id": lead_l, "voltage": 0.0},
+            "lead_R": {"id": lead_r, "voltage": 0.0},
+        },
+    }}
+
+
+def test_self_energy_key_ignores_device(tmp_path: Path):
+    model = tmp_path / "model.pth"
+    model.write_bytes(b"model")
+    atoms = Atoms("C6", positions=[[0, 0, z] for z in range(6)], cell=[10, 10, 6], pbc=True)
+    write(tmp_path / "a.vasp", atoms, format="vasp")
+    atoms.positions[2:4, 0] += 0.3  # only the device region moves
+    write(tmp_path / "b.vasp", atoms, format="vasp")
+
+    key = self_energy_key(tmp_path / "a.vasp", model, _config())
+    assert self_energy_key(tmp_path / "b.vasp", model, _config()) == key
+    assert self_energy_key(tmp_path / "a.vasp", model, _config(emax=3.0)) != key
+
+
+def _fill(store: SelfEnergyStore, key: str, nbytes: int = 100):
+    with store.entry(key) as entry:
+        assert not entry.complete
+        (entry.path / "se.pth").write_bytes(b"x" * nbytes)
+        entry.commit()
+
+
+def test_self_energy_store_evicts_by_size(tmp_path: Path):
+    store = SelfEnergyStore(tmp_path / "store", max_bytes=150)
+    for key in ("old", "new"):
+        _fill(store, key)
+
+    assert store.is_complete("new")
+    assert not (tmp_path / "store" / "old").exists()
+
+
+def test_self_energy_entry_is_moved_into_place_on_commit(tmp_path: Path):
+    store = SelfEnergyStore(tmp_path / "store", max_bytes=10 ** 6)
+    with pytest.raises(RuntimeError):
+        with store.entry("key") as entry:
+            (entry.path / "se.pth").write_bytes(b"partial")
+            raise RuntimeError("NEGF failed")
+    # nothing of the failed run is left behind
+    assert [path.name for path in store.root.iterdir()] == [".locks"]
+
+    with store.entry("key") as entry:
+        (entry.path / "se.pth").write_bytes(b"done")
+        assert not (store.root / "key").exists()
+        entry.commit()
+        assert entry.path == store.root / "key"
+    with store.entry("key") as entry:
+        assert entry.complete
+        assert (entry.path / "se.pth").read_bytes() == b"done"
+
+
+def test_self_energy_store_waits_for_a_running_writer(tmp_path: Path):
+    store = SelfEnergyStore(tmp_path / "store", max_bytes=10 ** 6)
+    writing = threading.Event()
+    seen = []
+
+    def reader():
+        writing.wait()
+        with store.entry("key") as entry:
+            seen.append((entry.complete, (entry.path / "se.pth").read_bytes()))
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    with store.entry("key") as entry:
+        writing.set()
+        time.sleep(0.2)
+        (entry.path / "se.pth").write_bytes(b"done")
+        entry.commit()
+    thread.join()
+    assert seen == [(True, b"done")]
+
+
+def test_self_energy_store_keeps_entries_in_use_and_drops_stale_ones(tmp_path: Path):
+    store = SelfEnergyStore(tmp_path / "store", max_bytes=250)
+    _fill(store, "in_use")
+    # an entry of an interrupted run and an orphaned temporary directory
+    for name in ("unfinished", "crashed.tmp-1234"):
+        (store.root / name).mkdir()
+        (store.root / name / "se.pth").write_bytes(b"x" * 100)
+
+    with store.entry("in_use") as reading:
+        assert reading.complete
+        _fill(store, "new")
+        _fill(store, "newer")
+        assert (reading.path / "se.pth").exists()
+
+    assert sorted(path.name for path in store.root.iterdir()) == [".locks", "in_use", "newer"]
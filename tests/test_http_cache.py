@@ -0,0 +1,91 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from dptb_pilot.tools.modules.knowledge import c2db_tool, http_cache
+from dptb_pilot.tools.modules.knowledge.http_cache import ResponseCache, cache_key, cached_get
+
+
+@pytest.fixture
+def stub_server():
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            status = 404 if "missing" in self.path else 200
+            body = json.dumps({"data": [{"id": "MoS2-1", "attributes": {"chemical_formula_descriptive": "MoS2"}}]})
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body.encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", hits
+    server.shutdown()
+
+
+def test_cache_key_normalizes_params():
+    assert cache_key("http", {"url": "u", "params": {"b": 1, "a": "x", "c": None}}) == \
+        cache_key("http", {"params": {"a": "x", "b": 1}, "url": "u"})
+    # values are sent as given, so whitespace keeps requests apart
+    assert cache_key("http", {"url": "u", "params": {"a": " x "}}) != \
+        cache_key("http", {"url": "u", "params": {"a": "x"}})
+
+
+def test_async_client_is_closed_with_its_loop():
+    async def client():
+        first = http_cache.get_async_client()
+        assert http_cache.get_async_client() is first
+        return first
+
+    first = asyncio.run(client())
+    second = asyncio.run(client())
+    assert first is not second
+    assert first.is_closed and second.is_closed
+    assert not http_cache._clients
+
+
+def test_cached_get_hits_network_once(stub_server, tmp_path: Path):
+    url, hits = stub_server
+    cache = ResponseCache(tmp_path, ttl=60)
+
+    async def run():
+        first = await cached_get(f"{url}/structures", params={"page_limit": 5}, cache=cache)
+        second = await cached_get(f"{url}/structures", params={"page_limit": 5}, cache=cache)
+        missing = await cached_get(f"{url}/missing", cache=cache)
+        missing_again = await cached_get(f"{url}/missing", cache=cache)
+        return first, second, missing, missing_again
+
+    first, second, missing, missing_again = asyncio.run(run())
+    assert first.json() == second.json()
+    assert missing.status_code == missing_again.status_code == 404
+    # errors are not cached
+    assert len(hits) == 3
+
+    expired = ResponseCache(tmp_path, ttl=0)
+    asyncio.run(cached_get(f"{url}/structures", params={"page_limit": 5}, cache=expired))
+    assert len(hits) == 4
+
+
+def test_search_c2db_uses_cache(stub_server, tmp_path: Path, monkeypatch):
+    url, hits = stub_server
+    monkeypatch.setattr(c2db_tool, "C2DB_BASE_URL", url)
+    monkeypatch.setenv("DPTB_HTTP_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("DPTB_HTTP_CACHE_TTL", "60")
+    monkeypatch.setenv("DPTB_STRUCTURE_INDEX_DIR", str(tmp_path / "index"))
+
+    first = asyncio.run(c2db_tool.search_c2db("MoS2", limit=3))
+    second = asyncio.run(c2db_tool.search_c2db("MoS2", limit=3))
+    assert "MoS2-1" in first and first == second
+    assert len(hits) == 1
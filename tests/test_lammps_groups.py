@@ -0,0 +1,22 @@
+import numpy as np
+
+from dptb_pilot.tools.modules.deeptb.submodules.lammps import generate_group_lines_by_ranges
+from dptb_pilot.tools.modules.util.comm import lammps_id_ranges
+
+
+def test_lammps_id_ranges():
+    assert lammps_id_ranges([]) == ""
+    assert lammps_id_ranges([9, 1, 2, 3, 7, 10, 2]) == "1:3 7 9:10"
+    assert lammps_id_ranges(np.arange(1, 5001)) == "1:5000"
+
+
+def test_generate_group_lines_by_ranges():
+    lines = generate_group_lines_by_ranges(mobile_count=20,
+                                           fixed_ids=np.r_[1:6, 16:21],
+                                           indenter_ids=[18, 19, 20])
+    assert lines.splitlines() == [
+        "group fixed id 1:5 16:20",
+        "group mobile subtract all fixed",
+        "group indenter id 18:20",
+        "group mobile subtract indenter",
+    ]
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+from ase.build import nanotube
+from ase.io import write
+
+from dptb_pilot.tools.modules.deeptb.submodules.press_tube import build_and_generate
+from dptb_pilot.tools.modules.deeptb.submodules.uniaxial_strain import _generate_uniaxial_strain_lammps_input_file
+
+
+def _tube(tmp_path: Path) -> Path:
+    path = tmp_path / "cnt.vasp"
+    write(path, nanotube(4, 0, length=1, vacuum=5.0), format="vasp")
+    return path
+
+
+def _tree(root: Path):
+    return {str(path.relative_to(root)): path.read_bytes() for path in sorted(root.rglob("*")) if path.is_file()}
+
+
+def test_uniaxial_strain_parallel_matches_serial(tmp_path: Path):
+    tube = _tube(tmp_path)
+    strains = [-1.0, -0.5, 0.0, 0.5, 1.0]
+    serial = _generate_uniaxial_strain_lammps_input_file(tmp_path / "serial", tube, strains, axis="z",
+                                                         target_length=10)
+    parallel = _generate_uniaxial_strain_lammps_input_file(tmp_path / "parallel", tube, strains, axis="z",
+                                                           target_length=10, n_workers=4)
+    assert [path.parent.name for path in parallel["in_lammps_file_paths"]] == [
+        f"strain_{strain:+.2f}pct" for strain in strains]
+    assert _tree(tmp_path / "serial") == _tree(tmp_path / "parallel")
+    assert len(serial["lammps_data_file_paths"]) == len(strains)
+
+
+def test_press_tube_parallel_matches_serial(tmp_path: Path):
+    tube = _tube(tmp_path)
+    kwargs = dict(target_length=10.0, axis="z", indent_depths=[8.0, 6.0, 4.0], indenter_radius=2.0)
+    build_and_generate(str(tube), out_root=str(tmp_path / "serial"), **kwargs)
+    build_and_generate(str(tube), out_root=str(tmp_path / "parallel"), n_workers=3, **kwargs)
+
+    tasks = sorted(path.name for path in (tmp_path / "parallel").iterdir())
+    assert tasks == ["indent_00_lat8.00A", "indent_01_lat6.00A", "indent_02_lat4.00A"]
+    assert _tree(tmp_path / "serial") == _tree(tmp_path / "parallel")
+    assert "group indenter id" in (tmp_path / "parallel" / tasks[0] / "in.lammps").read_text()
@@ -0,0 +1,58 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+from dptb_pilot.tools.modules.knowledge import rag_tool
+
+
+class _FakeModel:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, normalize_embeddings=False):
+        self.calls.append((tuple(texts), normalize_embeddings))
+        return np.ones((len(texts), 3))
+
+
+class _FakeCollection:
+    def __init__(self):
+        self.queries = 0
+
+    def query(self, query_embeddings, n_results):
+        self.queries += 1
+        return {"documents": [["chunk"] * n_results],
+                "metadatas": [[{"filename": "band.py", "type": "function"}] * n_results]}
+
+
+class _FakeClient:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def get_collection(self, name):
+        return self.collection
+
+
+def test_rag_query_caches_and_manifest_invalidation(tmp_path: Path, monkeypatch):
+    model, collection = _FakeModel(), _FakeCollection()
+    manifest = tmp_path / "kb_manifest.json"
+    monkeypatch.setattr(rag_tool, "MANIFEST_PATH", str(manifest))
+    monkeypatch.setattr(rag_tool, "_client", _FakeClient(collection))
+    monkeypatch.setattr(rag_tool, "_collection", collection)
+    monkeypatch.setattr(rag_tool, "_model", model)
+    monkeypatch.setattr(rag_tool, "_manifest_stamp", None)
+    rag_tool.clear_query_caches()
+
+    first = rag_tool.search_knowledge_base("band structure", n_results=2)
+    assert rag_tool.search_knowledge_base("band structure", n_results=2) == first
+    assert len(model.calls) == 1 and collection.queries == 1
+
+    # other n_results: new query, memoized embedding
+    rag_tool.search_knowledge_base("band structure", n_results=3)
+    assert len(model.calls) == 1 and collection.queries == 2
+
+    # a rebuilt knowledge base invalidates both caches
+    manifest.write_text(json.dumps({"normalize_embeddings": True}), encoding="utf-8")
+    rag_tool.search_knowledge_base("band structure", n_results=2)
+    assert model.calls[-1] == (("band structure",), True)
+    assert len(model.calls) == 2 and collection.queries == 3
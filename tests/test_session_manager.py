@@ -0,0 +1,93 @@
+import asyncio
+
+from google.adk.sessions import InMemorySessionService
+
+from dptb_pilot.server.session_manager import BoundedHistoryPool, SessionManager
+
+
+class FakeToolset:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeAgent:
+    def __init__(self, session_id):
+        self.name = f"agent_{session_id[:4]}"
+        self.tools = [FakeToolset()]
+
+
+def _manager(max_agents=2, idle_ttl=3600, history=None):
+    pending = {}
+    service = InMemorySessionService()
+    manager = SessionManager(service, [pending], max_agents=max_agents, idle_ttl=idle_ttl)
+    manager.configure("app", FakeAgent, lambda user_id, chat_id: (history or {}).get(chat_id, []))
+    return manager, service, pending
+
+
+def test_lru_cap_closes_evicted_toolsets():
+    manager, _, pending = _manager(max_agents=2)
+
+    async def run():
+        agents = {}
+        for sid in ("a" * 32, "b" * 32):
+            agents[sid] = await manager.acquire(sid)
+            manager.release(sid)
+        pending["a" * 32] = asyncio.Event()
+        # pinned sessions are never evicted, the idle least recently used one is
+        async with manager.session("c" * 32):
+            pass
+        return agents
+
+    agents = asyncio.run(run())
+    assert "a" * 32 not in manager and "b" * 32 in manager and "c" * 32 in manager
+    assert agents["a" * 32].tools[0].closed and not agents["b" * 32].tools[0].closed
+    assert "a" * 32 not in pending
+    assert manager.stats()["live_agents"] == 2 and manager.stats()["evictions"] == 1
+
+
+def test_idle_ttl_and_rehydration():
+    sid = "d" * 32
+    manager, service, _ = _manager(idle_ttl=0, history={"chat": [["q0", "a0"], ["q1", "a1"]]})
+
+    async def run():
+        async with manager.session(sid):
+            await manager.ensure_adk_session(sid, sid[:4], "chat")
+        await asyncio.sleep(0.01)
+        await manager.sweep()
+        evicted = sid not in manager and await service.get_session(app_name="app", user_id=sid[:4],
+                                                                      session_id=sid) is None
+        # the next request recreates the agent and replays the persisted turns
+        async with manager.session(sid):
+            await manager.ensure_adk_session(sid, sid[:4], "chat")
+            session = await service.get_session(app_name="app", user_id=sid[:4], session_id=sid)
+        return evicted, session
+
+    evicted, session = asyncio.run(run())
+    assert evicted
+    assert [event.content.parts[0].text for event in session.events] == ["q0", "a0", "q1", "a1"]
+
+
+def test_bounded_history_pool_keeps_recent_chats():
+    pool = BoundedHistoryPool(max_chats=2)
+    pool["a"] = [["q", "a"]]
+    pool["b"] = []
+    pool["a"].append(["q2", "a2"])
+    pool["c"] = []
+    assert list(pool) == ["a", "c"] and len(pool["a"]) == 2
+
+
+def test_evict_deletes_adk_session_of_its_user():
+    sid = "e" * 32
+    manager, service, _ = _manager()
+
+    async def run():
+        async with manager.session(sid):
+            await manager.ensure_adk_session(sid, "alice", None)
+        await manager.evict(sid)
+        return await service.get_session(app_name="app", user_id="alice", session_id=sid)
+
+    assert asyncio.run(run()) is None
+    assert manager.stats()["adk_sessions"] == 0
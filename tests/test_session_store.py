@@ -0,0 +1,76 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from dptb_pilot.server.session_store import SessionStore
+
+
+def _session(chat_id, title, history=()):
+    return {"chat_id": chat_id, "user_id": "u" * 32, "title": title, "history": list(history),
+            "created_at": "2025-01-01T00:00:00", "last_active": "2025-01-01T00:00:00", "message_count": 0}
+
+
+def test_append_and_page(tmp_path: Path):
+    store = SessionStore(tmp_path)
+    user = "u" * 32
+    store.replace_sessions(user, [_session("chat_a", "A"), _session("chat_b", "B")])
+    for i in range(5):
+        assert store.append_turn(user, "chat_b", f"q{i}", f"a{i}") == i + 1
+
+    assert store.load_history(user, "chat_b", offset=3) == [["q3", "a3"], ["q4", "a4"]]
+    page = store.list_sessions(user, offset=1, limit=1)
+    assert [session["chat_id"] for session in page] == ["chat_b"]
+    assert page[0]["message_count"] == 10 and "history" not in page[0]
+
+    # renaming, reordering and deleting keep the server-side turns
+    store.replace_sessions(user, [_session("chat_b", "renamed"), _session("chat_c", "C", [["q", "a"]])])
+    sessions = store.list_sessions(user, include_history=True)
+    assert [session["chat_id"] for session in sessions] == ["chat_b", "chat_c"]
+    assert sessions[0]["title"] == "renamed" and len(sessions[0]["history"]) == 10
+    assert sessions[1]["history"] == [{"role": "user", "content": "q"}, {"role": "assistant", "content": "a"}]
+    assert store.load_history(user, "chat_a") == []
+
+
+def test_page_histories_share_one_connection(tmp_path: Path, monkeypatch):
+    store = SessionStore(tmp_path)
+    user = "u" * 32
+    store.replace_sessions(user, [_session(f"chat_{i}", str(i)) for i in range(4)])
+    for i in range(4):
+        for j in range(i):
+            store.append_turn(user, f"chat_{i}", f"q{i}.{j}", f"a{i}.{j}")
+
+    connects = []
+    connect = store._connect
+    monkeypatch.setattr(store, "_connect", lambda: connects.append(1) or connect())
+    page = store.list_sessions(user, offset=1, limit=2, include_history=True)
+    assert len(connects) == 1
+    assert [session["chat_id"] for session in page] == ["chat_1", "chat_2"]
+    assert [len(session["history"]) for session in page] == [2, 4]
+    assert page[1]["history"][2] == {"role": "user", "content": "q2.1"}
+
+
+def test_concurrent_appends_keep_every_turn(tmp_path: Path):
+    store = SessionStore(tmp_path)
+    user = "u" * 32
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda i: store.append_turn(user, "chat", f"q{i}", f"a{i}"), range(40)))
+    history = store.load_history(user, "chat")
+    assert sorted(question for question, _ in history) == sorted(f"q{i}" for i in range(40))
+    assert store.list_sessions(user)[0]["message_count"] == 80
+
+
+def test_legacy_sessions_json_is_imported(tmp_path: Path):
+    user = "u" * 32
+    legacy = tmp_path / user / "sessions.json"
+    legacy.parent.mkdir()
+    legacy.write_text(json.dumps([
+        _session("chat_old", "old", [["q0", "a0"]]),
+        _session("chat_fe", "frontend", [{"role": "user", "content": "q"}, {"role": "assistant", "content": "a"}]),
+    ]))
+
+    store = SessionStore(tmp_path)
+    assert store.load_history(user, "chat_old") == [["q0", "a0"]]
+    assert store.load_history(user, "chat_fe") == [["q", "a"]]
+    assert not legacy.exists() and legacy.with_name("sessions.json.migrated").exists()
+    # a fresh store on the same database does not import again
+    assert SessionStore(tmp_path).count_sessions(user) == 2
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from scipy import sparse
+
+from dptb_pilot.tools.modules.deeptb.submodules.sparse_eig import (
+    window_eigenvalues,
+    window_fermi_level,
+)
+
+
+def test_window_eigenvalues_match_dense():
+    n = 200
+    onsite = np.linspace(-5.0, 5.0, n)
+    hopping = 0.1 * np.ones(n - 1)
+    hk = sparse.diags([hopping, onsite, hopping], [-1, 0, 1], format="csr").astype(complex)
+    sk = sparse.identity(n, format="csr") * 1.5
+
+    eig = window_eigenvalues(hk, sk, sigma=0.0, num_band=8)
+    dense = np.linalg.eigvalsh(hk.toarray()) / 1.5
+    expected = np.sort(dense[np.argsort(np.abs(dense))[:8]])
+    assert np.allclose(eig, expected)
+
+    fermi_level = window_fermi_level(eig[None, :], 0.0)
+    assert eig.min() < fermi_level < eig.max()
+
+
+def test_sparse_summary_needs_shift_and_reports_an_estimate():
+    pytest.importorskip("dptb")
+    from fake_tbsystem import FakeTBSystem
+
+    from dptb_pilot.tools.modules.deeptb.submodules.band import sparse_electronic_summary
+
+    tbsystem = FakeTBSystem()
+    with pytest.raises(ValueError):
+        sparse_electronic_summary(tbsystem, {"C": 2}, pseudo_efermi=None)
+
+    summary = sparse_electronic_summary(tbsystem, {"C": 2}, pseudo_efermi=0.0, kmesh=[4, 1, 1], num_band=2)
+    assert summary["fermi_level_source"] == "window_gap_midpoint"
+    assert summary["vbm"] < summary["fermi_level"] < summary["cbm"]
+    assert tbsystem.efermi == summary["fermi_level"]
+
+
+def test_kpath_band_data_uses_deeptb_kpath(tmp_path):
+    pytest.importorskip("dptb")
+    from dptb.utils.make_kpoints import abacus_kpath
+    from fake_tbsystem import FakeTBSystem
+
+    from dptb_pilot.tools.modules.deeptb.submodules.band import kpath_band_data, parse_kpath_input
+
+    tbsystem = FakeTBSystem()
+    tbsystem.set_efermi(0.1)
+    kpath_config = parse_kpath_input("[[0.0,0.0,0.0,4,G],[0.5,0.0,0.0,1,X]]")
+    band_data = kpath_band_data(tbsystem, kpath_config, lambda kpoints: np.zeros((len(kpoints), 2)))
+
+    kpoints, xlist, _ = abacus_kpath(tbsystem.atoms, kpath_config["kpath"])
+    assert np.allclose(band_data.kpoints, kpoints) and np.allclose(band_data.xlist, xlist)
+    band_data.export(tmp_path / "band")
+    with np.load(tmp_path / "band.npz") as exported:
+        assert float(exported["fermi_level"]) == 0.1
+        assert list(exported["labels"]) == ["G", "X"]
+        assert exported["eigenvalues"].shape == (5, 2)
@@ -0,0 +1,172 @@
+import asyncio
+from pathlib import Path
+
+from pymatgen.core import Lattice, Structure
+
+from dptb_pilot.tools.modules.knowledge import c2db_tool, mp_tool
+from dptb_pilot.tools.modules.knowledge.structure_index import StructureIndex, import_cif_files
+
+
+def _rocksalt(a=5.64):
+    return Structure.from_spacegroup("Fm-3m", Lattice.cubic(a), ["Na", "Cl"], [[0, 0, 0], [0.5, 0.5, 0.5]])
+
+
+def test_search_by_formula_chemsys_and_ranges(tmp_path: Path):
+    index = StructureIndex(tmp_path)
+    index.add_structure("mp", "mp-22862", _rocksalt(), properties={"band_gap": 5.0, "is_metal": False,
+                                                                    "energy_above_hull": 0.0})
+    index.upsert("mp", "mp-2815", {"formula": "Mo2S4", "band_gap": 1.2, "is_metal": False,
+                                   "energy_above_hull": 0.01})
+    index.upsert("mp", "mp-1434", {"formula": "MoS2", "band_gap": 0.9, "energy_above_hull": 0.02})
+
+    assert [row["source_id"] for row in index.search(formula="MoS2")] == ["mp-2815", "mp-1434"]
+    assert [row["source_id"] for row in index.search(chemsys="S-Mo")] == ["mp-2815", "mp-1434"]
+    assert [row["source_id"] for row in index.search(elements=["Cl"])] == ["mp-22862"]
+    assert [row["source_id"] for row in index.search(band_gap_min=1.0, band_gap_max=2.0)] == ["mp-2815"]
+    assert [row["source_id"] for row in index.search_query("mp-1434", source="mp")] == ["mp-1434"]
+    assert len(index.search_query("Mo-S", source="mp", limit=1)) == 1
+
+    row = index.search(source_id="mp-22862")[0]
+    assert row["spacegroup_symbol"] == "Fm-3m" and abs(row["a"] - 5.64) < 1e-6
+    # later partial updates keep known columns
+    index.upsert("mp", "mp-22862", {"band_gap": None, "crystal_system": "cubic"})
+    assert index.search(source_id="mp-22862")[0]["band_gap"] == 5.0
+
+
+def test_cif_store_round_trip_and_import(tmp_path: Path):
+    cif_dir = tmp_path / "mirror"
+    cif_dir.mkdir()
+    _rocksalt().to(filename=str(cif_dir / "1000041.cif"))
+    (cif_dir / "broken.cif").write_text("not a cif")
+
+    index = StructureIndex(tmp_path / "index")
+    assert import_cif_files(sorted(cif_dir.glob("*.cif")), "cod", index) == 1
+    assert index.get_cif("cod", "1000041") == (cif_dir / "1000041.cif").read_text()
+    assert index.get_cif("cod", "missing") is None
+    assert index.search_query("NaCl", source="cod")[0]["source_id"] == "1000041"
+
+
+def test_tools_answer_from_local_index(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("DPTB_STRUCTURE_INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.delenv("MP_API_KEY", raising=False)
+    # unreachable endpoint: everything must come from the index
+    monkeypatch.setattr(c2db_tool, "C2DB_BASE_URL", "http://127.0.0.1:9")
+    index = StructureIndex(tmp_path / "index")
+    index.add_structure("mp", "mp-22862", _rocksalt(), properties={"band_gap": 5.0, "energy_above_hull": 0.0})
+    index.add_structure("c2db", "NaCl-1", _rocksalt())
+
+    found = asyncio.run(mp_tool.search_materials_project("NaCl", limit=1))
+    assert "mp-22862" in found and "local" in found
+    found = asyncio.run(c2db_tool.search_c2db("NaCl", limit=5))
+    assert "NaCl-1" in found
+
+    message = asyncio.run(mp_tool.download_mp_structure("mp-22862", work_path=str(tmp_path / "work")))
+    assert "Successfully" in message
+    saved = Structure.from_file(str(tmp_path / "work" / "mp-22862.cif"))
+    assert saved.composition.reduced_formula == "NaCl"
+
+
+def test_c2db_results_index_cell_and_rows_omit_unknown_numbers(tmp_path: Path):
+    from dptb_pilot.tools.modules.knowledge.structure_index import format_index_rows
+
+    index = StructureIndex(tmp_path)
+    c2db_tool._index_results(index, [
+        {"id": "MoS2-1", "attributes": {"chemical_formula_reduced": "MoS2",
+                                        "lattice_vectors": [[3.16, 0, 0], [-1.58, 2.7367, 0], [0, 0, 18.0]]}},
+        {"id": "MoS2-2", "attributes": {"chemical_formula_reduced": "MoS2",
+                                        "lattice_vectors": [[3.16, 0, 0], [None, None, None], [0, 0, 18.0]]}},
+    ])
+    row = index.search(source_id="MoS2-1")[0]
+    assert abs(row["a"] - 3.16) < 1e-3 and abs(row["c"] - 18.0) < 1e-9
+    assert abs(row["gamma"] - 120.0) < 1e-2 and abs(row["volume"] - 3.16 * 2.7367 * 18.0) < 1e-6
+    assert index.search(source_id="MoS2-2")[0]["a"] is None
+
+    # COD rows may carry a Hermann-Mauguin symbol without the number
+    index.upsert("cod", "9008565", {"formula": "C", "spacegroup_symbol": "P 63/m m c"})
+    text = format_index_rows(index.search(source="cod"), "C", "COD", "download_cod_structure")
+    assert "Space Group: P 63/m m c\n" in text and "None" not in text
+
+
+def _mos2():
+    lattice = Lattice.hexagonal(3.16, 12.3)
+    coords = [[1 / 3, 2 / 3, 0.25], [2 / 3, 1 / 3, 0.75], [1 / 3, 2 / 3, 0.621], [1 / 3, 2 / 3, 0.879],
+              [2 / 3, 1 / 3, 0.121], [2 / 3, 1 / 3, 0.379]]
+    return Structure(lattice, ["Mo", "Mo", "S", "S", "S", "S"], coords)
+
+
+def test_dimensionality_filter_is_cached(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("DPTB_STRUCTURE_INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setenv("DPTB_HTTP_CACHE_DIR", str(tmp_path / "http"))
+    monkeypatch.setenv("DPTB_DIMENSIONALITY_WORKERS", "2")
+    monkeypatch.setenv("MP_API_KEY", "test")
+
+    def summary(material_id, formula, e_hull):
+        return {"material_id": material_id, "formula_pretty": formula,
+                "symmetry": {"symbol": "P1", "number": 1, "crystal_system": "triclinic", "point_group": "1"},
+                "energy_above_hull": e_hull, "formation_energy_per_atom": -1.0, "band_gap": 1.0, "is_metal": False}
+
+    docs = [summary("mp-22862", "NaCl", 0.0), summary("mp-2815", "MoS2", 0.01)]
+    structures = {"mp-22862": _rocksalt().as_dict(), "mp-2815": _mos2().as_dict()}
+    fetched = []
+
+    def fake_fetch(api_key, material_ids):
+        fetched.append(list(material_ids))
+        return {material_id: structures[material_id] for material_id in material_ids}
+
+    monkeypatch.setattr(mp_tool, "_search_summaries", lambda api_key, query, search_args: docs)
+    monkeypatch.setattr(mp_tool, "_fetch_structures", fake_fetch)
+
+    found = asyncio.run(mp_tool.search_materials_project("Na-Cl-Mo-S", dimensionality=2, limit=1))
+    assert "mp-2815" in found and "mp-22862" not in found and "2D" in found
+    assert fetched == [["mp-22862", "mp-2815"]]
+
+    index = StructureIndex(tmp_path / "index")
+    assert index.get_column("mp", ["mp-22862", "mp-2815"], "dimensionality") == {"mp-22862": 3, "mp-2815": 2}
+    # later filtered searches are answered without fetching or classifying again
+    found = asyncio.run(mp_tool.search_materials_project("Na-Cl-Mo-S", dimensionality=3, limit=1))
+    assert "mp-22862" in found and len(fetched) == 1
+
+
+def test_worker_imports_do_not_load_the_app():
+    import subprocess
+    import sys
+
+    # pool workers import tool modules by name; the package must not drag the server in
+    code = ("import sys, dptb_pilot.tools.modules.knowledge.dimensionality; "
+            "assert 'dptb_pilot.main' not in sys.modules and 'litellm' not in sys.modules")
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=Path(__file__).parent.parent)
+
+
+def test_classify_many_reuses_one_pool():
+    from dptb_pilot.tools.modules.knowledge import dimensionality
+
+    structures = {"mp-22862": _rocksalt().as_dict(), "mp-2815": _mos2().as_dict()}
+    expected = {"mp-22862": 3, "mp-2815": 2}
+    dimensionality.shutdown_pool()
+    try:
+        # small batches stay in this thread
+        assert dimensionality.classify_many(structures, n_workers=2) == expected
+        assert dimensionality._pool is None
+
+        assert dimensionality.classify_many(structures, n_workers=2, min_pool_size=2) == expected
+        pool = dimensionality._pool
+        assert pool is not None and pool._mp_context.get_start_method() != "fork"
+        assert dimensionality.classify_many(structures, n_workers=2, min_pool_size=2) == expected
+        assert dimensionality._pool is pool
+    finally:
+        dimensionality.shutdown_pool()
+
+
+def test_old_index_gains_new_columns(tmp_path: Path):
+    import sqlite3
+
+    from dptb_pilot.tools.modules.knowledge import structure_index
+
+    # index file written before the dimensionality column existed
+    with sqlite3.connect(tmp_path / "index.sqlite") as conn:
+        conn.executescript(structure_index._SCHEMA.replace("    dimensionality INTEGER,\n", ""))
+    conn.close()
+
+    index = StructureIndex(tmp_path)
+    index.upsert("mp", "mp-2815", {"formula": "MoS2", "dimensionality": 2})
+    assert index.search(dimensionality=2)[0]["source_id"] == "mp-2815"
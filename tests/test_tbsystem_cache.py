@@ -0,0 +1,95 @@
+from pathlib import Path
+
+from dptb_pilot.tools.modules.deeptb.submodules.tbsystem_cache import TBSystemCache, _CacheEntry
+
+
+def _write(path: Path, text: str) -> Path:
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_tbsystem_cache_reuses_and_evicts(tmp_path: Path, monkeypatch):
+    built = []
+
+    def fake_build(self, model_file_path, structure_file_path, override_overlap):
+        built.append(structure_file_path.name)
+        return _CacheEntry(object(), nbytes=10)
+
+    monkeypatch.setattr(TBSystemCache, "_build", fake_build)
+    cache = TBSystemCache(max_entries=2, max_bytes=1000)
+
+    model = _write(tmp_path / "model.pth", "model")
+    structures = [_write(tmp_path / f"POSCAR_{i}", f"structure {i}") for i in range(3)]
+
+    with cache.acquire(model, structures[0]) as first:
+        pass
+    with cache.acquire(model, structures[0]) as again:
+        assert again is first
+    assert built == ["POSCAR_0"]
+
+    with cache.acquire(model, structures[1]):
+        pass
+    with cache.acquire(model, structures[2]):
+        pass
+    assert cache.stats()["entries"] == 2
+
+    # POSCAR_0 was least recently used and must be rebuilt
+    with cache.acquire(model, structures[0]):
+        pass
+    assert built == ["POSCAR_0", "POSCAR_1", "POSCAR_2", "POSCAR_0"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_tbsystem_cache_memory_budget(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(TBSystemCache, "_build",
+                        lambda self, m, s, o: _CacheEntry(object(), nbytes=600))
+    cache = TBSystemCache(max_entries=10, max_bytes=1000)
+
+    model = _write(tmp_path / "model.pth", "model")
+    for i in range(3):
+        with cache.acquire(model, _write(tmp_path / f"POSCAR_{i}", f"structure {i}")):
+            pass
+
+    assert cache.stats()["entries"] == 1
+
+
+def test_tbsystem_cache_counts_shared_models_once(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(TBSystemCache, "_build",
+                        lambda self, m, s, o: _CacheEntry(object(), nbytes=100, model_hash=m.name, model_nbytes=500))
+    cache = TBSystemCache(max_entries=10, max_bytes=1000)
+
+    model_a = _write(tmp_path / "a.pth", "model a")
+    model_b = _write(tmp_path / "b.pth", "model b")
+    structures = [_write(tmp_path / f"POSCAR_{i}", f"structure {i}") for i in range(4)]
+    for structure in structures[:3]:
+        with cache.acquire(model_a, structure):
+            pass
+    assert cache.stats()["entries"] == 3
+    assert cache.stats()["nbytes"] == 500 + 3 * 100
+
+    # evicting the entry that loaded model a does not release it while the
+    # other two still share it, so all three go before model b fits
+    with cache.acquire(model_b, structures[3]):
+        pass
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["nbytes"] == 500 + 100
+
+
+def test_hash_file_memo_is_bounded(tmp_path: Path):
+    from dptb_pilot.tools.modules.util.comm import HASH_MEMO_SIZE, _hash_file_content, hash_file
+
+    _hash_file_content.cache_clear()
+    path = tmp_path / "model.pth"
+    path.write_bytes(b"weights")
+    digest = hash_file(path)
+    assert hash_file(path) == digest and _hash_file_content.cache_info().hits == 1
+
+    for i in range(HASH_MEMO_SIZE + 8):
+        other = tmp_path / f"structure_{i}.vasp"
+        other.write_text(str(i), encoding="utf-8")
+        hash_file(other)
+    assert _hash_file_content.cache_info().currsize == HASH_MEMO_SIZE
+
+    # a rewritten file is re-read
+    path.write_bytes(b"other weights")
+    assert hash_file(path) != digest
@@ -95,7 +95,7 @@ export const apiService = {
 
   // 获取用户的所有会话
   async getUserSessions(userId: string): Promise<{ sessions: any[] }> {
-    const response = await api.get(`/user/${userId}/sessions`);
+    const response = await api.get(`/user/${userId}/sessions`, { params: { include_history: true } });
     return response.data;
   },
 